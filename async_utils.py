@@ -0,0 +1,397 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+asyncio equivalents of the utils API helpers.
+
+Usage:
+    async with AsyncClient(max_concurrency=100) as client:
+        results = await asyncio.gather(*[
+            client.get_records(server, apikey, linkid, start, end, "stream/errors")
+            for linkid in linkids
+        ])
+"""
+
+import asyncio
+import email.parser
+import http.client
+import io
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from config import Config
+import utils
+import rate_limit
+
+
+class AsyncHTTPConnectionPool:
+    """Keep-alive HTTP/1.1 connection pool built on asyncio streams.
+
+    Honours HTTP_PROXY, HTTPS_PROXY and NO_PROXY like utils.HTTPConnectionPool.
+    """
+
+    def __init__(self, maxsize=None, idle_timeout=None):
+        self.maxsize = Config.HTTP_POOL_MAXSIZE if maxsize is None else maxsize
+        self.idle_timeout = Config.HTTP_POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._idle = {}
+        self._ssl_context = utils._create_ssl_context()
+        self._proxies = urllib.request.getproxies()
+        self._proxy_routes = {}
+        self._stats = {
+            'requests': 0,
+            'hits': 0,
+            'new_connections': 0,
+            'idle_evictions': 0,
+            'discarded': 0,
+            'compressed_responses': 0,
+            'wire_bytes': 0,
+            'decoded_bytes': 0,
+        }
+
+    def stats(self):
+        result = dict(self._stats)
+        result['idle_connections'] = sum(len(idle) for idle in self._idle.values())
+        return result
+
+    def _proxy_for(self, key):
+        if key not in self._proxy_routes:
+            self._proxy_routes[key] = utils._proxy_route(self._proxies, key[0], key[1])
+        return self._proxy_routes[key]
+
+    async def _new_connection(self, key):
+        (scheme, host, port) = key
+        proxy = self._proxy_for(key)
+        if scheme == 'https':
+            if proxy is not None:
+                return await self._open_tunnel(proxy, host, port)
+            return await asyncio.open_connection(host, port, ssl=self._ssl_context, server_hostname=host)
+        if proxy is not None:
+            return await asyncio.open_connection(proxy[0], proxy[1])
+        return await asyncio.open_connection(host, port)
+
+    async def _open_tunnel(self, proxy, host, port):
+        """CONNECT through the proxy, then negotiate TLS with the target host"""
+        (proxy_host, proxy_port, proxy_headers) = proxy
+        (reader, writer) = await asyncio.open_connection(proxy_host, proxy_port)
+        try:
+            lines = ["CONNECT %s:%d HTTP/1.1" % (host, port), "Host: %s:%d" % (host, port)]
+            for (name, value) in proxy_headers.items():
+                lines.append("%s: %s" % (name, value))
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+            await writer.drain()
+
+            status_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+            (version, status, reason) = (status_line.split(' ', 2) + ['', ''])[:3]
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if status != '200':
+                raise OSError("Tunnel connection failed: %s %s" % (status, reason))
+            await writer.start_tls(self._ssl_context, server_hostname=host)
+        except BaseException:
+            writer.close()
+            raise
+        return (reader, writer)
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        # Oldest connections sit at the front of the list
+        while idle and now - idle[0][1] > self.idle_timeout:
+            (_, writer) = idle.pop(0)[0]
+            writer.close()
+            self._stats['idle_evictions'] += 1
+        if idle:
+            self._stats['hits'] += 1
+            return idle.pop()[0]
+        return None
+
+    def _release(self, key, connection):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.maxsize:
+            idle.append((connection, time.monotonic()))
+        else:
+            connection[1].close()
+            self._stats['discarded'] += 1
+
+    async def close(self):
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for ((_, writer), _) in connections:
+                writer.close()
+
+    async def request(self, method, uri, headers=None, timeout=Config.DEFAULT_TIMEOUT):
+        """Send one request and return (status, reason, headers, body)"""
+        return await asyncio.wait_for(self._request(method, uri, headers), timeout)
+
+    async def _request(self, method, uri, headers):
+        parsed = urllib.parse.urlsplit(uri)
+        scheme = parsed.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {uri}")
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed.hostname, port)
+        target = parsed.path or '/'
+        if parsed.query:
+            target += '?' + parsed.query
+        default_port = 443 if scheme == 'https' else 80
+        host_header = parsed.hostname if port == default_port else "%s:%d" % (parsed.hostname, port)
+
+        headers = dict(headers or {})
+        if scheme == 'http':
+            proxy = self._proxy_for(key)
+            if proxy is not None:
+                # Plain HTTP goes to the proxy with the absolute URL as target
+                target = urllib.parse.urlunsplit((scheme, parsed.netloc, parsed.path or '/', parsed.query, ''))
+                headers.update(proxy[2])
+        if not any(name.lower() == 'accept-encoding' for name in headers):
+            headers['Accept-Encoding'] = Config.HTTP_ACCEPT_ENCODING or 'identity'
+        lines = ["%s %s HTTP/1.1" % (method, target), "Host: %s" % host_header]
+        if method not in ('GET', 'HEAD'):
+            lines.append("Content-Length: 0")
+        for (name, value) in headers.items():
+            lines.append("%s: %s" % (name, value))
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+        self._stats['requests'] += 1
+        started = time.perf_counter()
+        timing = {'method': method, 'endpoint': rate_limit.endpoint_of(uri), 'reused': True,
+                  'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+        connection = self._take_idle(key)
+        try:
+            if connection is None:
+                connection = await self._open(key, timing)
+
+            try:
+                result = await self._exchange(connection, method, payload)
+            except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+                connection[1].close()
+                if not timing['reused']:
+                    raise
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                connection = await self._open(key, timing)
+                result = await self._exchange(connection, method, payload)
+        except BaseException as e:
+            # Includes cancellation: a half-read connection can never be reused
+            if connection is not None:
+                connection[1].close()
+            if utils._request_hooks and not isinstance(e, asyncio.CancelledError):
+                timing.update(status=None, error=repr(e), ttfb=0.0, transfer=0.0, wire_bytes=0, decoded_bytes=0,
+                              total=time.perf_counter() - started)
+                utils._emit_request_event(timing)
+            raise
+
+        (status, reason, response_headers, body, keep_alive, headers_at) = result
+        if keep_alive:
+            self._release(key, connection)
+        else:
+            connection[1].close()
+            self._stats['discarded'] += 1
+
+        wire_bytes = len(body)
+        self._stats['wire_bytes'] += wire_bytes
+        encoding = response_headers.get('Content-Encoding')
+        if encoding and encoding.strip().lower() in utils.DECODABLE_ENCODINGS:
+            body = utils._decode_body(body, encoding)
+            self._stats['compressed_responses'] += 1
+        self._stats['decoded_bytes'] += len(body)
+
+        if utils._request_hooks:
+            now = time.perf_counter()
+            # Asyncio opens DNS, TCP and TLS in one step, all reported as connect
+            timing.update(status=status, wire_bytes=wire_bytes, decoded_bytes=len(body),
+                          ttfb=max(0.0, headers_at - started - timing['connect']),
+                          transfer=now - headers_at, total=now - started)
+            utils._emit_request_event(timing)
+        return (status, reason, response_headers, body)
+
+    async def _open(self, key, timing):
+        self._stats['new_connections'] += 1
+        opened = time.perf_counter()
+        connection = await self._new_connection(key)
+        timing.update(reused=False, connect=timing['connect'] + time.perf_counter() - opened)
+        return connection
+
+    async def _exchange(self, connection, method, payload):
+        (reader, writer) = connection
+        writer.write(payload)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        (version, status, reason) = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        status = int(status)
+
+        headers_at = time.perf_counter()
+        header_lines = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            header_lines.append(line)
+        response_headers = email.parser.Parser(_class=http.client.HTTPMessage).parsestr(
+            b''.join(header_lines).decode('iso-8859-1'))
+
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('Connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif response_headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = await self._read_chunked(reader)
+        elif response_headers.get('Content-Length') is not None:
+            body = await reader.readexactly(int(response_headers['Content-Length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return (status, reason, response_headers, body, keep_alive, headers_at)
+
+    async def _read_chunked(self, reader):
+        body = bytearray()
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip optional trailers up to the terminating blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return body
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+
+    async def urlopen(self, uri, method='GET', headers=None, timeout=Config.DEFAULT_TIMEOUT):
+        """Request a URI, following redirects and raising HTTPError on non-2xx replies"""
+        for _ in range(utils.MAX_REDIRECTS + 1):
+            (status, reason, response_headers, body) = await self.request(method, uri, headers, timeout)
+            location = response_headers.get('Location')
+            if status in utils.REDIRECT_CODES and location:
+                if method not in ('GET', 'HEAD'):
+                    if status in (307, 308):
+                        raise urllib.error.HTTPError(uri, status, reason, response_headers, io.BytesIO(b''))
+                    method = 'GET'
+                uri = urllib.parse.urljoin(uri, location)
+                continue
+            if status >= 400:
+                raise urllib.error.HTTPError(uri, status, reason, response_headers, io.BytesIO(bytes(body)))
+            return (response_headers, body)
+
+        raise urllib.error.HTTPError(uri, status, "Too many redirects", response_headers, io.BytesIO(b''))
+
+
+class AsyncClient:
+    """Async API client with bounded concurrency and a shared connection pool.
+
+    The API methods take the same arguments and return the same values as
+    their utils counterparts, and share its retry policy and circuit breaker.
+    Cancelling a call closes its connection.
+    """
+
+    def __init__(self, max_concurrency=None, pool=None):
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+        self.pool = pool or AsyncHTTPConnectionPool()
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self):
+        return self.pool.stats()
+
+    async def load_json_from_uri(self, uri, method='GET', timeout=Config.SEGMENT_DOWNLOAD_TIMEOUT):
+        # Created lazily so the semaphore belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Same retry policy, circuit breaker and rate limiter as utils.call_with_retries
+        breaker = utils.get_circuit_breaker()
+        limiter = utils.get_rate_limiter()
+        host = urllib.parse.urlsplit(uri).netloc
+        attempt = 1
+        delay = None
+        while True:
+            breaker.before_request(host)
+            if limiter.enabled:
+                # File-backed buckets lock a file shared with other processes; keep that off the event loop
+                wait = await asyncio.to_thread(limiter.reserve, uri) if limiter.blocking else limiter.reserve(uri)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            try:
+                async with self._semaphore:
+                    (response_headers, body) = await self.pool.urlopen(uri, method, timeout=timeout)
+            except Exception as e:
+                delay = utils._retry_delay_after(host, method, e, attempt, delay)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success(host)
+            return utils._parse_json(body, response_headers.get_content_charset())
+
+    async def get_records(self, server, apikey, linkid, start, end, mode):
+        try:
+            url = "%s/api/%s?apikey=%s&start=%d&end=%d&linkid=%s" % (server, mode, apikey, start, end, linkid)
+            data = await self.load_json_from_uri(url)
+            return data
+
+        except urllib.error.HTTPError as e:
+            print("Error in checking status")
+            print(e.code)
+            print(e.read())
+            return None
+        except (json.JSONDecodeError, ValueError, ConnectionError) as e:
+            print(f"Exception in reading records: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error in reading records: {e}")
+            return None
+
+    async def send_command(self, server, apikey, command, params=None, method='GET'):
+        try:
+            url = "%s/api/%s?apikey=%s" % (server, command, apikey)
+            if params is not None:
+                for cur in params:
+                    url += "&%s" %(cur)
+
+            print("URL = ", url)
+            responsej = await self.load_json_from_uri(url, method, timeout=Config.DEFAULT_TIMEOUT)
+            return (200, responsej)
+        except urllib.error.HTTPError as e:
+            return (e.code, None)
+        except (json.JSONDecodeError, ValueError, ConnectionError) as e:
+            print(f"Exception in {command} command: {e}")
+            return (500, None)
+        except Exception as e:
+            print(f"Unexpected error in {command} command: {e}")
+            return (500, None)
+
+    async def get_all_status(self, server, key):
+        try:
+            url = "%s/api/status?apikey=%s" % (server, key)
+            result_json = await self.load_json_from_uri(url)
+            return result_json
+        except urllib.error.HTTPError as e:
+            print("Error in adding link")
+            print(e.code)
+            print(e.read().decode())
+            return None
+        except (json.JSONDecodeError, ValueError, ConnectionError) as e:
+            print(f"Exception in reading status: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error in reading status: {e}")
+            return None
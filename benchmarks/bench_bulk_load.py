@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compare update_db insert throughput: per-variant executemany against the
+BulkLoader staging tables + set-based merge, on synthetic SCTE-35 and alert
+records. Needs the MySQL server from Config (DB_HOST, DB_USER, DB_PASSWORD);
+a scratch database is created and dropped for every run."""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import update_db
+
+SCRATCH_DB = "hlsanalyzer_bench_bulk"
+
+
+def make_variants(variants, records, start=1700000000):
+    """[(variant_id, scte35 records, alert records)] with `records` of each per variant"""
+    result = []
+    for v in range(variants):
+        scte35 = []
+        alerts = []
+        for i in range(records):
+            ts = start + i * 10
+            if i % 2:
+                scte35.append({'timestamp': ts, 'scte35': "Cue In %d.0 seconds (variant %d)" % (30 + i % 60, v)})
+            else:
+                scte35.append({'timestamp': ts, 'scte35': "Cue Out splice %d (variant %d)" % (i, v)})
+            alerts.append({'timestamp': ts, 'alerts': "STREAM OUTAGE ALERT for variant %d lasted %d seconds" % (v, i % 120)})
+        result.append(("variant%05d" % v, scte35, alerts))
+    return result
+
+
+def load(db, cursor, data, bulk_rows):
+    loader = None
+    if bulk_rows:
+        loader = update_db.BulkLoader(cursor, bulk_rows)
+        loader.prepare()
+    batcher = update_db.CommitBatcher(db, loader=loader)
+    for (variant_id, scte35, alerts) in data:
+        for (populate, records) in ((update_db.populate_scte35, scte35), (update_db.populate_alerts, alerts)):
+            rows = populate(db, cursor, records, "master", variant_id, 1, commit=False, loader=loader)
+            if rows is None:
+                raise RuntimeError("Insert failed")
+            batcher.add(rows)
+    batcher.commit()
+    return batcher.stats()['rows']
+
+
+def run_case(name, data, bulk_rows):
+    db = update_db.connect_db()
+    if db is None:
+        sys.exit("Could not connect to database!")
+    cursor = db.cursor()
+    cursor.execute("DROP DATABASE IF EXISTS %s" % SCRATCH_DB)
+    update_db.prepare_database(db, cursor, SCRATCH_DB)
+    try:
+        start = time.perf_counter()
+        rows = load(db, cursor, data, bulk_rows)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<28} {rows:9d} rows {elapsed:8.2f} s {rows / elapsed:10.0f} rows/s")
+    finally:
+        cursor.execute("DROP DATABASE IF EXISTS %s" % SCRATCH_DB)
+        cursor.close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--variants', type=int, default=200,
+                        help='Variants to load (default: 200)')
+    parser.add_argument('--records', type=int, default=500,
+                        help='SCTE-35 and alert records per variant (default: 500)')
+    parser.add_argument('--bulk-rows', type=int, nargs='+', default=[500, 1000, 5000],
+                        help='BulkLoader batch sizes to try (default: 500 1000 5000)')
+    args = parser.parse_args()
+
+    data = make_variants(args.variants, args.records)
+    print(f"{args.variants} variants x {args.records} records")
+    run_case("executemany", data, None)
+    for bulk_rows in args.bulk_rows:
+        run_case(f"bulk ({bulk_rows} rows/INSERT)", data, bulk_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compare response body reading throughput: legacy 1000-byte str concatenation
+against utils._read_response on 1 MB, 10 MB and 100 MB JSON bodies."""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import utils
+
+
+def legacy_read(resource):
+    """The pre-bytearray implementation of utils._read_python3x"""
+    final = None
+    while True:
+        cur = resource.read(1000)
+        if (len(cur) == 0): break
+        if final is None:
+            final = ""
+        final += cur.decode(resource.headers.get_content_charset(failobj="utf-8"))
+
+    return final
+
+
+def make_body(size):
+    record = {"timestamp": 1234567890, "message": "Segment download timeout for segment_00042.ts"}
+    line = json.dumps(record).encode("utf-8")
+    count = max(1, size // (len(line) + 2))
+    return b'{"errors": [' + b", ".join([line] * count) + b"]}"
+
+
+def make_resource(body, content_length):
+    headers = http.client.HTTPMessage()
+    headers['Content-Type'] = 'application/json; charset=utf-8'
+    if content_length:
+        headers['Content-Length'] = str(len(body))
+    resource = io.BufferedReader(io.BytesIO(body))
+    resource.headers = headers
+    return resource
+
+
+def run_case(name, body, func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    mb = len(body) / (1024 * 1024)
+    print(f"  {name:<32} {best * 1000:10.1f} ms  {mb / best:10.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100],
+                        help='Body sizes in MB (default: 1 10 100)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per case; the best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    cases = [
+        ("legacy read", lambda b: legacy_read(make_resource(b, True))),
+        ("read_response (Content-Length)", lambda b: utils._read_response(make_resource(b, True))),
+        ("read_response (chunked)", lambda b: utils._read_response(make_resource(b, False))),
+        ("legacy read + json.loads", lambda b: json.loads(legacy_read(make_resource(b, True)))),
+        ("read_response + json.loads", lambda b: json.loads(utils._read_response(make_resource(b, True)))),
+    ]
+
+    for size in args.sizes:
+        body = make_body(size * 1024 * 1024)
+        print(f"{size} MB body ({len(body)} bytes)")
+        for (name, func) in cases:
+            run_case(name, body, func, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Measure records/second of record_parser on synthetic SCTE-35 and alert
+corpora, against the inline re.search loop update_db used before (which only
+extracted the summary duration) and against one re.search per field.
+"record_parser (summaries)" is the path update_db's populate_* functions take."""
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import record_parser
+
+SCTE35_TEMPLATES = (
+    "SCTE-35 Cue Out %(duration).1f seconds splice_event_id=%(splice)d",
+    "SCTE-35 Cue In %(duration).1f seconds",
+    "Cue-Out-Cont splice %(splice)d, %(duration).1f s remaining",
+    "SCTE-35 time signal without segmentation descriptor (%(splice)d)",
+)
+ALERT_TEMPLATES = (
+    "STREAM OUTAGE ALERT detected for %(minutes)d minutes",
+    "SCTE-35 ALERT CLEARED after %(seconds)d seconds",
+    "STREAM ALERT CLEARED for variant %(splice)d after %(seconds)d seconds",
+    "Playlist %(splice)d not updated",
+)
+
+
+def make_corpus(templates, field, count, seed=1):
+    rng = random.Random(seed)
+    return [{'timestamp': 1700000000 + i, field: rng.choice(templates) % {
+        'duration': rng.uniform(5, 120), 'splice': rng.randrange(1 << 20),
+        'minutes': rng.randrange(1, 60), 'seconds': rng.randrange(1, 600)}} for i in range(count)]
+
+
+def legacy_scte35(records):
+    """The pre-record_parser loop of update_db.populate_scte35"""
+    rows = 0
+    for cur in records:
+        record = cur["scte35"]
+        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()[0:8]
+        m = re.search(r"Cue In (\d+.\d+) seconds", record)
+        rows += 2 if m else 1
+    return rows
+
+
+def legacy_alerts(records):
+    """The pre-record_parser loop of update_db.populate_alerts"""
+    rows = 0
+    for cur in records:
+        record = cur["alerts"]
+        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()[0:8]
+        m = re.search(r"(SCTE-35|STREAM) (OUTAGE ALERT|ALERT CLEARED) .* (\d+) (minutes|seconds)", record)
+        rows += 2 if m else 1
+    return rows
+
+
+def per_field_scte35(records):
+    """All record_parser fields, one pattern searched per field"""
+    rows = 0
+    for cur in records:
+        record = cur["scte35"]
+        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()[0:8]
+        cue = re.search(r"Cue[ -]?(?:Out|In)(?:[ -]Cont(?:inued)?)?", record)
+        duration = re.search(r"(?<![\w.])(\d+(?:\.\d+)?) ?(?:seconds|secs?|s)\b", record)
+        splice = re.search(r"\b[Ss]plice(?:[ _-]?(?:event[ _-]?)?id)?[ =:#]*(0x[0-9A-Fa-f]+|\d+)", record)
+        rows += 2 if cue and duration else 1
+    return rows
+
+
+def per_field_alerts(records):
+    """All record_parser fields, one pattern searched per field"""
+    rows = 0
+    for cur in records:
+        record = cur["alerts"]
+        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()[0:8]
+        kind = re.search(r"(SCTE-35|STREAM) (OUTAGE ALERT|ALERT CLEARED)", record)
+        duration = re.search(r"(\d+(?:\.\d+)?) (minutes|seconds)", record)
+        rows += 2 if kind and duration else 1
+    return rows
+
+
+def parsed(mode):
+    def run(records):
+        return sum(2 if fields else 1 for (ts, record_hash, text, fields) in record_parser.parse_records(mode, records))
+    return run
+
+
+def summaries(mode):
+    def run(records):
+        return sum(2 if summary else 1 for (ts, record_hash, text, summary) in record_parser.parse_summaries(mode, records))
+    return run
+
+
+def run_case(name, records, func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(records)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {name:<26} {best:8.2f} s {len(records) / best:12.0f} records/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, nargs='+', default=[100000, 1000000],
+                        help='Corpus sizes (default: 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per case; the best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    for count in args.records:
+        for (label, templates, field, mode, legacy, per_field) in (
+                ("SCTE-35", SCTE35_TEMPLATES, 'scte35', 'stream/scte35cues', legacy_scte35, per_field_scte35),
+                ("alert", ALERT_TEMPLATES, 'alerts', 'stream/alertevents', legacy_alerts, per_field_alerts)):
+            records = make_corpus(templates, field, count)
+            print(f"{count} {label} records")
+            run_case("inline (duration only)", records, legacy, args.repeat)
+            run_case("inline (per field)", records, per_field, args.repeat)
+            run_case("record_parser (fields)", records, parsed(mode), args.repeat)
+            run_case("record_parser (summaries)", records, summaries(mode), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
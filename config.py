@@ -13,6 +13,52 @@ class Config:
     DEFAULT_TIMEOUT = 20
     SEGMENT_DOWNLOAD_TIMEOUT = 5
     
+    # HTTP Connection Pool Configuration
+    HTTP_POOL_MAXSIZE = 10  # Idle keep-alive connections kept per host
+    HTTP_POOL_IDLE_TIMEOUT = 30  # Seconds before an idle connection is evicted
+    READ_CHUNK_SIZE = 256 * 1024  # Bytes per read when streaming response bodies
+    HTTP_ACCEPT_ENCODING = 'gzip, deflate'  # Set to None to request uncompressed bodies
+    ASYNC_MAX_CONCURRENCY = 50  # In-flight requests per async_utils.AsyncClient
+    
+    # Retry and Circuit Breaker Configuration
+    RETRY_MAX_ATTEMPTS = 3  # Attempts per request, including the first
+    RETRY_BASE_DELAY = 0.5  # Seconds; lower bound of the jittered backoff
+    RETRY_MAX_DELAY = 20  # Seconds; upper bound of the jittered backoff
+    RETRY_MAX_RETRY_AFTER = 120  # Longest Retry-After delay that is honoured
+    RETRY_METHODS = ('GET', 'HEAD')  # Only idempotent requests are retried
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open a host's circuit (0 disables)
+    BREAKER_RESET_TIMEOUT = 30  # Seconds an open circuit rejects requests before a trial
+    
+    # Request Metrics Configuration ('stderr' or a JSON file path, written at exit)
+    REQUEST_METRICS = os.environ.get('HLSANALYZER_METRICS')
+    
+    # Rate Limit Configuration
+    RATE_LIMITS = {}  # {endpoint: (requests_per_second, burst)}, e.g. {'status': (1, 2), 'stream/errors': (10, 20)}
+    RATE_LIMIT_DEFAULT = None  # (requests_per_second, burst) for endpoints not listed in RATE_LIMITS
+    RATE_LIMIT_DIR = os.environ.get('HLSANALYZER_RATE_LIMIT_DIR')  # Share buckets across processes on this host
+    
+    # Record Fetch Configuration (utils.iter_records / get_records chunks)
+    RECORD_FETCH_CHUNKS = 4  # Sub-windows a time range is split into
+    RECORD_FETCH_WORKERS = 4  # Sub-windows fetched concurrently
+    RECORD_CHUNK_MIN_SECONDS = 6 * 3600  # get_all_errors / update_db ranges longer than this are fetched in chunks (None: never)
+    
+    # Error Report Configuration (get_all_errors.py)
+    ERROR_REPORT_CONCURRENCY = 8  # Links whose details are fetched in parallel
+    ERROR_WATERMARK_FILE = os.environ.get('HLSANALYZER_WATERMARK_FILE',
+                                          os.path.join(os.path.expanduser('~'), '.hlsanalyzer', 'error_watermarks.json'))
+    OUTPUT_BUFFER_SIZE = 64 * 1024  # Characters buffered before --output json/ndjson is written
+    SIGNATURE_MAX_LINKIDS = 20  # LinkIDs listed per error signature (all are counted)
+    SIGNATURE_MAX_SIGNATURES = 10000  # Distinct signatures kept before new ones are counted as 'other'
+    RECENT_PROBE_WINDOW = 3600  # Seconds of the first backward window probed by --max-per-link
+    
+    # HTTP Response Cache Configuration (disabled unless a directory is set)
+    HTTP_CACHE_DIR = os.environ.get('HLSANALYZER_CACHE_DIR')
+    HTTP_CACHE_TTL = 60  # Seconds to serve entries that have no ETag/Last-Modified
+    HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    HTTP_CACHE_ENDPOINTS = ('status', 'stream/errors', 'stream/warnings',
+                            'stream/scte35cues', 'stream/alertevents')
+    
     # SSE Configuration
     SSE_TIMEOUT = 30
     SSE_RECONNECT_DELAY = 5
@@ -21,6 +67,18 @@ class Config:
     # Database Configuration
     INTERVAL_MINUTES = 400  # Update interval for database operations
     MAX_DB_NAME_LENGTH = 64
+    DB_COMMIT_ROWS = 5000  # Rows written across variants before a commit
+    DB_COMMIT_SECONDS = 5  # Longest a batch stays uncommitted
+    DB_PARTITION_DAYS_AHEAD = 7  # Daily partitions kept ready past today
+    DB_PARTITION_HISTORY_DAYS = 90  # Older records share one partition when a table is first partitioned
+    DB_PARTITION_RETENTION_DAYS = None  # Drop daily partitions older than this; None keeps every day (one partition each)
+    INGEST_FETCH_WORKERS = 8  # Threads fetching records while a single writer inserts them
+    INGEST_QUEUE_SIZE = 32  # Fetched batches waiting for the writer before fetchers block
+    BULK_BATCH_ROWS = 1000  # Rows per multi-row INSERT into the staging tables with update_db --bulk
+    INGEST_DEDUP = True  # Skip rows whose key is already stored instead of sending them to MySQL
+    DB_POOL_SIZE = 2  # Connections kept open by update_db --daemon
+    DAEMON_INTERVAL = 300  # Seconds between update_db --daemon cycles
+    DAEMON_JITTER = 0.1  # Random +/- fraction of the interval, to spread out several daemons
     
     # Test Stream Configuration
     TEST_STREAM_URL = "https://bitdash-a.akamaihd.net/content/sintel/hls/video/500kbit.m3u8"
@@ -0,0 +1,135 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Collapse error and warning messages into signatures.
+
+A signature is the message with its variable parts masked (URLs, segment
+and playlist names, hex identifiers, numbers), so the same problem reported
+on hundreds of variants counts as one entry. Aggregation is a single pass
+over the records; memory grows with the number of distinct signatures, not
+with the number of records.
+"""
+
+import hashlib
+import re
+from config import Config
+
+# Applied in order: URLs first so their digits and file names are not masked separately
+_MASKS = (
+    (re.compile(r'\b[a-zA-Z][a-zA-Z0-9+.-]*://\S+'), '<url>'),
+    (re.compile(r'[\w.~%-]+\.m3u8\b', re.IGNORECASE), '<playlist>'),
+    (re.compile(r'[\w.~%-]+\.(?:ts|m4s|mp4|m4a|m4v|aac|ac3|ec3|mp3|vtt|webvtt)\b', re.IGNORECASE), '<segment>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<hex>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+)
+
+OVERFLOW = 'other'
+
+
+def normalize_message(message):
+    """Return the message with its variable parts masked"""
+    text = str(message)
+    for (pattern, replacement) in _MASKS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def signature_of(kind, pattern):
+    """Stable short identifier of a normalized message"""
+    return hashlib.sha1(("%s\0%s" % (kind, pattern)).encode('utf-8')).hexdigest()[:12]
+
+
+class SignatureAggregator:
+    """Counts records per signature and remembers which links reported them.
+
+    Feed it one link's records at a time with add_records(). Each signature
+    keeps its record count, the number of distinct links, the first and last
+    record timestamps, one example message and up to max_linkids LinkIDs.
+    Once max_signatures distinct signatures exist, further new ones are
+    counted under a single 'other' signature.
+    """
+
+    def __init__(self, max_linkids=None, max_signatures=None):
+        self.max_linkids = Config.SIGNATURE_MAX_LINKIDS if max_linkids is None else max_linkids
+        self.max_signatures = Config.SIGNATURE_MAX_SIGNATURES if max_signatures is None else max_signatures
+        self._signatures = {}
+        self.records = 0
+
+    def _entry(self, kind, pattern, example):
+        key = signature_of(kind, pattern)
+        entry = self._signatures.get(key)
+        if entry is None:
+            if len(self._signatures) >= self.max_signatures:
+                key = signature_of(kind, OVERFLOW)
+                entry = self._signatures.get(key)
+                (pattern, example) = (OVERFLOW, None)
+            if entry is None:
+                entry = {
+                    'signature': key,
+                    'kind': kind,
+                    'pattern': pattern,
+                    'example': example,
+                    'count': 0,
+                    'links': 0,
+                    'linkids': [],
+                    'first_seen': None,
+                    'last_seen': None,
+                }
+                self._signatures[key] = entry
+        return entry
+
+    def add_records(self, linkid, kind, records):
+        """Aggregate all `kind` ('error' or 'warning') records of one link"""
+        seen = set()
+        for record in records:
+            message = record.get('message', 'Unknown %s' % kind)
+            entry = self._entry(kind, normalize_message(message), message)
+            entry['count'] += 1
+            self.records += 1
+
+            timestamp = record.get('timestamp')
+            if timestamp is not None:
+                if entry['first_seen'] is None or timestamp < entry['first_seen']:
+                    entry['first_seen'] = timestamp
+                if entry['last_seen'] is None or timestamp > entry['last_seen']:
+                    entry['last_seen'] = timestamp
+
+            if entry['signature'] not in seen:
+                seen.add(entry['signature'])
+                entry['links'] += 1
+                if len(entry['linkids']) < self.max_linkids:
+                    entry['linkids'].append(linkid)
+
+    def merge(self, other):
+        """Add the counts of another aggregator built from a disjoint set of links"""
+        for theirs in other._signatures.values():
+            entry = self._entry(theirs['kind'], theirs['pattern'], theirs['example'])
+            entry['count'] += theirs['count']
+            entry['links'] += theirs['links']
+            room = self.max_linkids - len(entry['linkids'])
+            if room > 0:
+                entry['linkids'].extend(theirs['linkids'][:room])
+            for (key, pick) in (('first_seen', min), ('last_seen', max)):
+                if theirs[key] is not None:
+                    entry[key] = theirs[key] if entry[key] is None else pick(entry[key], theirs[key])
+        self.records += other.records
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def summary(self, limit=None):
+        """Signatures ordered by record count, most frequent first"""
+        entries = sorted(self._signatures.values(), key=lambda entry: (-entry['count'], -entry['links'], entry['pattern']))
+        if limit is not None:
+            entries = entries[:limit]
+        return [dict(entry, linkids=list(entry['linkids'])) for entry in entries]
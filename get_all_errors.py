@@ -10,10 +10,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import urllib.request
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import heapq
 import json
-import utils
 import os
+import sys
+import tempfile
+import time
+import zlib
+import error_signatures
+import utils
 from config import Config
 
 
@@ -26,120 +35,900 @@ def process_link_status(link_status):
     return (error_count, warning_count, timestamp, linkid)
 
 
-def get_all_errors():
+def collect_links(status):
+    """Flatten the status tree into report order: each master or media link
+    followed by its variants.
+
+    Each entry is a dict with kind ('master', 'media' or 'variant'), name,
+    the counts, timestamp and linkid, and has_errors / has_warnings flags
+    telling whether details should be fetched.
+    """
+    links = []
+    for hls_link in status.keys():
+        link_status = status[hls_link]
+        (error_count, warning_count, timestamp, linkid) = process_link_status(link_status)
+        links.append({
+            'kind': 'master' if 'Variants' in link_status else 'media',
+            'name': hls_link,
+            'errors': error_count,
+            'warnings': warning_count,
+            'timestamp': timestamp,
+            'linkid': linkid,
+            'has_errors': int(float(error_count)) > 0,
+            'has_warnings': int(float(warning_count)) > 0,
+        })
+
+        if 'Variants' in link_status:
+            variant_status = link_status['Variants']
+            for variant in variant_status.keys():
+                (error_count, warning_count, timestamp, linkid) = process_link_status(variant_status[variant])
+                links.append({
+                    'kind': 'variant',
+                    'name': variant,
+                    'master': hls_link,
+                    'errors': error_count,
+                    'warnings': warning_count,
+                    'timestamp': timestamp,
+                    'linkid': linkid,
+                    'has_errors': float(error_count) > 0,
+                    'has_warnings': float(warning_count) > 0,
+                })
+    return links
+
+
+def top_links(links, k):
+    """Return the k links with the most errors (then warnings), worst first.
+
+    Uses a bounded heap, so ranking n links costs O(n log k). Links without
+    errors or warnings are never ranked; ties keep report order. Each
+    returned link gets its 1-based 'rank'.
+    """
+    candidates = (link for link in links if link['has_errors'] or link['has_warnings'])
+    ranked = heapq.nlargest(k, candidates, key=lambda link: (float(link['errors']), float(link['warnings'])))
+    for (rank, link) in enumerate(ranked, 1):
+        link['rank'] = rank
+    return ranked
+
+
+def load_watermarks(path):
+    """Return the {linkid: timestamp} watermarks saved by a previous run"""
+    try:
+        with open(path) as f:
+            watermarks = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable watermark file {path}: {e}")
+        return {}
+    return watermarks if isinstance(watermarks, dict) else {}
+
+
+def save_watermarks(path, watermarks):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    (fd, tmp_path) = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(watermarks, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def apply_watermarks(links, watermarks, since=None):
+    """Set each link's fetch start just past its watermark, or past `since` when given"""
+    for link in links:
+        start = since if since is not None else watermarks.get(link['linkid'])
+        if start is not None:
+            link['start'] = start + 1
+
+
+def _needs_fetch(link, flag):
+    return link[flag] and link.get('start', 0) <= link['timestamp']
+
+
+def fetch_recent(server, apikey, linkid, start, end, mode, limit, window=None):
+    """Fetch the newest `limit` records of one link in [start, end].
+
+    Probes backwards from end in windows that double in size each step,
+    beginning with `window` seconds, and stops as soon as `limit` records are
+    collected or start is reached, so the cost depends on `limit` rather
+    than on the age of the link. Returns {key: records} with the records in
+    timestamp order, or None if a request failed.
+    """
+    key = mode.split('/')[-1]
+    window = window or Config.RECENT_PROBE_WINDOW
+    collected = []
+    high = end
+    while high >= start:
+        low = max(start, high - window + 1)
+        data = utils.get_records(server, apikey, linkid, low, high, mode=mode)
+        if data is None:
+            return None
+        collected.extend(_detail_records(data, key))
+        if len(collected) >= limit:
+            break
+        high = low - 1
+        window *= 2
+
+    collected.sort(key=lambda record: record.get('timestamp', 0))
+    return {key: collected[-limit:] if limit else []}
+
+
+def fetch_details(server, apikey, link):
+    """Fetch the error and warning records of one link in [start, timestamp].
+
+    With a 'limit' on the link only its newest `limit` records of each kind
+    are fetched (see fetch_recent). Long ranges are fetched as concurrent
+    sub-windows (see utils.record_chunks).
+
+    Returns (error_data, warning_data); an entry is None when the link has no
+    such events, nothing new since its start, or the request failed.
+    """
+    start = link.get('start', 0)
+    limit = link.get('limit')
+    error_data = None
+    warning_data = None
+    for (flag, mode) in (('has_errors', "stream/errors"), ('has_warnings', "stream/warnings")):
+        if not _needs_fetch(link, flag):
+            continue
+        if limit is not None:
+            data = fetch_recent(server, apikey, link['linkid'], start, link['timestamp'], mode, limit)
+        else:
+            data = utils.get_records(server, apikey, link['linkid'], start, link['timestamp'], mode=mode,
+                                     chunks=utils.record_chunks(start, link['timestamp']))
+        if flag == 'has_errors':
+            error_data = data
+        else:
+            warning_data = data
+    return (error_data, warning_data)
+
+
+def fetch_succeeded(link, details):
+    """True when every request the link needed returned data"""
+    (error_data, warning_data) = details
+    if _needs_fetch(link, 'has_errors') and error_data is None:
+        return False
+    if _needs_fetch(link, 'has_warnings') and warning_data is None:
+        return False
+    return True
+
+
+def iter_details(server, apikey, links, concurrency=1):
+    """Yield (link, (error_data, warning_data)) in the order of links.
+
+    With concurrency > 1 details are fetched by a pool of that many threads.
+    At most 2 * concurrency fetches are outstanding, so results are never
+    buffered far ahead of the report being printed.
+    """
+    if concurrency <= 1:
+        for link in links:
+            yield (link, fetch_details(server, apikey, link))
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = collections.deque()
+        try:
+            for link in links:
+                pending.append((link, executor.submit(fetch_details, server, apikey, link)))
+                if len(pending) >= 2 * concurrency:
+                    (done, future) = pending.popleft()
+                    yield (done, future.result())
+            while pending:
+                (done, future) = pending.popleft()
+                yield (done, future.result())
+        finally:
+            for (_, future) in pending:
+                future.cancel()
+
+
+def print_link(link, details):
+    """Print the report lines of one link"""
+    (error_data, warning_data) = details
+    linkid = link['linkid']
+
+    if 'rank' in link:
+        if link['kind'] == 'variant':
+            print("#%d Variant [%s] of MASTER [%s]" %(link['rank'], link['name'], link['master']))
+        else:
+            print("#%d %s [%s]" %(link['rank'], link['kind'].upper(), link['name']))
+    elif link['kind'] == 'master':
+        print("MASTER [%s]" %(link['name']))
+    elif link['kind'] == 'media':
+        print("MEDIA [%s]" %(link['name']))
+    else:
+        print("|-- Variant [%s] "%(link['name']))
+
+    if link.get('change') == 'changed':
+        print(f"    🔄 Errors {link['errors_delta']:+d}, Warnings {link['warnings_delta']:+d} since last poll")
+
+    # Display error count and details
+    if link['has_errors']:
+        print(f"    🚨 {link['errors']} Error(s) - LinkID: {linkid}")
+        if error_data and 'errors' in error_data:
+            for error in error_data['errors']:
+                print(f"        ❌ {error.get('message', 'Unknown error')}")
+                if 'timestamp' in error:
+                    print(f"           Time: {error['timestamp']}")
+
+    # Display warning count and details
+    if link['has_warnings']:
+        print(f"    ⚠️  {link['warnings']} Warning(s) - LinkID: {linkid}")
+        if warning_data and 'warnings' in warning_data:
+            for warning in warning_data['warnings']:
+                print(f"        ⚠️  {warning.get('message', 'Unknown warning')}")
+                if 'timestamp' in warning:
+                    print(f"           Time: {warning['timestamp']}")
+
+    # Show status if no errors or warnings
+    if not link['has_errors'] and not link['has_warnings']:
+        print(f"    ✅ No errors or warnings - LinkID: {linkid}")
+
+
+class RecordWriter:
+    """Buffers output text and writes it to `out` in large blocks.
+
+    Pending text is written once it exceeds buffer_size bytes or has been
+    held for flush_interval seconds, so a slow report still streams.
+    """
+
+    def __init__(self, out, buffer_size=None, flush_interval=1.0):
+        self.out = out
+        self.buffer_size = Config.OUTPUT_BUFFER_SIZE if buffer_size is None else buffer_size
+        self.flush_interval = flush_interval
+        self._parts = []
+        self._size = 0
+        self._since = None
+
+    def write(self, text):
+        if not self._parts:
+            self._since = time.monotonic()
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size or time.monotonic() - self._since >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.out.write(''.join(self._parts))
+            self._parts = []
+            self._size = 0
+        self.out.flush()
+
+
+def _link_record(link):
+    record = {
+        'kind': link['kind'],
+        'name': link['name'],
+        'linkid': link['linkid'],
+        'errors': int(float(link['errors'])),
+        'warnings': int(float(link['warnings'])),
+        'timestamp': link['timestamp'],
+    }
+    if 'master' in link:
+        record['master'] = link['master']
+    for key in ('rank', 'change', 'errors_delta', 'warnings_delta'):
+        if key in link:
+            record[key] = link[key]
+    return record
+
+
+def _detail_records(data, key):
+    if data and key in data:
+        return data[key]
+    return []
+
+
+class TextReport:
+    """The human-readable report printed to the terminal"""
+
+    def start(self):
+        print("="*60)
+        print("HLSAnalyzer Error and Warning Report")
+        print("="*60)
+
+    def link(self, link, details):
+        print_link(link, details)
+
+    def write_fragment(self, text, continued=False):
+        if text:
+            print(text, end='')
+
+    def failed(self, message):
+        print(f"❌ {message}")
+
+    def cycle(self, info):
+        if info['cycle'] > 1:
+            print(f"\n[{time.strftime('%H:%M:%S', time.localtime(info['time']))}] Cycle {info['cycle']}: "
+                  f"{info['changed']} of {info['links']} link(s) changed")
+            for linkid in info['removed']:
+                print(f"    ➖ Removed - LinkID: {linkid}")
+
+    def finish(self, summary):
+        if summary.get('cycle', 1) > 1:
+            print(f"    {summary['detail_requests']} detail request(s) in {summary['fetch_seconds']:.2f}s")
+            return
+
+        print("\n" + "="*60)
+        print("SUMMARY")
+        print("="*60)
+        print(f"Total streams monitored: {summary['streams']}")
+        print(f"Total errors found: {summary['errors']}")
+        print(f"Total warnings found: {summary['warnings']}")
+        if 'reported' in summary:
+            print(f"Links reported: top {summary['reported']} by errors")
+        print(f"Detail requests: {summary['detail_requests']} in {summary['fetch_seconds']:.2f}s "
+              f"(concurrency {summary['concurrency']}"
+              + (f" x {summary['processes']} processes)" if 'processes' in summary else ")"))
+        if summary.get('decoded_bytes'):
+            print(f"Detail transfer: {summary['wire_bytes'] / 1024:.1f} KB on the wire, "
+                  f"{summary['decoded_bytes'] / 1024:.1f} KB decoded "
+                  f"({summary['decoded_bytes'] / max(1, summary['wire_bytes']):.1f}x)")
+
+        if summary['errors'] == 0 and summary['warnings'] == 0:
+            print("🎉 All streams are healthy!")
+        elif summary['errors'] > 0:
+            print("🚨 Issues found that require attention!")
+        else:
+            print("⚠️  Some warnings detected, monitoring recommended")
+
+
+class NdjsonReport:
+    """One JSON object per line: a 'link' record followed by its 'error' and
+    'warning' records, and a final 'summary' record"""
+
+    def __init__(self, out=None):
+        self.writer = RecordWriter(out or sys.stdout)
+
+    def _emit(self, record):
+        self.writer.write(json.dumps(record, default=str) + "\n")
+
+    def start(self):
+        pass
+
+    def link(self, link, details):
+        (error_data, warning_data) = details
+        record = _link_record(link)
+        record['type'] = 'link'
+        self._emit(record)
+        for error in _detail_records(error_data, 'errors'):
+            self._emit(dict(error, type='error', linkid=link['linkid']))
+        for warning in _detail_records(warning_data, 'warnings'):
+            self._emit(dict(warning, type='warning', linkid=link['linkid']))
+
+    def failed(self, message):
+        self.writer.flush()
+        print(message, file=sys.stderr)
+
+    def cycle(self, info):
+        self._emit(dict(info, type='cycle'))
+
+    def write_fragment(self, text, continued=False):
+        if text:
+            self.writer.write(text)
+
+    def finish(self, summary):
+        self._emit(dict(summary, type='summary'))
+        self.writer.flush()
+
+
+class JsonReport:
+    """A single JSON document {"links": [...], "summary": {...}} written
+    incrementally, one link at a time"""
+
+    def __init__(self, out=None):
+        self.writer = RecordWriter(out or sys.stdout)
+        self._first = True
+
+    def start(self):
+        self.writer.write('{"links": [')
+
+    def link(self, link, details):
+        (error_data, warning_data) = details
+        record = _link_record(link)
+        record['error_records'] = _detail_records(error_data, 'errors')
+        record['warning_records'] = _detail_records(warning_data, 'warnings')
+        self.writer.write(('\n' if self._first else ',\n') + json.dumps(record, default=str))
+        self._first = False
+
+    def write_fragment(self, text, continued=False):
+        """Append link records rendered by another JsonReport; continued text
+        carries on the fragment written before it"""
+        if text:
+            self.writer.write(text if self._first or continued else ',' + text)
+            self._first = False
+
+    def failed(self, message):
+        self.writer.write('\n], "error": %s}\n' % json.dumps(message))
+        self.writer.flush()
+        print(message, file=sys.stderr)
 
+    def finish(self, summary):
+        self.writer.write('\n], "summary": %s}\n' % json.dumps(summary))
+        self.writer.flush()
+
+
+class SignatureReport:
+    """Collapses every error and warning into signatures instead of listing
+    them per link; the signature table is written when the report finishes"""
+
+    def __init__(self, output='text', out=None, limit=None):
+        self.output = output
+        self.limit = limit
+        self.aggregator = error_signatures.SignatureAggregator()
+        self.writer = RecordWriter(out or sys.stdout) if output != 'text' else None
+
+    def start(self):
+        if self.output == 'text':
+            print("="*60)
+            print("HLSAnalyzer Error and Warning Signatures")
+            print("="*60)
+
+    def link(self, link, details):
+        (error_data, warning_data) = details
+        self.aggregator.add_records(link['linkid'], 'error', _detail_records(error_data, 'errors'))
+        self.aggregator.add_records(link['linkid'], 'warning', _detail_records(warning_data, 'warnings'))
+
+    def failed(self, message):
+        if self.output == 'text':
+            print(f"❌ {message}")
+        else:
+            print(message, file=sys.stderr)
+
+    def write_fragment(self, text, continued=False):
+        pass
+
+    def finish(self, summary):
+        signatures = self.aggregator.summary(self.limit)
+        summary = dict(summary, signatures=len(self.aggregator), records=self.aggregator.records)
+
+        if self.output == 'ndjson':
+            for entry in signatures:
+                self.writer.write(json.dumps(dict(entry, type='signature'), default=str) + "\n")
+            self.writer.write(json.dumps(dict(summary, type='summary')) + "\n")
+            self.writer.flush()
+            return
+        if self.output == 'json':
+            self.writer.write(json.dumps({'signatures': signatures, 'summary': summary}, default=str) + "\n")
+            self.writer.flush()
+            return
+
+        for entry in signatures:
+            icon = "❌" if entry['kind'] == 'error' else "⚠️ "
+            print(f"{icon} {entry['count']}x on {entry['links']} link(s): {entry['pattern']}")
+            if entry['example'] is not None:
+                print(f"        e.g. {entry['example']}")
+            more = entry['links'] - len(entry['linkids'])
+            print(f"        LinkIDs: {', '.join(entry['linkids'])}" + (f" (+{more} more)" if more > 0 else ""))
+        TextReport().finish(summary)
+        print(f"Distinct signatures: {summary['signatures']} from {summary['records']} record(s)")
+
+
+REPORT_FORMATS = {
+    'text': TextReport,
+    'ndjson': NdjsonReport,
+    'json': JsonReport,
+}
+
+
+def _credentials():
+    """Return (server, apikey), or None after printing why they are missing"""
     try:
         server = Config.get_server_url()
     except ValueError as e:
         print(str(e))
-        return
-        
+        return None
+
     apikey = Config.API_KEY
     if not apikey:
         print("Error: HLSANALYZER_APIKEY environment variable is not set.")
+        return None
+    return (server, apikey)
+
+
+def report_links(server, apikey, links, report, concurrency=1, watermarks=None, failed=None):
+    """Fetch details for links, pass each to the report and return the summary.
+
+    When watermarks is a dict, links whose details were fetched successfully
+    advance their watermark to the link timestamp. When failed is a set, the
+    LinkIDs whose details could not be fetched are added to it.
+    """
+    total_streams = 0
+    total_errors = 0
+    total_warnings = 0
+    fetches = sum(_needs_fetch(link, 'has_errors') + _needs_fetch(link, 'has_warnings') for link in links)
+
+    transfer_start = utils.get_transfer_stats()
+    fetch_start = time.perf_counter()
+    for (link, details) in iter_details(server, apikey, links, concurrency):
+        total_streams += 1
+        total_errors += int(float(link['errors']))
+        total_warnings += int(float(link['warnings']))
+        report.link(link, details)
+        succeeded = fetch_succeeded(link, details)
+        if watermarks is not None and succeeded:
+            watermarks[link['linkid']] = max(link['timestamp'], watermarks.get(link['linkid'], link['timestamp']))
+        if failed is not None and not succeeded:
+            failed.add(link['linkid'])
+    fetch_time = time.perf_counter() - fetch_start
+    transfer = utils.get_transfer_stats()
+
+    return {
+        'streams': total_streams,
+        'errors': total_errors,
+        'warnings': total_warnings,
+        'detail_requests': fetches,
+        'fetch_seconds': round(fetch_time, 3),
+        'concurrency': concurrency,
+        'wire_bytes': transfer['wire_bytes'] - transfer_start['wire_bytes'],
+        'decoded_bytes': transfer['decoded_bytes'] - transfer_start['decoded_bytes'],
+    }
+
+
+def shard_of(linkid, shards):
+    """Stable shard number of a LinkID (the same in every process and run)"""
+    return zlib.crc32(str(linkid).encode('utf-8')) % shards
+
+
+SHARD_CHUNK_SIZE = 64 * 1024      # Characters copied per read of a shard's output file
+
+
+def _report_shard(server, apikey, links, concurrency, output, signatures, track_watermarks, path):
+    """Worker process: fetch one shard and render it into the file at `path`,
+    returning its summary"""
+    with open(path, 'w', encoding='utf-8', newline='') as stream:
+        if signatures:
+            report = SignatureReport(output, stream)
+        elif output == 'text':
+            report = TextReport()
+        else:
+            report = REPORT_FORMATS[output](stream)
+        watermarks = {} if track_watermarks else None
+
+        redirect = contextlib.redirect_stdout(stream) if output == 'text' else contextlib.nullcontext()
+        with redirect:
+            summary = report_links(server, apikey, links, report, concurrency, watermarks)
+        if output != 'text' and not signatures:
+            report.writer.flush()
+
+    return {
+        'summary': summary,
+        'watermarks': watermarks,
+        'signatures': report.aggregator if signatures else None,
+    }
+
+
+def _stream_shard(stream, future, report, poll=0.05):
+    """Copy a shard's output to the report as its worker writes it"""
+    continued = False
+    while True:
+        done = future.done()
+        chunk = stream.read(SHARD_CHUNK_SIZE)
+        if chunk:
+            report.write_fragment(chunk, continued)
+            continued = True
+        elif done:
+            return
+        else:
+            concurrent.futures.wait([future], timeout=poll)
+
+
+def report_links_sharded(server, apikey, links, report, processes, concurrency=1, watermarks=None,
+                         output='text', signatures=False):
+    """Like report_links, but split the links into `processes` shards by LinkID
+    hash and fetch and render each shard in its own process.
+
+    Variants go to the shard of their master's LinkID, so a master is always
+    rendered together with its variants. Within a shard links keep report
+    order. Workers render into temporary files that are streamed to the
+    report while they are written, in shard order, so neither process holds
+    a shard's output in memory. Per-shard summaries are merged into one
+    summary with the same totals as a single-process run.
+    """
+    masters = {link['name']: link['linkid'] for link in links if link['kind'] == 'master'}
+    shards = [[] for _ in range(processes)]
+    for link in links:
+        key = masters.get(link['master'], link['master']) if link['kind'] == 'variant' else link['linkid']
+        shards[shard_of(key, processes)].append(link)
+
+    # Forked workers must not share the parent's keep-alive sockets
+    utils.close_pool()
+
+    summary = {'streams': 0, 'errors': 0, 'warnings': 0, 'detail_requests': 0, 'wire_bytes': 0, 'decoded_bytes': 0}
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='hlsanalyzer-shards-') as directory, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        jobs = []
+        for (number, shard) in enumerate(shards):
+            if not shard:
+                continue
+            path = os.path.join(directory, 'shard%d' % number)
+            open(path, 'w').close()
+            jobs.append((path, executor.submit(_report_shard, server, apikey, shard, concurrency, output,
+                                               signatures, watermarks is not None, path)))
+        for (path, future) in jobs:
+            with open(path, encoding='utf-8', newline='') as stream:
+                _stream_shard(stream, future, report)
+            result = future.result()
+            if signatures:
+                report.aggregator.merge(result['signatures'])
+            for key in summary:
+                summary[key] += result['summary'][key]
+            if watermarks is not None:
+                watermarks.update(result['watermarks'])
+
+    summary['fetch_seconds'] = round(time.perf_counter() - started, 3)
+    summary['concurrency'] = concurrency
+    summary['processes'] = processes
+    return summary
+
+
+def _save_watermarks(state_file, watermarks, output):
+    try:
+        save_watermarks(state_file, watermarks)
+    except OSError as e:
+        print(f"Failed to save watermarks to {state_file}: {e}", file=sys.stderr if output != 'text' else sys.stdout)
+
+
+def get_all_errors(concurrency=1, since=None, state_file=None, output='text', out=None, top=None,
+                   signatures=False, processes=1, max_per_link=None):
+    """Report the errors and warnings of every monitored link.
+
+    since: only fetch records newer than this timestamp.
+    state_file: incremental mode; only fetch records newer than each link's
+    watermark from the previous run, then advance the watermarks.
+    output: 'text', 'ndjson' or 'json'; machine-readable formats are
+    written to `out` (default stdout) as each link completes.
+    top: only report the `top` links with the most errors, worst first.
+    signatures: aggregate messages into signatures across all links instead
+    of listing them per link.
+    processes: with more than one, links are sharded across that many worker
+    processes (each running `concurrency` fetch threads). Ignored with top,
+    whose links must be written in rank order.
+    max_per_link: only fetch the newest N errors and N warnings of each link.
+    """
+    credentials = _credentials()
+    if credentials is None:
         return
+    (server, apikey) = credentials
 
-    print("="*60)
-    print("HLSAnalyzer Error and Warning Report")
-    print("="*60)
+    if signatures:
+        report = SignatureReport(output, out)
+    else:
+        report = TextReport() if output == 'text' else REPORT_FORMATS[output](out)
+    report.start()
 
     #Get the status for all the links
     result = utils.get_all_status(server, apikey)
 
     if result is not None:
-        total_streams = 0
-        total_errors = 0
-        total_warnings = 0
         #Traverse all HLS links being monitored.
         # Each link can be either a master playlist with variants, or a single Media playlist
-        for hls_link in result['status'].keys():
-            link_status = result['status'][hls_link]
-            has_variants = False
-            if 'Variants' in link_status:
-                print("MASTER [%s]" %(hls_link))
-                has_variants = True
-            else:
-                print("MEDIA [%s]" %(hls_link))
-
-            (error_count, warning_count, timestamp, linkid) = process_link_status(link_status)
-            total_streams += 1
-            total_errors += int(float(error_count))
-            total_warnings += int(float(warning_count))
-            
-            # Display error count and details
-            if int(float(error_count)) > 0:
-                print(f"    🚨 {error_count} Error(s) - LinkID: {linkid}")
-                error_data = utils.get_records(server, apikey, linkid, 0, timestamp, mode="stream/errors")
-                if error_data and 'errors' in error_data:
-                    for error in error_data['errors']:
-                        print(f"        ❌ {error.get('message', 'Unknown error')}")
-                        if 'timestamp' in error:
-                            print(f"           Time: {error['timestamp']}")
-            
-            # Display warning count and details  
-            if int(float(warning_count)) > 0:
-                print(f"    ⚠️  {warning_count} Warning(s) - LinkID: {linkid}")
-                warning_data = utils.get_records(server, apikey, linkid, 0, timestamp, mode="stream/warnings")
-                if warning_data and 'warnings' in warning_data:
-                    for warning in warning_data['warnings']:
-                        print(f"        ⚠️  {warning.get('message', 'Unknown warning')}")
-                        if 'timestamp' in warning:
-                            print(f"           Time: {warning['timestamp']}")
-            
-            # Show status if no errors or warnings
-            if int(float(error_count)) == 0 and int(float(warning_count)) == 0:
-                print(f"    ✅ No errors or warnings - LinkID: {linkid}")
-
-            if has_variants:
-                variant_status = result['status'][hls_link]['Variants']
-                for variant in variant_status.keys():
-                    print("|-- Variant [%s] "%(variant))
-                    (error_count, warning_count, timestamp, linkid) = process_link_status(variant_status[variant])
-                    total_streams += 1
-                    total_errors += int(float(error_count))
-                    total_warnings += int(float(warning_count))
-                    
-                    # Display variant error details
-                    if float(error_count) > 0:
-                        print(f"    🚨 {error_count} Error(s) - LinkID: {linkid}")
-                        error_data = utils.get_records(server, apikey, linkid, 0, timestamp, "stream/errors")
-                        if error_data and 'errors' in error_data:
-                            for error in error_data['errors']:
-                                print(f"        ❌ {error.get('message', 'Unknown error')}")
-                                if 'timestamp' in error:
-                                    print(f"           Time: {error['timestamp']}")
-                    
-                    # Display variant warning details
-                    if float(warning_count) > 0:
-                        print(f"    ⚠️  {warning_count} Warning(s) - LinkID: {linkid}")
-                        warning_data = utils.get_records(server, apikey, linkid, 0, timestamp, "stream/warnings")
-                        if warning_data and 'warnings' in warning_data:
-                            for warning in warning_data['warnings']:
-                                print(f"        ⚠️  {warning.get('message', 'Unknown warning')}")
-                                if 'timestamp' in warning:
-                                    print(f"           Time: {warning['timestamp']}")
-                    
-                    # Show variant status if no errors or warnings
-                    if float(error_count) == 0 and float(warning_count) == 0:
-                        print(f"    ✅ No errors or warnings - LinkID: {linkid}")
-
-        # Print summary
-        print("\n" + "="*60)
-        print("SUMMARY")
-        print("="*60)
-        print(f"Total streams monitored: {total_streams}")
-        print(f"Total errors found: {total_errors}")
-        print(f"Total warnings found: {total_warnings}")
-        
-        if total_errors == 0 and total_warnings == 0:
-            print("🎉 All streams are healthy!")
-        elif total_errors > 0:
-            print("🚨 Issues found that require attention!")
+        links = collect_links(result['status'])
+        selected = top_links(links, top) if top is not None else links
+        watermarks = load_watermarks(state_file) if state_file else None
+        apply_watermarks(selected, watermarks or {}, since)
+        if max_per_link is not None:
+            for link in selected:
+                link['limit'] = max_per_link
+
+        if processes > 1 and top is None:
+            summary = report_links_sharded(server, apikey, selected, report, processes, concurrency,
+                                           watermarks, output, signatures)
         else:
-            print("⚠️  Some warnings detected, monitoring recommended")
+            summary = report_links(server, apikey, selected, report, concurrency, watermarks)
+        if top is not None:
+            # Totals still describe the whole account, not just the ranked links
+            summary['reported'] = summary['streams']
+            summary['streams'] = len(links)
+            summary['errors'] = sum(int(float(link['errors'])) for link in links)
+            summary['warnings'] = sum(int(float(link['warnings'])) for link in links)
+
+        if state_file:
+            _save_watermarks(state_file, watermarks, output)
+        report.finish(summary)
+    else:
+        report.failed("Failed to retrieve status information")
+
+
+def snapshot_links(links):
+    """Return {linkid: (errors, warnings, timestamp)} for diffing later polls"""
+    return {link['linkid']: (link['errors'], link['warnings'], link['timestamp']) for link in links}
+
+
+def diff_links(links, previous):
+    """Return (changed, removed) between a status poll and the previous snapshot.
+
+    A link has changed when it is new, when its error or warning count differs,
+    or when its timestamp advanced while it has errors or warnings. Changed
+    links only fetch records newer than the previous timestamp, and carry
+    'change' ('new' or 'changed') plus error/warning deltas.
+    """
+    changed = []
+    seen = set()
+    for link in links:
+        linkid = link['linkid']
+        seen.add(linkid)
+        if linkid not in previous:
+            link['change'] = 'new'
+            changed.append(link)
+            continue
+
+        (errors, warnings, timestamp) = previous[linkid]
+        counts_changed = float(link['errors']) != float(errors) or float(link['warnings']) != float(warnings)
+        advanced = link['timestamp'] != timestamp and (link['has_errors'] or link['has_warnings'])
+        if counts_changed or advanced:
+            link['change'] = 'changed'
+            link['errors_delta'] = int(float(link['errors'])) - int(float(errors))
+            link['warnings_delta'] = int(float(link['warnings'])) - int(float(warnings))
+            link['start'] = max(link.get('start', 0), timestamp + 1)
+            changed.append(link)
+    removed = sorted(linkid for linkid in previous if linkid not in seen)
+    return (changed, removed)
+
+
+def watch_errors(interval, concurrency=1, since=None, state_file=None, output='text', out=None,
+                 cycles=None, sleep=time.sleep):
+    """Poll the status every `interval` seconds and report only what changed.
+
+    The first cycle is a full report (honouring since / state_file); later
+    cycles fetch details only for links that changed since the previous poll.
+    Links new to a later cycle honour since / state_file as well.
+    Runs until interrupted, or for `cycles` polls.
+    """
+    credentials = _credentials()
+    if credentials is None:
+        return
+    (server, apikey) = credentials
+
+    report = TextReport() if output == 'text' else REPORT_FORMATS[output](out)
+    report.start()
+    watermarks = load_watermarks(state_file) if state_file else None
+    previous = None
+    cycle = 0
+
+    while cycles is None or cycle < cycles:
+        if cycle:
+            sleep(interval)
+        cycle += 1
+
+        result = utils.get_all_status(server, apikey)
+        if result is None:
+            report.failed("Failed to retrieve status information")
+            continue
+
+        links = collect_links(result['status'])
+        if previous is None:
+            apply_watermarks(links, watermarks or {}, since)
+            (selected, removed) = (links, [])
+        else:
+            (selected, removed) = diff_links(links, previous)
+            # New links (including ones whose first fetch failed) start like a full report
+            apply_watermarks([link for link in selected if link['change'] == 'new'], watermarks or {}, since)
+
+        report.cycle({
+            'cycle': cycle,
+            'time': int(time.time()),
+            'links': len(links),
+            'changed': len(selected),
+            'removed': removed,
+        })
+        failed = set()
+        summary = report_links(server, apikey, selected, report, concurrency, watermarks, failed)
+        summary['cycle'] = cycle
+
+        # Links whose details could not be fetched keep their old snapshot entry
+        # (or none, if new) so the next poll sees them as changed and retries
+        snapshot = snapshot_links(links)
+        for linkid in failed:
+            if previous is not None and linkid in previous:
+                snapshot[linkid] = previous[linkid]
+            else:
+                snapshot.pop(linkid, None)
+        previous = snapshot
+        if state_file:
+            _save_watermarks(state_file, watermarks, output)
+        report.finish(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report errors and warnings for all monitored HLS streams',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Full report, fetching details with the default number of workers
+  python get_all_errors.py
+
+  # Fetch details serially
+  python get_all_errors.py --concurrency 1
+
+  # Only events recorded since the previous --incremental run
+  python get_all_errors.py --incremental
+
+  # Only events after a given timestamp
+  python get_all_errors.py --since 1700000000
+
+  # One JSON record per line for a log pipeline
+  python get_all_errors.py --output ndjson | your-log-shipper
+
+  # Poll every 60 seconds and report only links that changed
+  python get_all_errors.py --watch 60
+
+  # Incident view: only the 10 links with the most errors
+  python get_all_errors.py --top 10
+
+  # Group identical problems across all variants
+  python get_all_errors.py --signatures
+
+  # Very large accounts: 4 processes with 8 fetch threads each
+  python get_all_errors.py --processes 4 --concurrency 8
+
+  # Only the 20 most recent errors and warnings of each link
+  python get_all_errors.py --max-per-link 20
+        """
+    )
+
+    parser.add_argument('--concurrency', type=int, default=Config.ERROR_REPORT_CONCURRENCY,
+                       help='Links whose details are fetched in parallel (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only fetch events newer than the previous run and save new watermarks')
+    parser.add_argument('--state-file', default=Config.ERROR_WATERMARK_FILE,
+                       help='Watermark file used by --incremental (default: %(default)s)')
+    parser.add_argument('--since', type=int,
+                       help='Only fetch events after this timestamp (overrides saved watermarks)')
+    parser.add_argument('--output', choices=sorted(REPORT_FORMATS), default='text',
+                       help='Report format (default: %(default)s)')
+    parser.add_argument('--watch', type=float, metavar='INTERVAL',
+                       help='Keep polling every INTERVAL seconds, reporting only links that changed')
+    parser.add_argument('--top', type=int, metavar='K',
+                       help='Only report the K links with the most errors (then warnings)')
+    parser.add_argument('--signatures', action='store_true',
+                       help='Group errors and warnings into signatures across all links')
+    parser.add_argument('--processes', type=int, default=1,
+                       help='Shard links by LinkID across this many worker processes (default: %(default)s)')
+    parser.add_argument('--max-per-link', type=int, metavar='N',
+                       help='Only fetch the newest N errors and N warnings of each link')
+
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.watch is not None and args.watch <= 0:
+        parser.error("--watch INTERVAL must be positive")
+    if args.watch is not None and args.output == 'json':
+        parser.error("--watch cannot be combined with --output json; use ndjson")
+    if args.top is not None and args.top < 1:
+        parser.error("--top K must be at least 1")
+    if args.top is not None and args.watch is not None:
+        parser.error("--top cannot be combined with --watch")
+    if args.signatures and args.watch is not None:
+        parser.error("--signatures cannot be combined with --watch")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    if args.processes > 1 and args.watch is not None:
+        parser.error("--processes cannot be combined with --watch")
+    if args.processes > 1 and args.top is not None:
+        parser.error("--processes cannot be combined with --top")
+    if args.max_per_link is not None and args.max_per_link < 1:
+        parser.error("--max-per-link N must be at least 1")
+    if args.max_per_link is not None and args.watch is not None:
+        parser.error("--max-per-link cannot be combined with --watch")
+
+    state_file = args.state_file if args.incremental else None
+    if args.watch is not None:
+        try:
+            watch_errors(args.watch, concurrency=args.concurrency, since=args.since,
+                         state_file=state_file, output=args.output)
+        except KeyboardInterrupt:
+            pass
     else:
-        print("❌ Failed to retrieve status information")
+        get_all_errors(concurrency=args.concurrency, since=args.since,
+                       state_file=state_file, output=args.output, top=args.top,
+                       signatures=args.signatures, processes=args.processes,
+                       max_per_link=args.max_per_link)
 
 
 if __name__ == '__main__':
-    get_all_errors()
+    main()
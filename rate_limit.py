@@ -0,0 +1,160 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Client-side token-bucket rate limiting for API requests.
+
+Buckets hand out reservations: taking a token never blocks inside the bucket,
+it returns how long the caller must wait before sending. Threads share an
+in-process bucket; with a state directory configured, processes on the same
+host share a file-backed bucket guarded by an advisory lock.
+"""
+
+import os
+import re
+import struct
+import threading
+import time
+import urllib.parse
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens/second up to `capacity`"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def reserve(self, tokens=1):
+        """Take tokens and return the seconds to wait before using them"""
+        with self._lock:
+            now = self._clock()
+            (self._tokens, wait) = _take(self._tokens, now - self._updated, self.rate, self.capacity, tokens)
+            self._updated = now
+            return wait
+
+
+class FileTokenBucket:
+    """Token bucket whose state lives in a file shared by every process on the host"""
+
+    STATE = struct.Struct('dd')
+
+    def __init__(self, path, rate, capacity, clock=time.time):
+        if fcntl is None:
+            raise OSError("File-backed rate limiting requires fcntl")
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                data = os.pread(fd, self.STATE.size, 0)
+                now = self._clock()
+                if len(data) == self.STATE.size:
+                    (available, updated) = self.STATE.unpack(data)
+                else:
+                    (available, updated) = (self.capacity, now)
+                (available, wait) = _take(available, max(0.0, now - updated), self.rate, self.capacity, tokens)
+                os.pwrite(fd, self.STATE.pack(available, now), 0)
+                return wait
+            finally:
+                os.close(fd)
+
+
+def _take(available, elapsed, rate, capacity, tokens):
+    # Tokens may go negative: the deficit is the queue of callers still waiting
+    available = min(capacity, available + elapsed * rate) - tokens
+    wait = -available / rate if available < 0 else 0.0
+    return (available, wait)
+
+
+def endpoint_of(uri):
+    """Return the API endpoint of a request URI, e.g. 'status' or 'stream/errors'"""
+    path = urllib.parse.urlsplit(uri).path
+    return path[len('/api/'):] if path.startswith('/api/') else path.lstrip('/')
+
+
+class RateLimiter:
+    """Per-endpoint token buckets configured as {endpoint: (rate, burst)}"""
+
+    def __init__(self, limits=None, default=None, state_dir=None):
+        self.limits = dict(Config.RATE_LIMITS if limits is None else limits)
+        self.default = Config.RATE_LIMIT_DEFAULT if default is None else default
+        self.state_dir = Config.RATE_LIMIT_DIR if state_dir is None else state_dir
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    @property
+    def enabled(self):
+        return bool(self.limits or self.default)
+
+    @property
+    def blocking(self):
+        """True when reserve() may wait on a file lock held by another process"""
+        return bool(self.state_dir and fcntl is not None)
+
+    def _bucket(self, endpoint):
+        with self._lock:
+            if endpoint in self._buckets:
+                return self._buckets[endpoint]
+            limit = self.limits.get(endpoint, self.default)
+            bucket = None
+            if limit:
+                (rate, burst) = limit
+                if self.state_dir and fcntl is not None:
+                    os.makedirs(self.state_dir, exist_ok=True)
+                    name = re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint) + '.bucket'
+                    bucket = FileTokenBucket(os.path.join(self.state_dir, name), rate, burst)
+                else:
+                    bucket = TokenBucket(rate, burst)
+            self._buckets[endpoint] = bucket
+            return bucket
+
+    def reserve(self, uri):
+        """Take a token for the request's endpoint and return the seconds to wait"""
+        endpoint = endpoint_of(uri)
+        bucket = self._bucket(endpoint)
+        if bucket is None:
+            return 0.0
+        wait = bucket.reserve()
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0})
+            stats['requests'] += 1
+            if wait > 0:
+                stats['throttled'] += 1
+                stats['wait_seconds'] += wait
+        return wait
+
+    def acquire(self, uri):
+        """Block until the request may be sent; returns the time waited"""
+        wait = self.reserve(uri)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: dict(stats) for (endpoint, stats) in self._stats.items()}
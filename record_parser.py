@@ -0,0 +1,183 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Structured fields from SCTE-35 cue and alert records.
+
+Every API mode has a RecordParser holding the RecordFormats registered for
+it. A format is one precompiled pattern whose named groups are the fields
+it extracts, so a record is parsed with a single search; optional groups and
+lookaheads let one pattern pick up fields wherever they sit. Formats are
+tried in registration order, so support for a new record layout is a
+register() call:
+
+    record_parser.register('stream/alertevents', RecordFormat(
+        'ad-break-alert', r'AD BREAK (?P<status>MISSED|LATE)', required=('status',)))
+
+A format given summary columns also fills the summary table of its mode
+(SCTE35Summary: Duration; AlertSummary: Type, Status, Duration, Units).
+parse_summaries() takes them from the first such format that matches,
+starting with the built-in SCTE35_SUMMARY / ALERT_SUMMARY: the patterns
+update_db has always used, with their values kept as text. SCTE35_CUE and
+ALERT_EVENT are more lenient (any cue type, first duration after the cue,
+first duration of an alert) and only provide fields, so the stored summary
+columns do not depend on them.
+"""
+
+import functools
+import hashlib
+import re
+
+
+def record_hash(text):
+    """Short hash of a record's text, part of the primary key of every record table"""
+    return hashlib.sha1(text.encode("UTF-8")).hexdigest()[0:8]
+
+
+@functools.lru_cache(maxsize=64)
+def _cue_type(value):
+    return " ".join(re.split(r'[ -]+', value)).title()
+
+
+class RecordFormat:
+    """One record layout: a precompiled pattern whose named groups are its fields.
+
+    converters maps a field to a function applied to its text; a record is
+    only accepted when every field in required was found. summary names the
+    fields that make up a summary-table row, in column order.
+    """
+
+    def __init__(self, name, pattern, flags=0, converters=None, required=(), summary=None):
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self.converters = dict(converters or {})
+        self.required = tuple(required)
+        self.summary = tuple(summary) if summary else None
+        # Summary columns that are exactly the groups in order are read straight off the match
+        groups = sorted(self.pattern.groupindex, key=self.pattern.groupindex.get)
+        self._groups_are_summary = (self.summary == tuple(groups) and len(groups) == self.pattern.groups
+                                    and not self.converters)
+
+    def parse(self, text):
+        """Return {field: value, 'format': name}, or None if the record is not in this format"""
+        match = self.pattern.search(text)
+        if match is None:
+            return None
+        fields = {name: value for (name, value) in match.groupdict().items() if value is not None}
+        for name in self.required:
+            if name not in fields:
+                return None
+        for (name, convert) in self.converters.items():
+            if name in fields:
+                fields[name] = convert(fields[name])
+        fields['format'] = self.name
+        return fields
+
+    def summarize(self, text):
+        """Return the summary columns of a record in this format, or None"""
+        if self._groups_are_summary:
+            match = self.pattern.search(text)
+            if match is None:
+                return None
+            columns = match.groups()
+            return None if None in columns else columns
+        fields = self.parse(text)
+        if fields is None or any(name not in fields for name in self.summary):
+            return None
+        return tuple(fields[name] for name in self.summary)
+
+
+class RecordParser:
+    """The formats of one API mode; `field` is the record key holding the text"""
+
+    def __init__(self, field):
+        self.field = field
+        self.formats = []
+
+    def register(self, record_format):
+        self.formats.append(record_format)
+        return record_format
+
+    def parse(self, text):
+        for record_format in self.formats:
+            fields = record_format.parse(text)
+            if fields is not None:
+                return fields
+        return None
+
+    def parse_records(self, records):
+        """Yield (timestamp, record_hash, text, fields or None) for every record"""
+        field = self.field
+        parse = self.formats[0].parse if len(self.formats) == 1 else self.parse
+        for record in records:
+            text = record[field]
+            yield (record['timestamp'], record_hash(text), text, parse(text))
+
+    def summarize(self, text):
+        for record_format in self.formats:
+            if record_format.summary:
+                columns = record_format.summarize(text)
+                if columns is not None:
+                    return columns
+        return None
+
+    def parse_summaries(self, records):
+        """Yield (timestamp, record_hash, text, summary columns or None) for every record"""
+        field = self.field
+        summary_formats = [record_format for record_format in self.formats if record_format.summary]
+        summarize = summary_formats[0].summarize if len(summary_formats) == 1 else self.summarize
+        sha1 = hashlib.sha1
+        for record in records:
+            text = record[field]
+            # record_hash() inlined: this loop runs once per stored row
+            yield (record['timestamp'], sha1(text.encode("UTF-8")).hexdigest()[0:8], text, summarize(text))
+
+
+# The cue type anchors the match; splice ID and duration may follow it in either order
+SCTE35_CUE = RecordFormat('scte35-cue', r"""
+    (?P<cue_type>Cue[ -]?(?:Out|In)(?:[ -]Cont(?:inued)?)?)\b
+    (?=(?:.*?\b(?i:splice(?:[ _-]?(?:event[ _-]?)?id)?)[ =:\#]*(?P<splice_id>0x[0-9A-Fa-f]+|\d+))?)
+    (?:.*?(?<![\w.])(?P<duration>\d+(?:\.\d+)?)\ ?(?:seconds|secs?|s)\b)?
+    """, re.VERBOSE, converters={'cue_type': _cue_type, 'duration': float})
+
+ALERT_EVENT = RecordFormat('alert-event',
+    r'(?P<alert_type>SCTE-35|STREAM) (?P<status>OUTAGE ALERT|ALERT CLEARED)\b(?:.*?\s)?'
+    r'(?P<duration>\d+(?:\.\d+)?) (?P<units>minutes|seconds)',
+    converters={'duration': float}, required=('alert_type', 'status', 'duration', 'units'))
+
+# The summary-table patterns update_db has always used
+SCTE35_SUMMARY = RecordFormat('scte35-summary', r"Cue In (?P<duration>\d+.\d+) seconds",
+                              summary=('duration',))
+
+ALERT_SUMMARY = RecordFormat('alert-summary',
+    r"(?P<alert_type>SCTE-35|STREAM) (?P<status>OUTAGE ALERT|ALERT CLEARED) .* (?P<duration>\d+) (?P<units>minutes|seconds)",
+    summary=('alert_type', 'status', 'duration', 'units'))
+
+PARSERS = {
+    'stream/scte35cues': RecordParser('scte35'),
+    'stream/alertevents': RecordParser('alerts'),
+}
+PARSERS['stream/scte35cues'].register(SCTE35_CUE)
+PARSERS['stream/scte35cues'].register(SCTE35_SUMMARY)
+PARSERS['stream/alertevents'].register(ALERT_EVENT)
+PARSERS['stream/alertevents'].register(ALERT_SUMMARY)
+
+def register(mode, record_format):
+    """Add a format for the records of an API mode, tried after those already
+    registered; with summary columns it also fills the mode's summary table"""
+    return PARSERS[mode].register(record_format)
+
+
+def parse_records(mode, records):
+    return PARSERS[mode].parse_records(records)
+
+
+def parse_summaries(mode, records):
+    return PARSERS[mode].parse_summaries(records)
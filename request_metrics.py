@@ -0,0 +1,147 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Per-endpoint latency histograms built from utils request events.
+
+Usage:
+    metrics = utils.enable_request_metrics()
+    ...
+    metrics.dump()                      # table on stdout
+    metrics.export_json("metrics.json")
+"""
+
+import json
+import math
+import sys
+import threading
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer', 'total')
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram: constant memory, about 5% relative error on percentiles"""
+
+    GROWTH = 1.1
+    MIN_VALUE = 0.0001  # Values at or below 0.1 ms share the first bucket
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.MIN_VALUE:
+            index = 0
+        else:
+            index = int(math.log(value / self.MIN_VALUE, self.GROWTH)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        if self.count == 0:
+            return 0.0
+        rank = percent / 100.0 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index == 0:
+                    return min(self.MIN_VALUE, self.max)
+                # Geometric midpoint of the bucket
+                value = self.MIN_VALUE * self.GROWTH ** (index - 0.5)
+                return min(value, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class RequestMetrics:
+    """Request hook that aggregates events per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def __call__(self, event):
+        with self._lock:
+            entry = self._endpoints.get(event['endpoint'])
+            if entry is None:
+                entry = {
+                    'requests': 0,
+                    'errors': 0,
+                    'statuses': {},
+                    'wire_bytes': 0,
+                    'decoded_bytes': 0,
+                    'phases': {phase: LatencyHistogram() for phase in PHASES},
+                }
+                self._endpoints[event['endpoint']] = entry
+            entry['requests'] += 1
+            status = event.get('status')
+            if status is None or status >= 500:
+                entry['errors'] += 1
+            key = str(status) if status is not None else 'error'
+            entry['statuses'][key] = entry['statuses'].get(key, 0) + 1
+            entry['wire_bytes'] += event.get('wire_bytes', 0)
+            entry['decoded_bytes'] += event.get('decoded_bytes', 0)
+            for phase in PHASES:
+                entry['phases'][phase].add(event.get(phase, 0.0))
+
+    def summary(self):
+        """Return {endpoint: {requests, errors, statuses, bytes, latency percentiles per phase}}"""
+        with self._lock:
+            result = {}
+            for (endpoint, entry) in sorted(self._endpoints.items()):
+                result[endpoint] = {
+                    'requests': entry['requests'],
+                    'errors': entry['errors'],
+                    'statuses': dict(entry['statuses']),
+                    'wire_bytes': entry['wire_bytes'],
+                    'decoded_bytes': entry['decoded_bytes'],
+                    'latency': {phase: histogram.summary() for (phase, histogram) in entry['phases'].items()},
+                }
+            return result
+
+    def format_summary(self):
+        lines = ["%-22s %6s %5s %9s %9s %9s %9s %9s" % (
+            "Endpoint", "Reqs", "Errs", "p50 ms", "p95 ms", "p99 ms", "ttfb p50", "xfer p50")]
+        for (endpoint, entry) in self.summary().items():
+            total = entry['latency']['total']
+            lines.append("%-22s %6d %5d %9.1f %9.1f %9.1f %9.1f %9.1f" % (
+                endpoint, entry['requests'], entry['errors'],
+                total['p50'] * 1000, total['p95'] * 1000, total['p99'] * 1000,
+                entry['latency']['ttfb']['p50'] * 1000, entry['latency']['transfer']['p50'] * 1000))
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print("Request latency by endpoint", file=file or sys.stdout)
+        print(self.format_summary(), file=file or sys.stdout)
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_to(self, destination):
+        """Write the summary to 'stderr', 'stdout' or a JSON file path"""
+        if destination in ('stderr', 'stdout'):
+            self.dump(getattr(sys, destination))
+        else:
+            self.export_json(destination)
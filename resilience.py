@@ -0,0 +1,159 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Retry policy and per-host circuit breaker for the API request path.
+"""
+
+import email.utils
+import http.client
+import random
+import threading
+import time
+import urllib.error
+from config import Config
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without contacting the server while a host's circuit is open"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuit open for {host}, retrying in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+class RetryPolicy:
+    """Which failures to retry and how long to wait between attempts.
+
+    Delays use decorrelated jitter: each wait is drawn uniformly from
+    [base_delay, previous_wait * 3] and capped at max_delay.
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None,
+                 methods=None, statuses=None, max_retry_after=None):
+        self.max_attempts = Config.RETRY_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.base_delay = Config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.methods = Config.RETRY_METHODS if methods is None else methods
+        self.statuses = Config.RETRY_STATUSES if statuses is None else statuses
+        self.max_retry_after = Config.RETRY_MAX_RETRY_AFTER if max_retry_after is None else max_retry_after
+
+    def is_retryable(self, method, error):
+        if method.upper() not in self.methods:
+            return False
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code in self.statuses
+        return isinstance(error, (OSError, http.client.HTTPException))
+
+    def next_delay(self, previous_delay, error=None):
+        """Return the wait before the next attempt, honouring Retry-After when present"""
+        retry_after = None
+        if isinstance(error, urllib.error.HTTPError) and error.headers is not None:
+            retry_after = parse_retry_after(error.headers.get('Retry-After'))
+        if retry_after is not None:
+            return (min(retry_after, self.max_retry_after), True)
+        upper = max(self.base_delay, (previous_delay or self.base_delay) * 3)
+        return (min(self.max_delay, random.uniform(self.base_delay, upper)), False)
+
+
+def is_server_failure(error):
+    """True for failures that suggest the host is unhealthy (not 4xx client errors)"""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after `failure_threshold` consecutive failures,
+    rejects requests for `reset_timeout` seconds, then lets one trial through."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None, clock=time.monotonic):
+        self.failure_threshold = Config.BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.reset_timeout = Config.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._stats = {
+            'opened': 0,
+            'rejected': 0,
+            'half_open_trials': 0,
+        }
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0, 'trial': False})
+
+    def state(self, host):
+        with self._lock:
+            return self._host(host)['state']
+
+    def before_request(self, host):
+        """Raise CircuitOpenError if requests to host should fail fast"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            entry = self._host(host)
+            if entry['state'] == self.CLOSED:
+                return
+            remaining = entry['opened_at'] + self.reset_timeout - self._clock()
+            if entry['state'] == self.OPEN and remaining <= 0:
+                entry['state'] = self.HALF_OPEN
+                entry['trial'] = False
+            if entry['state'] == self.HALF_OPEN and not entry['trial']:
+                entry['trial'] = True
+                self._stats['half_open_trials'] += 1
+                return
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(host, max(0.0, remaining))
+
+    def record_success(self, host):
+        with self._lock:
+            entry = self._host(host)
+            entry.update(state=self.CLOSED, failures=0, trial=False)
+
+    def record_failure(self, host):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            entry = self._host(host)
+            entry['failures'] += 1
+            if entry['state'] == self.HALF_OPEN or entry['failures'] >= self.failure_threshold:
+                if entry['state'] != self.OPEN:
+                    self._stats['opened'] += 1
+                entry.update(state=self.OPEN, opened_at=self._clock(), trial=False)
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result['open_hosts'] = sorted(host for (host, entry) in self._hosts.items()
+                                          if entry['state'] != self.CLOSED)
+            return result
@@ -0,0 +1,214 @@
+# MIT License
+# Copyright (c) 2021-2025 HLSAnalyzer.com
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Persistent HTTP response cache for the read-only API endpoints.
+
+Each entry is one file holding a JSON metadata line followed by the body.
+Entries with an ETag or Last-Modified validator are revalidated with a
+conditional request; entries without one are served until their TTL expires.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from config import Config
+
+
+def hash_apikey(apikey):
+    return hashlib.sha256(apikey.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(method, uri):
+    """Return (key, redacted_uri) for a request; the API key is never kept in clear"""
+    parsed = urllib.parse.urlsplit(uri)
+    params = []
+    for (name, value) in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True):
+        if name == 'apikey':
+            value = 'sha256:' + hash_apikey(value)
+        params.append((name, value))
+    params.sort()
+    redacted = urllib.parse.urlunsplit((parsed.scheme, parsed.netloc, parsed.path,
+                                        urllib.parse.urlencode(params), ''))
+    key = hashlib.sha256(("%s %s" % (method, redacted)).encode('utf-8')).hexdigest()
+    return (key, redacted)
+
+
+class CacheEntry:
+
+    def __init__(self, meta, body):
+        self.meta = meta
+        self.body = body
+
+    @property
+    def etag(self):
+        return self.meta.get('etag')
+
+    @property
+    def last_modified(self):
+        return self.meta.get('last_modified')
+
+    @property
+    def charset(self):
+        return self.meta.get('charset')
+
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.meta.get('expires', 0)
+
+
+class ResponseCache:
+    """Size-bounded LRU response cache stored under ``directory``"""
+
+    SUFFIX = '.cache'
+
+    def __init__(self, directory, max_bytes=None, ttl=None):
+        self.directory = directory
+        self.max_bytes = Config.HTTP_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = Config.HTTP_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+
+    def stats(self):
+        with self._lock:
+            index = self._load_index()
+            result = dict(self._stats)
+            result['entries'] = len(index)
+            result['bytes'] = sum(index.values())
+            lookups = result['hits'] + result['misses']
+            result['hit_ratio'] = (result['hits'] / lookups) if lookups else 0.0
+            return result
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _load_index(self):
+        # Must be called with the lock held; least recently used entries come first
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-len(self.SUFFIX)], st.st_size))
+            entries.sort()
+            self._index = collections.OrderedDict((key, size) for (_, key, size) in entries)
+        return self._index
+
+    def get(self, key):
+        """Return the stored CacheEntry for key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self._load_index().pop(key, None)
+            return None
+
+        with self._lock:
+            index = self._load_index()
+            if key in index:
+                index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CacheEntry(meta, body)
+
+    def record_hit(self, revalidated=False):
+        with self._lock:
+            self._stats['hits'] += 1
+            if revalidated:
+                self._stats['revalidated'] += 1
+
+    def record_miss(self):
+        with self._lock:
+            self._stats['misses'] += 1
+
+    def put(self, key, uri, body, headers, charset=None):
+        now = time.time()
+        meta = {
+            'uri': uri,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'charset': charset,
+            'stored': now,
+            'expires': now + self.ttl,
+        }
+        if self._write(key, meta, body):
+            with self._lock:
+                self._stats['stores'] += 1
+
+    def refresh(self, key, entry):
+        """Extend the lifetime of an entry after a 304 Not Modified"""
+        entry.meta['expires'] = time.time() + self.ttl
+        self._write(key, entry.meta, entry.body)
+
+    def _write(self, key, meta, body):
+        data = json.dumps(meta).encode('utf-8') + b'\n' + bytes(body)
+        if len(data) > self.max_bytes:
+            return False
+
+        with self._lock:
+            index = self._load_index()
+            (fd, tmp_path) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            index[key] = len(data)
+            index.move_to_end(key)
+            self._evict(index)
+        return True
+
+    def _evict(self, index):
+        total = sum(index.values())
+        while total > self.max_bytes and index:
+            (key, size) = index.popitem(last=False)
+            total -= size
+            self._stats['evictions'] += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                try:
+                    os.unlink(self._path(key))
+                except OSError:
+                    pass
+            index.clear()
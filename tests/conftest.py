@@ -3,6 +3,8 @@
 import pytest
 import os
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock
 
 # Add parent directory to path so tests can import the modules
@@ -142,4 +144,70 @@ def clean_environment():
     
     # Restore original environment
     os.environ.clear()
-    os.environ.update(original_env)
\ No newline at end of file
+    os.environ.update(original_env)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Keep-alive request handler that answers from the server's route table"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        path = self.path.split('?', 1)[0]
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        route = self.server.routes.get(path)
+        if route is None:
+            (status, headers, body) = (404, {}, b'{"error": "not found"}')
+        elif callable(route):
+            result = route(self)
+            if result is None:
+                # The route wrote its own response
+                return
+            (status, headers, body) = result
+        else:
+            (status, headers, body) = route
+
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StandInServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients (including forked workers) dropping keep-alive connections is
+        # expected; anything else is reported as usual
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+@pytest.fixture
+def local_http_server():
+    """Local stand-in for the HLSAnalyzer API.
+
+    Register responses with ``server.routes[path] = (status, headers, body)``
+    or a callable taking the request handler and returning that tuple (or
+    None after writing the response itself).
+    """
+    server = _StandInServer(('127.0.0.1', 0), _StandInHandler)
+    server.routes = {}
+    server.requests = []
+    server.url = "http://127.0.0.1:%d" % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
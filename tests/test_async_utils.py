@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import pytest
+import asyncio
+import json
+import gzip
+import threading
+import time
+import sys
+import os
+from unittest.mock import patch, AsyncMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import async_utils
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def fresh_retry_state():
+    async_utils.utils.reset_retry_state()
+    yield
+    async_utils.utils.reset_retry_state()
+
+
+class TestAsyncClient:
+    
+    def test_get_records_success(self, local_http_server):
+        local_http_server.routes['/api/stream/errors'] = (200, {}, b'{"errors": [{"timestamp": 1}]}')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.get_records(local_http_server.url, "api-key", "link123", 100, 200, "stream/errors")
+        
+        result = run(scenario())
+        
+        assert result == {"errors": [{"timestamp": 1}]}
+        assert local_http_server.requests[0][1] == "/api/stream/errors?apikey=api-key&start=100&end=200&linkid=link123"
+    
+    def test_get_records_http_error(self, local_http_server):
+        local_http_server.routes['/api/stream/errors'] = (404, {}, b'Not Found')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.get_records(local_http_server.url, "api-key", "link123", 100, 200, "stream/errors")
+        
+        with patch('builtins.print'):
+            assert run(scenario()) is None
+    
+    def test_send_command_success(self, local_http_server):
+        local_http_server.routes['/api/stream/add'] = (200, {}, b'{"status": "added"}')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.send_command(local_http_server.url, "api-key", "stream/add",
+                                                 ["m3u8=test.m3u8", "linkid=test123"], method='POST')
+        
+        with patch('builtins.print'):
+            code, result = run(scenario())
+        
+        assert code == 200
+        assert result == {"status": "added"}
+        assert local_http_server.requests[0][0] == 'POST'
+    
+    def test_send_command_http_error(self, local_http_server):
+        local_http_server.routes['/api/invalid'] = (400, {}, b'Bad Request')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.send_command(local_http_server.url, "api-key", "invalid")
+        
+        with patch('builtins.print'):
+            assert run(scenario()) == (400, None)
+    
+    def test_get_all_status_success(self, local_http_server):
+        status = {"status": {"stream1": {"LinkID": "abc", "Errors": 0, "Warnings": 1}}}
+        local_http_server.routes['/api/status'] = (200, {'Content-Type': 'application/json'}, json.dumps(status).encode())
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.get_all_status(local_http_server.url, "api-key")
+        
+        assert run(scenario()) == status
+    
+    def test_get_all_status_connection_refused(self):
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.get_all_status("http://127.0.0.1:1", "api-key")
+        
+        with patch('builtins.print'):
+            with patch('async_utils.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+                assert run(scenario()) is None
+        
+        # Connection errors on GET are retried before giving up
+        assert mock_sleep.call_count == async_utils.Config.RETRY_MAX_ATTEMPTS - 1
+    
+    def test_connections_are_reused(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                for _ in range(5):
+                    await client.get_all_status(local_http_server.url, "api-key")
+                return client.stats()
+        
+        stats = run(scenario())
+        
+        assert stats['requests'] == 5
+        assert stats['new_connections'] == 1
+        assert stats['hits'] == 4
+    
+    def test_concurrency_is_bounded(self, local_http_server):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        
+        def slow(handler):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+            return (200, {}, b'{"errors": []}')
+        local_http_server.routes['/api/stream/errors'] = slow
+        
+        async def scenario():
+            async with async_utils.AsyncClient(max_concurrency=3) as client:
+                return await asyncio.gather(*[
+                    client.get_records(local_http_server.url, "api-key", "link%d" % i, 0, 10, "stream/errors")
+                    for i in range(12)
+                ])
+        
+        results = run(scenario())
+        
+        assert results == [{"errors": []}] * 12
+        assert 1 < state['peak'] <= 3
+    
+    def test_cancellation_closes_connection(self, local_http_server):
+        def hang(handler):
+            time.sleep(0.5)
+            return (200, {}, b'{}')
+        local_http_server.routes['/api/status'] = hang
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                task = asyncio.ensure_future(client.get_all_status(local_http_server.url, "api-key"))
+                await asyncio.sleep(0.05)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                return client.stats()
+        
+        stats = run(scenario())
+        
+        assert stats['idle_connections'] == 0
+    
+    def test_chunked_response(self, local_http_server):
+        def chunked(handler):
+            handler.send_response(200)
+            handler.send_header('Transfer-Encoding', 'chunked')
+            handler.end_headers()
+            for piece in (b'{"errors": ', b'[1, 2, 3]}'):
+                handler.wfile.write(b'%x\r\n%s\r\n' % (len(piece), piece))
+            handler.wfile.write(b'0\r\n\r\n')
+        local_http_server.routes['/api/stream/errors'] = chunked
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                first = await client.get_records(local_http_server.url, "api-key", "link", 0, 10, "stream/errors")
+                second = await client.get_records(local_http_server.url, "api-key", "link", 0, 10, "stream/errors")
+                return (first, second, client.stats())
+        
+        (first, second, stats) = run(scenario())
+        
+        assert first == second == {"errors": [1, 2, 3]}
+        assert stats['new_connections'] == 1
+    
+    def test_gzip_response(self, local_http_server):
+        payload = json.dumps({"errors": [{"message": "Segment download timeout"}] * 200}).encode()
+        local_http_server.routes['/api/stream/errors'] = (200, {'Content-Encoding': 'gzip'}, gzip.compress(payload))
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                result = await client.get_records(local_http_server.url, "api-key", "link", 0, 10, "stream/errors")
+                return (result, client.stats())
+        
+        (result, stats) = run(scenario())
+        
+        assert result == json.loads(payload)
+        assert local_http_server.requests[0][2]['Accept-Encoding'] == 'gzip, deflate'
+        assert stats['compressed_responses'] == 1
+        assert stats['wire_bytes'] < stats['decoded_bytes'] == len(payload)
+    
+    def test_retries_transient_server_error(self, local_http_server):
+        responses = [(503, {'Retry-After': '2'}, b'busy'), (200, {}, b'{"status": {}}')]
+        local_http_server.routes['/api/status'] = lambda handler: responses.pop(0)
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                return await client.get_all_status(local_http_server.url, "api-key")
+        
+        with patch('async_utils.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            assert run(scenario()) == {"status": {}}
+        
+        mock_sleep.assert_called_once_with(2.0)
+    
+    def test_file_backed_limiter_runs_off_the_event_loop(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        threads = []
+        limiter = async_utils.rate_limit.RateLimiter(limits={'status': (100, 100)}, default=None, state_dir=None)
+        limiter.reserve = lambda uri: threads.append(threading.current_thread()) or 0.0
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                await client.get_all_status(local_http_server.url, "api-key")
+        
+        with patch('async_utils.utils.get_rate_limiter', return_value=limiter), \
+                patch.object(async_utils.rate_limit.RateLimiter, 'blocking', True):
+            run(scenario())
+        
+        assert len(threads) == 1
+        assert threads[0] is not threading.main_thread()
+
+
+class TestProxy:
+    
+    def test_http_request_goes_to_proxy(self, local_http_server):
+        local_http_server.routes['http://api.example.invalid/api/status'] = (200, {}, b'{"status": {}}')
+        with patch.dict(os.environ, {'http_proxy': 'http://user:secret@' + local_http_server.url[len('http://'):],
+                                     'no_proxy': ''}):
+            pool = async_utils.AsyncHTTPConnectionPool()
+        
+        async def scenario():
+            async with async_utils.AsyncClient(pool=pool) as client:
+                return await client.get_all_status("http://api.example.invalid", "api-key")
+        
+        assert run(scenario()) == {"status": {}}
+        (method, path, headers) = local_http_server.requests[-1]
+        assert path == 'http://api.example.invalid/api/status?apikey=api-key'
+        assert headers['Proxy-Authorization'] == 'Basic dXNlcjpzZWNyZXQ='
+    
+    def test_https_request_is_tunnelled(self):
+        received = []
+        
+        async def proxy(reader, writer):
+            while True:
+                line = await reader.readline()
+                received.append(line)
+                if line in (b'\r\n', b''):
+                    break
+            writer.write(b"HTTP/1.1 407 Proxy Authentication Required\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+            writer.close()
+        
+        async def scenario():
+            server = await asyncio.start_server(proxy, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            with patch.dict(os.environ, {'https_proxy': 'http://u:p@127.0.0.1:%d' % port, 'no_proxy': ''}):
+                pool = async_utils.AsyncHTTPConnectionPool()
+            try:
+                with pytest.raises(OSError, match="Tunnel connection failed: 407"):
+                    await pool.request('GET', 'https://api.example.invalid/api/status')
+            finally:
+                await pool.close()
+                server.close()
+        
+        run(scenario())
+        
+        assert received[0] == b'CONNECT api.example.invalid:443 HTTP/1.1\r\n'
+        assert b'Proxy-Authorization: Basic dTpw\r\n' in received
+    
+    def test_no_proxy_connects_directly(self):
+        with patch.dict(os.environ, {'https_proxy': 'http://proxy.internal:3128', 'no_proxy': 'direct.example.com'}):
+            pool = async_utils.AsyncHTTPConnectionPool()
+        
+        assert pool._proxy_for(('https', 'direct.example.com', 443)) is None
+        assert pool._proxy_for(('https', 'api.example.com', 443))[:2] == ('proxy.internal', 3128)
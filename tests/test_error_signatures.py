@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import error_signatures
+
+
+class TestNormalizeMessage:
+    
+    def test_masks_urls_and_numbers(self):
+        first = error_signatures.normalize_message(
+            "HTTP 404 fetching https://cdn1.example.com/live/seg_1234.ts?token=ab12")
+        second = error_signatures.normalize_message(
+            "HTTP 404 fetching https://cdn7.example.com/live/seg_99.ts")
+        
+        assert first == second == "HTTP <n> fetching <url>"
+    
+    def test_masks_segment_and_playlist_names(self):
+        assert error_signatures.normalize_message("Segment media_00042.ts duration 6.006 exceeds target 6") == \
+            "Segment <segment> duration <n> exceeds target <n>"
+        assert error_signatures.normalize_message("Variant chunklist_b2400000.m3u8 stalled") == \
+            "Variant <playlist> stalled"
+    
+    def test_masks_hex_identifiers(self):
+        assert error_signatures.normalize_message(
+            "Splice 0x4F1A for 3f2b8c1e-1d2a-4b3c-9d8e-0123456789ab") == "Splice <hex> for <hex>"
+    
+    def test_collapses_whitespace(self):
+        assert error_signatures.normalize_message("  Playlist   not\tupdated ") == "Playlist not updated"
+
+
+class TestSignatureAggregator:
+    
+    def test_collapses_across_links(self):
+        aggregator = error_signatures.SignatureAggregator()
+        for i in range(50):
+            aggregator.add_records('link-%d' % i, 'error', [
+                {'message': 'HTTP 503 fetching https://cdn.example.com/seg_%d.ts' % i, 'timestamp': 1000 + i},
+                {'message': 'HTTP 503 fetching https://cdn.example.com/seg_%d.ts' % (i + 1), 'timestamp': 2000 + i},
+            ])
+        aggregator.add_records('link-0', 'warning', [{'message': 'Target duration changed from 6 to 4'}])
+        
+        (top, warning) = aggregator.summary()
+        
+        assert len(aggregator) == 2
+        assert aggregator.records == 101
+        assert top['pattern'] == 'HTTP <n> fetching <url>'
+        assert (top['count'], top['links']) == (100, 50)
+        assert (top['first_seen'], top['last_seen']) == (1000, 2049)
+        assert top['example'] == 'HTTP 503 fetching https://cdn.example.com/seg_0.ts'
+        assert warning['kind'] == 'warning'
+        assert warning['linkids'] == ['link-0']
+    
+    def test_linkids_bounded(self):
+        aggregator = error_signatures.SignatureAggregator(max_linkids=3)
+        for i in range(10):
+            aggregator.add_records('link-%d' % i, 'error', [{'message': 'Stall'}])
+        
+        (entry,) = aggregator.summary()
+        
+        assert entry['links'] == 10
+        assert entry['linkids'] == ['link-0', 'link-1', 'link-2']
+    
+    def test_signatures_bounded(self):
+        aggregator = error_signatures.SignatureAggregator(max_signatures=2)
+        aggregator.add_records('a', 'error', [{'message': 'alpha'}, {'message': 'beta'},
+                                              {'message': 'gamma'}, {'message': 'delta'}])
+        
+        entries = {entry['pattern']: entry for entry in aggregator.summary()}
+        
+        assert len(aggregator) == 3
+        assert entries[error_signatures.OVERFLOW]['count'] == 2
+        assert entries[error_signatures.OVERFLOW]['example'] is None
+    
+    def test_same_message_different_kind(self):
+        aggregator = error_signatures.SignatureAggregator()
+        aggregator.add_records('a', 'error', [{'message': 'Late segment'}])
+        aggregator.add_records('a', 'warning', [{'message': 'Late segment'}])
+        
+        assert len(aggregator) == 2
+    
+    def test_summary_limit(self):
+        aggregator = error_signatures.SignatureAggregator()
+        aggregator.add_records('a', 'error', [{'message': 'x'}, {'message': 'y'}, {'message': 'y'}])
+        
+        assert [entry['pattern'] for entry in aggregator.summary(limit=1)] == ['y']
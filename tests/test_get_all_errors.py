@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 
 import pytest
+import concurrent.futures
+import gzip
+import io
+import json
 import os
 import sys
+import threading
+import time
 from unittest.mock import patch, Mock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -211,4 +217,684 @@ class TestGetAllErrors:
             # Should call get_records for errors (since int(float("2.5")) > 0) but not warnings
             assert mock_get_records.call_count == 1
             error_call = mock_get_records.call_args_list[0]
-            assert error_call[1]['mode'] == "stream/errors"
\ No newline at end of file
+            assert error_call[1]['mode'] == "stream/errors"
+
+MASTER_STATUS = {
+    'https://example.com/master.m3u8': {
+        'Errors': 1, 'Warnings': 0, 'Timestamp': 100, 'LinkID': 'master-link',
+        'Variants': {
+            'v1': {'Errors': 2.0, 'Warnings': 1.0, 'Timestamp': 200, 'LinkID': 'v1-link'},
+            'v2': {'Errors': 0.0, 'Warnings': 0.0, 'Timestamp': 300, 'LinkID': 'v2-link'},
+        }
+    },
+    'https://example.com/media.m3u8': {
+        'Errors': 0, 'Warnings': 4, 'Timestamp': 400, 'LinkID': 'media-link'
+    },
+}
+
+
+class TestCollectLinks:
+    
+    def test_report_order_and_flags(self):
+        links = get_all_errors.collect_links(MASTER_STATUS)
+        
+        assert [(link['kind'], link['linkid']) for link in links] == [
+            ('master', 'master-link'), ('variant', 'v1-link'), ('variant', 'v2-link'), ('media', 'media-link')]
+        assert (links[1]['has_errors'], links[1]['has_warnings']) == (True, True)
+        assert (links[2]['has_errors'], links[2]['has_warnings']) == (False, False)
+        assert (links[3]['has_errors'], links[3]['has_warnings']) == (False, True)
+
+
+class TestIterDetails:
+    
+    def test_concurrent_results_keep_link_order(self):
+        links = [{'linkid': 'link-%d' % i, 'timestamp': i, 'has_errors': True, 'has_warnings': False}
+                 for i in range(20)]
+        
+        def fake_get_records(server, apikey, linkid, start, end, mode, chunks=None):
+            # Later links answer first
+            time.sleep((20 - end) * 0.002)
+            return {'errors': [{'message': linkid}]}
+        
+        with patch('get_all_errors.utils.get_records', side_effect=fake_get_records) as mock_get_records:
+            results = list(get_all_errors.iter_details('https://server', 'key', links, concurrency=4))
+        
+        assert mock_get_records.call_count == 20
+        assert [link['linkid'] for (link, _) in results] == [link['linkid'] for link in links]
+        assert [details[0]['errors'][0]['message'] for (_, details) in results] == [link['linkid'] for link in links]
+        assert all(details[1] is None for (_, details) in results)
+    
+    def test_concurrency_overlaps_fetches(self):
+        links = [{'linkid': 'link-%d' % i, 'timestamp': i, 'has_errors': True, 'has_warnings': False}
+                 for i in range(8)]
+        
+        def slow_get_records(*args, **kwargs):
+            time.sleep(0.05)
+            return {'errors': []}
+        
+        with patch('get_all_errors.utils.get_records', side_effect=slow_get_records):
+            started = time.perf_counter()
+            list(get_all_errors.iter_details('https://server', 'key', links, concurrency=8))
+            elapsed = time.perf_counter() - started
+        
+        assert elapsed < 0.3
+
+
+    @patch.object(get_all_errors.Config, 'RECORD_CHUNK_MIN_SECONDS', 3600)
+    @patch.object(get_all_errors.Config, 'RECORD_FETCH_CHUNKS', 4)
+    def test_long_ranges_are_fetched_in_chunks(self):
+        links = [{'linkid': 'old-link', 'timestamp': 100000, 'has_errors': True, 'has_warnings': False},
+                 {'linkid': 'recent-link', 'timestamp': 100000, 'has_errors': True, 'has_warnings': False,
+                  'start': 99000}]
+        
+        with patch('get_all_errors.utils.get_records', return_value={'errors': []}) as mock_get_records:
+            list(get_all_errors.iter_details('https://server', 'key', links))
+        
+        assert [call[1]['chunks'] for call in mock_get_records.call_args_list] == [4, None]
+
+
+class TestGetAllErrorsConcurrency:
+    
+    @patch('get_all_errors.utils.get_all_status')
+    @patch('get_all_errors.utils.get_records')
+    @patch('builtins.print')
+    def test_concurrent_report_matches_serial(self, mock_print, mock_get_records, mock_get_status):
+        mock_get_status.return_value = {'status': MASTER_STATUS}
+        mock_get_records.side_effect = lambda server, apikey, linkid, start, end, mode, chunks=None: (
+            {'errors': [{'message': 'E ' + linkid}]} if mode == 'stream/errors'
+            else {'warnings': [{'message': 'W ' + linkid}]})
+        
+        outputs = []
+        with patch('get_all_errors.Config') as mock_config:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            for concurrency in (1, 4):
+                mock_print.reset_mock()
+                get_all_errors.get_all_errors(concurrency=concurrency)
+                outputs.append([call[0][0] for call in mock_print.call_args_list
+                                if not str(call[0][0]).startswith("Detail requests")])
+        
+        assert outputs[0] == outputs[1]
+        assert "Total errors found: 3" in outputs[0]
+        assert outputs[0].index("        ❌ E master-link") < outputs[0].index("        ❌ E v1-link")
+
+
+class TestMain:
+    
+    def test_concurrency_flag(self):
+        with patch('sys.argv', ['get_all_errors.py', '--concurrency', '3']), \
+             patch('get_all_errors.get_all_errors') as mock_report:
+            get_all_errors.main()
+        
+        mock_report.assert_called_once_with(concurrency=3, since=None, state_file=None, output="text", top=None, signatures=False, processes=1, max_per_link=None)
+    
+    def test_rejects_zero_concurrency(self):
+        with patch('sys.argv', ['get_all_errors.py', '--concurrency', '0']), \
+             patch('sys.stderr'):
+            with pytest.raises(SystemExit):
+                get_all_errors.main()
+    
+    def test_rejects_top_with_processes(self):
+        with patch('sys.argv', ['get_all_errors.py', '--top', '5', '--processes', '2']), \
+             patch('get_all_errors.get_all_errors') as mock_report, \
+             patch('sys.stderr'):
+            with pytest.raises(SystemExit):
+                get_all_errors.main()
+        
+        mock_report.assert_not_called()
+
+
+class TestIncrementalMode:
+    
+    def _run(self, state_file=None, since=None, records=None):
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status') as mock_get_status, \
+             patch('get_all_errors.utils.get_records') as mock_get_records, \
+             patch('builtins.print'):
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_get_status.return_value = {'status': MASTER_STATUS}
+            mock_get_records.side_effect = records or (lambda *args, **kwargs: {'errors': [], 'warnings': []})
+            get_all_errors.get_all_errors(since=since, state_file=state_file)
+        return {(call[0][2], call[1]['mode']): call[0][3:5] for call in mock_get_records.call_args_list}
+    
+    def test_second_run_starts_after_watermark(self, tmp_path):
+        state_file = str(tmp_path / "state" / "watermarks.json")
+        
+        first = self._run(state_file)
+        saved = get_all_errors.load_watermarks(state_file)
+        second = self._run(state_file)
+        
+        assert first[('v1-link', 'stream/errors')] == (0, 200)
+        assert saved == {'master-link': 100, 'v1-link': 200, 'v2-link': 300, 'media-link': 400}
+        # Nothing is newer than the saved watermarks, so no detail requests are made
+        assert second == {}
+    
+    def test_new_events_fetched_from_watermark(self, tmp_path):
+        state_file = str(tmp_path / "watermarks.json")
+        get_all_errors.save_watermarks(state_file, {'v1-link': 150})
+        
+        calls = self._run(state_file)
+        
+        assert calls[('v1-link', 'stream/errors')] == (151, 200)
+        assert calls[('v1-link', 'stream/warnings')] == (151, 200)
+        assert calls[('master-link', 'stream/errors')] == (0, 100)
+    
+    def test_failed_fetch_keeps_watermark(self, tmp_path):
+        state_file = str(tmp_path / "watermarks.json")
+        get_all_errors.save_watermarks(state_file, {'v1-link': 150})
+        
+        def failing(server, apikey, linkid, start, end, mode, chunks=None):
+            return None if linkid == 'v1-link' and mode == 'stream/warnings' else {}
+        
+        self._run(state_file, records=failing)
+        
+        saved = get_all_errors.load_watermarks(state_file)
+        assert saved['v1-link'] == 150
+        assert saved['media-link'] == 400
+    
+    def test_since_overrides_watermarks(self, tmp_path):
+        state_file = str(tmp_path / "watermarks.json")
+        get_all_errors.save_watermarks(state_file, {'v1-link': 190})
+        
+        calls = self._run(state_file, since=50)
+        
+        assert calls[('v1-link', 'stream/errors')] == (51, 200)
+        assert ('master-link', 'stream/errors') in calls
+    
+    def test_since_without_state(self):
+        calls = self._run(since=250)
+        
+        assert calls == {('media-link', 'stream/warnings'): (251, 400)}
+    
+    def test_unreadable_state_file(self, tmp_path):
+        state_file = tmp_path / "watermarks.json"
+        state_file.write_text("not json")
+        
+        with patch('builtins.print'):
+            assert get_all_errors.load_watermarks(str(state_file)) == {}
+
+
+class TestMachineReadableOutput:
+    
+    def _run(self, output, status=None):
+        out = io.StringIO()
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status') as mock_get_status, \
+             patch('get_all_errors.utils.get_records') as mock_get_records, \
+             patch('builtins.print') as mock_print:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.OUTPUT_BUFFER_SIZE = 64
+            mock_get_status.return_value = status
+            mock_get_records.side_effect = lambda server, apikey, linkid, start, end, mode, chunks=None: (
+                {'errors': [{'message': 'E ' + linkid, 'timestamp': end}]} if mode == 'stream/errors'
+                else {'warnings': [{'message': 'W ' + linkid}]})
+            get_all_errors.get_all_errors(output=output, out=out)
+        return (out.getvalue(), mock_print)
+    
+    def test_ndjson_records(self):
+        (text, mock_print) = self._run('ndjson', {'status': MASTER_STATUS})
+        
+        records = [json.loads(line) for line in text.splitlines()]
+        
+        assert [record['type'] for record in records] == [
+            'link', 'error', 'link', 'error', 'warning', 'link', 'link', 'warning', 'summary']
+        assert records[0] == {'type': 'link', 'kind': 'master', 'name': 'https://example.com/master.m3u8',
+                              'linkid': 'master-link', 'errors': 1, 'warnings': 0, 'timestamp': 100}
+        assert records[2]['master'] == 'https://example.com/master.m3u8'
+        assert records[3] == {'type': 'error', 'linkid': 'v1-link', 'message': 'E v1-link', 'timestamp': 200}
+        assert records[-1]['errors'] == 3
+        assert records[-1]['warnings'] == 5
+        mock_print.assert_not_called()
+    
+    def test_json_document(self):
+        (text, _) = self._run('json', {'status': MASTER_STATUS})
+        
+        document = json.loads(text)
+        
+        assert [link['linkid'] for link in document['links']] == ['master-link', 'v1-link', 'v2-link', 'media-link']
+        assert document['links'][1]['error_records'] == [{'message': 'E v1-link', 'timestamp': 200}]
+        assert document['links'][2]['warning_records'] == []
+        assert document['summary']['streams'] == 4
+    
+    def test_json_status_failure_is_valid_json(self):
+        with patch('sys.stderr', new_callable=io.StringIO):
+            (text, _) = self._run('json', None)
+        
+        assert json.loads(text) == {'links': [], 'error': 'Failed to retrieve status information'}
+
+
+class TestRecordWriter:
+    
+    def test_buffers_until_size_reached(self):
+        out = io.StringIO()
+        writer = get_all_errors.RecordWriter(out, buffer_size=10, flush_interval=60)
+        
+        writer.write("abcd")
+        assert out.getvalue() == ""
+        writer.write("efghijk")
+        assert out.getvalue() == "abcdefghijk"
+        writer.write("l")
+        writer.flush()
+        assert out.getvalue() == "abcdefghijkl"
+    
+    def test_flushes_after_interval(self):
+        out = io.StringIO()
+        writer = get_all_errors.RecordWriter(out, buffer_size=1000, flush_interval=0)
+        
+        writer.write("x")
+        
+        assert out.getvalue() == "x"
+
+
+class TestWatchMode:
+    
+    def _status(self, v1_errors=2.0, v1_timestamp=200, media_warnings=4):
+        return {'status': {
+            'https://example.com/master.m3u8': {
+                'Errors': 1, 'Warnings': 0, 'Timestamp': 100, 'LinkID': 'master-link',
+                'Variants': {
+                    'v1': {'Errors': v1_errors, 'Warnings': 1.0, 'Timestamp': v1_timestamp, 'LinkID': 'v1-link'},
+                    'v2': {'Errors': 0.0, 'Warnings': 0.0, 'Timestamp': v1_timestamp, 'LinkID': 'v2-link'},
+                }
+            },
+            'https://example.com/media.m3u8': {
+                'Errors': 0, 'Warnings': media_warnings, 'Timestamp': 400, 'LinkID': 'media-link'
+            },
+        }}
+    
+    def test_diff_links(self):
+        previous = get_all_errors.snapshot_links(get_all_errors.collect_links(self._status()['status']))
+        previous['gone-link'] = (0, 0, 1)
+        links = get_all_errors.collect_links(self._status(v1_errors=5.0, v1_timestamp=260)['status'])
+        
+        (changed, removed) = get_all_errors.diff_links(links, previous)
+        
+        # v2 has no events, so its timestamp moving is not a change
+        assert [link['linkid'] for link in changed] == ['v1-link']
+        assert changed[0]['start'] == 201
+        assert (changed[0]['errors_delta'], changed[0]['warnings_delta']) == (3, 0)
+        assert removed == ['gone-link']
+    
+    def test_only_changed_links_fetched(self):
+        polls = [self._status(), self._status(), self._status(v1_errors=3.0, v1_timestamp=250)]
+        out = io.StringIO()
+        sleeps = []
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status', side_effect=polls), \
+             patch('get_all_errors.utils.get_records', return_value={'errors': [], 'warnings': []}) as mock_get_records:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.OUTPUT_BUFFER_SIZE = 0
+            get_all_errors.watch_errors(30, output='ndjson', out=out, cycles=3, sleep=sleeps.append)
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        cycles = [record for record in records if record['type'] == 'cycle']
+        summaries = [record for record in records if record['type'] == 'summary']
+        calls = [(call[0][2], call[1]['mode'], call[0][3]) for call in mock_get_records.call_args_list]
+        
+        assert sleeps == [30, 30]
+        assert [cycle['changed'] for cycle in cycles] == [4, 0, 1]
+        assert [summary['detail_requests'] for summary in summaries] == [4, 0, 2]
+        assert calls[-2:] == [('v1-link', 'stream/errors', 201), ('v1-link', 'stream/warnings', 201)]
+        link = [record for record in records if record['type'] == 'link'][-1]
+        assert (link['linkid'], link['change'], link['errors_delta']) == ('v1-link', 'changed', 1)
+    
+    def test_failed_fetch_is_retried_next_cycle(self):
+        polls = [self._status(), self._status(v1_errors=3.0, v1_timestamp=250), self._status(v1_errors=3.0, v1_timestamp=250)]
+        results = iter([{'errors': [], 'warnings': []}] * 4 + [None, {'warnings': []}] + [{'errors': [], 'warnings': []}] * 2)
+        out = io.StringIO()
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status', side_effect=polls), \
+             patch('get_all_errors.utils.get_records', side_effect=lambda *args, **kwargs: next(results)) as mock_get_records:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.OUTPUT_BUFFER_SIZE = 0
+            get_all_errors.watch_errors(30, output='ndjson', out=out, cycles=3, sleep=lambda seconds: None)
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        calls = [(call[0][2], call[1]['mode'], call[0][3]) for call in mock_get_records.call_args_list]
+        
+        # The v1 errors fetch failed in cycle 2, so cycle 3 fetches the same window again
+        assert [record['changed'] for record in records if record['type'] == 'cycle'] == [4, 1, 1]
+        assert calls[-2:] == [('v1-link', 'stream/errors', 201), ('v1-link', 'stream/warnings', 201)]
+    
+    def test_failed_new_link_is_retried_from_since(self):
+        results = iter([None] + [{'errors': [], 'warnings': []}] * 6)
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status', side_effect=[self._status(), self._status()]), \
+             patch('get_all_errors.utils.get_records', side_effect=lambda *args, **kwargs: next(results)) as mock_get_records:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.OUTPUT_BUFFER_SIZE = 0
+            get_all_errors.watch_errors(30, since=90, output='ndjson', out=io.StringIO(), cycles=2,
+                                        sleep=lambda seconds: None)
+        
+        calls = [(call[0][2], call[1]['mode'], call[0][3]) for call in mock_get_records.call_args_list]
+        
+        # The first fetch failed, so cycle 2 retries that link as new, still from since + 1
+        assert len(calls) > 4
+        assert calls[4][:2] == calls[0][:2]
+        assert all(start == 91 for (linkid, mode, start) in calls)
+    
+    def test_status_failure_keeps_previous_snapshot(self):
+        polls = [self._status(), None, self._status(media_warnings=6)]
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status', side_effect=polls), \
+             patch('get_all_errors.utils.get_records', return_value={}) as mock_get_records, \
+             patch('builtins.print') as mock_print:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            get_all_errors.watch_errors(1, cycles=3, sleep=lambda interval: None)
+        
+        print_calls = [call[0][0] for call in mock_print.call_args_list]
+        assert "❌ Failed to retrieve status information" in print_calls
+        assert any("Cycle 3: 1 of 4 link(s) changed" in call for call in print_calls)
+        assert mock_get_records.call_args_list[-1][0][2] == 'media-link'
+    
+    def test_watch_flag(self):
+        with patch('sys.argv', ['get_all_errors.py', '--watch', '15', '--output', 'ndjson']), \
+             patch('get_all_errors.watch_errors') as mock_watch:
+            get_all_errors.main()
+        
+        assert mock_watch.call_args[0] == (15.0,)
+        assert mock_watch.call_args[1]['output'] == 'ndjson'
+    
+    def test_watch_rejects_json_output(self):
+        with patch('sys.argv', ['get_all_errors.py', '--watch', '15', '--output', 'json']), \
+             patch('sys.stderr'):
+            with pytest.raises(SystemExit):
+                get_all_errors.main()
+
+
+class TestTopLinks:
+    
+    def test_ranks_by_errors_then_warnings(self):
+        links = get_all_errors.collect_links(MASTER_STATUS)
+        
+        ranked = get_all_errors.top_links(links, 3)
+        
+        assert [(link['rank'], link['linkid']) for link in ranked] == [
+            (1, 'v1-link'), (2, 'master-link'), (3, 'media-link')]
+    
+    def test_skips_clean_links(self):
+        links = get_all_errors.collect_links(MASTER_STATUS)
+        
+        assert 'v2-link' not in [link['linkid'] for link in get_all_errors.top_links(links, 10)]
+    
+    def test_large_account(self):
+        links = [{'linkid': 'link-%d' % i, 'errors': i % 97, 'warnings': i % 13,
+                  'has_errors': i % 97 > 0, 'has_warnings': i % 13 > 0} for i in range(10000)]
+        
+        ranked = get_all_errors.top_links(links, 5)
+        expected = sorted(links, key=lambda link: (link['errors'], link['warnings']), reverse=True)[:5]
+        
+        assert [link['linkid'] for link in ranked] == [link['linkid'] for link in expected]
+    
+    @patch('get_all_errors.utils.get_all_status')
+    @patch('get_all_errors.utils.get_records')
+    @patch('builtins.print')
+    def test_only_top_links_fetched(self, mock_print, mock_get_records, mock_get_status):
+        mock_get_status.return_value = {'status': MASTER_STATUS}
+        mock_get_records.return_value = {}
+        with patch('get_all_errors.Config') as mock_config:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            get_all_errors.get_all_errors(top=1)
+        
+        assert {call[0][2] for call in mock_get_records.call_args_list} == {'v1-link'}
+        print_calls = [call[0][0] for call in mock_print.call_args_list]
+        assert "#1 Variant [v1] of MASTER [https://example.com/master.m3u8]" in print_calls
+        assert "Total errors found: 3" in print_calls
+        assert "Links reported: top 1 by errors" in print_calls
+
+
+class TestSignatureMode:
+    
+    def _run(self, output, out=None):
+        with patch('get_all_errors.Config') as mock_config, \
+             patch('get_all_errors.utils.get_all_status', return_value={'status': MASTER_STATUS}), \
+             patch('get_all_errors.utils.get_records') as mock_get_records, \
+             patch('builtins.print') as mock_print:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.OUTPUT_BUFFER_SIZE = 1024
+            mock_get_records.side_effect = lambda server, apikey, linkid, start, end, mode, chunks=None: (
+                {'errors': [{'message': 'HTTP 503 on https://cdn/%s/seg_%d.ts' % (linkid, end)}]}
+                if mode == 'stream/errors' else {'warnings': [{'message': 'Late by %d ms' % end}]})
+            get_all_errors.get_all_errors(output=output, out=out, signatures=True)
+        return [call[0][0] for call in mock_print.call_args_list]
+    
+    def test_text_signature_table(self):
+        print_calls = self._run('text')
+        
+        assert "❌ 2x on 2 link(s): HTTP <n> on <url>" in print_calls
+        assert "⚠️  2x on 2 link(s): Late by <n> ms" in print_calls
+        assert "        LinkIDs: master-link, v1-link" in print_calls
+        assert "Distinct signatures: 2 from 4 record(s)" in print_calls
+        assert not any(str(call).startswith("MASTER [") for call in print_calls)
+    
+    def test_ndjson_signature_records(self):
+        out = io.StringIO()
+        self._run('ndjson', out)
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        
+        assert [record['type'] for record in records] == ['signature', 'signature', 'summary']
+        assert records[0]['links'] == 2
+        assert records[-1]['signatures'] == 2
+
+
+class TestShardedReport:
+    
+    def _account(self, links=24):
+        status = {}
+        for i in range(links):
+            status['https://example.com/stream%d.m3u8' % i] = {
+                'Errors': i % 3, 'Warnings': i % 2, 'Timestamp': 1000 + i, 'LinkID': 'link-%d' % i}
+        return status
+    
+    def _serve(self, server, status):
+        server.routes['/api/status'] = (200, {}, json.dumps({'status': status}).encode())
+        
+        def records(handler):
+            query = dict(part.split('=', 1) for part in handler.path.split('?', 1)[1].split('&'))
+            key = 'errors' if handler.path.startswith('/api/stream/errors') else 'warnings'
+            body = {key: [{'message': 'HTTP 503 on segment_%s.ts' % query['linkid'], 'timestamp': int(query['end'])}]}
+            return (200, {}, json.dumps(body).encode())
+        
+        server.routes['/api/stream/errors'] = records
+        server.routes['/api/stream/warnings'] = records
+    
+    def _run(self, server, **kwargs):
+        out = io.StringIO()
+        with patch.object(get_all_errors.Config, 'API_KEY', 'test-api-key'), \
+             patch.object(get_all_errors.Config, 'get_server_url', return_value=server.url):
+            get_all_errors.get_all_errors(output='ndjson', out=out, **kwargs)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+    
+    def test_shard_of_is_stable(self):
+        shards = [get_all_errors.shard_of('link-%d' % i, 4) for i in range(100)]
+        
+        assert shards == [get_all_errors.shard_of('link-%d' % i, 4) for i in range(100)]
+        assert set(shards) == {0, 1, 2, 3}
+    
+    def test_sharded_matches_single_process(self, local_http_server):
+        self._serve(local_http_server, self._account())
+        
+        single = self._run(local_http_server)
+        sharded = self._run(local_http_server, processes=3, concurrency=2)
+        
+        def key(record):
+            return (record['type'], record['linkid'], record.get('message', ''))
+        body = [record for record in single if record['type'] != 'summary']
+        sharded_body = [record for record in sharded if record['type'] != 'summary']
+        assert sorted(sharded_body, key=key) == sorted(body, key=key)
+        for field in ('streams', 'errors', 'warnings', 'detail_requests'):
+            assert sharded[-1][field] == single[-1][field]
+        assert sharded[-1]['processes'] == 3
+    
+    def test_sharded_text_keeps_variants_under_their_master(self, local_http_server, capsys):
+        status = {}
+        for m in range(6):
+            status['https://example.com/m%d.m3u8' % m] = {
+                'Errors': 0, 'Warnings': 0, 'Timestamp': 1000, 'LinkID': 'master-%d' % m,
+                'Variants': {'https://example.com/m%d_v%d.m3u8' % (m, v): {
+                    'Errors': 1, 'Warnings': 0, 'Timestamp': 1000, 'LinkID': 'variant-%d-%d' % (m, v)}
+                    for v in range(2)}}
+        self._serve(local_http_server, status)
+        
+        with patch.object(get_all_errors.Config, 'API_KEY', 'test-api-key'), \
+             patch.object(get_all_errors.Config, 'get_server_url', return_value=local_http_server.url):
+            get_all_errors.get_all_errors(processes=2)
+        
+        current = None
+        variants = 0
+        for line in capsys.readouterr().out.splitlines():
+            if line.startswith("MASTER ["):
+                current = line.split('/')[-1].split('.')[0]
+            elif line.startswith("|-- Variant ["):
+                assert current is not None
+                assert line.split('/')[-1].startswith(current + '_v')
+                variants += 1
+        assert variants == 12
+    
+    @patch('get_all_errors.SHARD_CHUNK_SIZE', 4)
+    @patch.object(get_all_errors.Config, 'OUTPUT_BUFFER_SIZE', 0)
+    def test_shard_output_is_streamed_while_worker_runs(self, tmp_path):
+        path = tmp_path / "shard0"
+        path.write_text('\n{"linkid": "a"}')
+        future = concurrent.futures.Future()
+        out = io.StringIO()
+        report = get_all_errors.JsonReport(out)
+        report.start()
+        report.write_fragment('\n{"linkid": "first"}')
+        
+        def worker():
+            # The parent copies what was written so far before the shard finishes
+            deadline = time.time() + 5
+            while '"a"}' not in out.getvalue() and time.time() < deadline:
+                time.sleep(0.01)
+            with open(path, 'a') as stream:
+                stream.write(',\n{"linkid": "b"}')
+            future.set_result(None)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        with open(path, encoding='utf-8', newline='') as stream:
+            get_all_errors._stream_shard(stream, future, report, poll=0.01)
+        thread.join()
+        report.finish({})
+        
+        assert [link['linkid'] for link in json.loads(out.getvalue())['links']] == ['first', 'a', 'b']
+    
+    def test_sharded_signatures_and_watermarks(self, local_http_server, tmp_path):
+        self._serve(local_http_server, self._account())
+        state_file = str(tmp_path / "watermarks.json")
+        
+        records = self._run(local_http_server, processes=2, signatures=True, state_file=state_file)
+        
+        signatures = {record['kind']: record for record in records if record['type'] == 'signature'}
+        assert signatures['error']['links'] == 16
+        assert signatures['warning']['links'] == 12
+        assert len(get_all_errors.load_watermarks(state_file)) == 24
+    
+    def test_json_fragments_merge_into_one_document(self, local_http_server):
+        self._serve(local_http_server, self._account(8))
+        out = io.StringIO()
+        with patch.object(get_all_errors.Config, 'API_KEY', 'test-api-key'), \
+             patch.object(get_all_errors.Config, 'get_server_url', return_value=local_http_server.url):
+            get_all_errors.get_all_errors(output='json', out=out, processes=3)
+        
+        document = json.loads(out.getvalue())
+        
+        assert sorted(link['linkid'] for link in document['links']) == sorted('link-%d' % i for i in range(8))
+
+
+class TestFetchRecent:
+    
+    def _history(self, timestamps):
+        calls = []
+        
+        def fake_get_records(server, apikey, linkid, start, end, mode, chunks=None):
+            calls.append((start, end))
+            return {'errors': [{'message': 'e%d' % t, 'timestamp': t} for t in timestamps if start <= t <= end]}
+        return (calls, fake_get_records)
+    
+    def test_probes_backwards_in_growing_windows(self):
+        # One error every 100 seconds over ~11.5 days
+        (calls, fake) = self._history(range(0, 1000000, 100))
+        
+        with patch('get_all_errors.utils.get_records', side_effect=fake):
+            data = get_all_errors.fetch_recent('s', 'k', 'l', 0, 999999, 'stream/errors', 50, window=1000)
+        
+        assert calls == [(999000, 999999), (997000, 998999), (993000, 996999)]
+        assert len(data['errors']) == 50
+        assert data['errors'][-1]['timestamp'] == 999900
+        assert data['errors'][0]['timestamp'] == 995000
+    
+    def test_stops_at_start(self):
+        (calls, fake) = self._history([5, 50, 500])
+        
+        with patch('get_all_errors.utils.get_records', side_effect=fake):
+            data = get_all_errors.fetch_recent('s', 'k', 'l', 10, 5000, 'stream/errors', 10, window=1000)
+        
+        assert calls == [(4001, 5000), (2001, 4000), (10, 2000)]
+        assert [record['timestamp'] for record in data['errors']] == [50, 500]
+    
+    def test_failed_probe(self):
+        with patch('get_all_errors.utils.get_records', return_value=None):
+            assert get_all_errors.fetch_recent('s', 'k', 'l', 0, 5000, 'stream/errors', 10) is None
+    
+    @patch('get_all_errors.utils.get_all_status')
+    @patch('get_all_errors.utils.get_records')
+    @patch('builtins.print')
+    def test_max_per_link_option(self, mock_print, mock_get_records, mock_get_status):
+        mock_get_status.return_value = {'status': MASTER_STATUS}
+        mock_get_records.side_effect = lambda server, apikey, linkid, start, end, mode, chunks=None: (
+            {'errors': [{'message': 'E%d' % t, 'timestamp': t} for t in range(start, end + 1)]}
+            if mode == 'stream/errors' else {'warnings': []})
+        with patch('get_all_errors.Config') as mock_config:
+            mock_config.API_KEY = 'test-api-key'
+            mock_config.get_server_url.return_value = 'https://hlsanalyzer.com'
+            mock_config.RECENT_PROBE_WINDOW = 10
+            get_all_errors.get_all_errors(max_per_link=3)
+        
+        print_calls = [call[0][0] for call in mock_print.call_args_list]
+        errors = [call for call in print_calls if call.startswith("        ❌ E")]
+        # Newest three of the master (timestamp 100) then of variant v1 (timestamp 200)
+        assert errors == ["        ❌ E98", "        ❌ E99", "        ❌ E100",
+                          "        ❌ E198", "        ❌ E199", "        ❌ E200"]
+        assert mock_get_records.call_args_list[0][0][3:5] == (91, 100)
+
+
+class TestTransferSummary:
+    
+    def _serve(self, server):
+        server.routes['/api/status'] = (200, {}, json.dumps({'status': {
+            'https://example.com/stream.m3u8': {'Errors': 2, 'Warnings': 0, 'Timestamp': 1000, 'LinkID': 'link-1'}}}).encode())
+        body = json.dumps({'errors': [{'message': 'HTTP 503 on segment.ts', 'timestamp': i} for i in range(200)]})
+        server.routes['/api/stream/errors'] = (200, {'Content-Encoding': 'gzip'}, gzip.compress(body.encode()))
+        return len(body)
+    
+    def _run(self, server, **kwargs):
+        with patch.object(get_all_errors.Config, 'API_KEY', 'test-api-key'), \
+             patch.object(get_all_errors.Config, 'get_server_url', return_value=server.url):
+            get_all_errors.get_all_errors(**kwargs)
+    
+    def test_summary_reports_wire_and_decoded_bytes(self, local_http_server):
+        decoded = self._serve(local_http_server)
+        out = io.StringIO()
+        
+        self._run(local_http_server, output='ndjson', out=out)
+        
+        summary = [json.loads(line) for line in out.getvalue().splitlines()][-1]
+        assert summary['decoded_bytes'] == decoded
+        assert 0 < summary['wire_bytes'] < decoded
+    
+    def test_text_summary_prints_transfer(self, local_http_server, capsys):
+        self._serve(local_http_server)
+        
+        self._run(local_http_server)
+        
+        assert "Detail transfer:" in capsys.readouterr().out
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import pytest
+import threading
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import rate_limit
+import utils
+
+
+class FakeClock:
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    
+    def test_burst_then_paced(self):
+        clock = FakeClock()
+        bucket = rate_limit.TokenBucket(rate=2, capacity=3, clock=clock)
+        
+        waits = [bucket.reserve() for _ in range(5)]
+        
+        assert waits == [0.0, 0.0, 0.0, 0.5, 1.0]
+    
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = rate_limit.TokenBucket(rate=1, capacity=2, clock=clock)
+        bucket.reserve()
+        bucket.reserve()
+        
+        clock.now += 1.5
+        
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == pytest.approx(0.5)
+    
+    def test_capacity_is_capped(self):
+        clock = FakeClock()
+        bucket = rate_limit.TokenBucket(rate=10, capacity=2, clock=clock)
+        
+        clock.now += 100
+        
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.1]
+    
+    def test_thread_safety(self):
+        bucket = rate_limit.TokenBucket(rate=1, capacity=1000)
+        
+        threads = [threading.Thread(target=lambda: [bucket.reserve() for _ in range(100)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # 800 tokens taken from a full 1000-token bucket
+        assert bucket.reserve(200) == 0.0
+        assert bucket.reserve() > 0
+
+
+@pytest.mark.skipif(rate_limit.fcntl is None, reason="requires fcntl")
+class TestFileTokenBucket:
+    
+    def test_state_shared_between_instances(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / "status.bucket")
+        first = rate_limit.FileTokenBucket(path, rate=1, capacity=2, clock=clock)
+        second = rate_limit.FileTokenBucket(path, rate=1, capacity=2, clock=clock)
+        
+        assert first.reserve() == 0.0
+        assert second.reserve() == 0.0
+        assert first.reserve() == 1.0
+        assert second.reserve() == 2.0
+    
+    def test_state_shared_across_processes(self, tmp_path):
+        import multiprocessing
+        path = str(tmp_path / "errors.bucket")
+        
+        procs = [multiprocessing.Process(target=_reserve_many, args=(path, 25)) for _ in range(4)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join(10)
+        
+        # 100 of the 1000 burst tokens were consumed by the other processes
+        bucket = rate_limit.FileTokenBucket(path, rate=0.001, capacity=1000)
+        assert bucket.reserve(899) == 0.0
+        assert bucket.reserve(2) > 0
+
+
+def _reserve_many(path, count):
+    bucket = rate_limit.FileTokenBucket(path, rate=0.001, capacity=1000)
+    for _ in range(count):
+        bucket.reserve()
+
+
+class TestRateLimiter:
+    
+    def test_endpoint_of(self):
+        assert rate_limit.endpoint_of("https://test.com/api/stream/errors?apikey=k") == "stream/errors"
+        assert rate_limit.endpoint_of("https://test.com/api/status?apikey=k") == "status"
+    
+    def test_per_endpoint_limits(self):
+        limiter = rate_limit.RateLimiter(limits={'status': (1, 1)}, default=None, state_dir=None)
+        
+        assert limiter.reserve("https://test.com/api/status") == 0.0
+        assert limiter.reserve("https://test.com/api/status") > 0
+        # Endpoints without a limit are never throttled
+        assert limiter.reserve("https://test.com/api/stream/errors") == 0.0
+        
+        stats = limiter.stats()
+        assert stats['status']['requests'] == 2
+        assert stats['status']['throttled'] == 1
+        assert 'stream/errors' not in stats
+    
+    def test_default_limit(self):
+        limiter = rate_limit.RateLimiter(limits={}, default=(1, 1), state_dir=None)
+        
+        assert limiter.enabled
+        limiter.reserve("https://test.com/api/stream/warnings")
+        assert limiter.reserve("https://test.com/api/stream/warnings") > 0
+    
+    def test_disabled_by_default(self):
+        limiter = rate_limit.RateLimiter(limits={}, default=None, state_dir=None)
+        
+        assert not limiter.enabled
+    
+    @pytest.mark.skipif(rate_limit.fcntl is None, reason="requires fcntl")
+    def test_state_dir_uses_file_buckets(self, tmp_path):
+        limiter = rate_limit.RateLimiter(limits={'stream/errors': (5, 5)}, default=None, state_dir=str(tmp_path))
+        
+        limiter.reserve("https://test.com/api/stream/errors")
+        
+        assert os.listdir(tmp_path) == ['stream_errors.bucket']
+        assert limiter.blocking
+        assert not rate_limit.RateLimiter(limits={}, default=(1, 1), state_dir=None).blocking
+
+
+class TestRateLimitedRequests:
+    
+    @pytest.fixture(autouse=True)
+    def limited(self):
+        utils.close_pool()
+        utils.reset_retry_state()
+        with patch.object(utils.Config, 'RATE_LIMITS', {'status': (2, 1)}), \
+                patch.object(utils.Config, 'RATE_LIMIT_DIR', None):
+            utils.reset_rate_limiter()
+            yield
+        utils.reset_rate_limiter()
+        utils.close_pool()
+    
+    def test_requests_are_paced(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        
+        with patch('rate_limit.time.sleep') as mock_sleep:
+            for _ in range(3):
+                utils.get_all_status(local_http_server.url, "api-key")
+        
+        assert mock_sleep.call_count == 2
+        stats = utils.get_rate_limit_stats()
+        assert stats['status']['requests'] == 3
+        assert stats['status']['throttled'] == 2
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import pytest
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import record_parser
+
+
+class TestScte35Cue:
+    
+    def _parse(self, text):
+        return record_parser.PARSERS['stream/scte35cues'].parse(text)
+    
+    def test_cue_type_and_duration(self):
+        assert self._parse("SCTE-35 Cue In 30.5 seconds") == {
+            'cue_type': 'Cue In', 'duration': 30.5, 'format': 'scte35-cue'}
+        assert self._parse("SCTE-35 Cue Out 30.0 seconds")['cue_type'] == 'Cue Out'
+    
+    def test_splice_id_before_or_after_duration(self):
+        fields = self._parse("Cue-Out-Cont splice_event_id=0x1F, 12.5s remaining")
+        
+        assert fields['splice_id'] == '0x1F'
+        assert fields['cue_type'] == 'Cue Out Cont'
+        assert fields['duration'] == 12.5
+        
+        fields = self._parse("Cue Out 30 seconds (Splice ID 4242)")
+        assert (fields['duration'], fields['splice_id']) == (30.0, '4242')
+    
+    def test_numbers_are_not_durations_without_units(self):
+        assert 'duration' not in self._parse("Cue Out splice 5 (variant 3)")
+    
+    def test_first_value_wins(self):
+        assert self._parse("Cue In 30 seconds, break was 60 seconds")['duration'] == 30.0
+    
+    def test_unrecognized_record(self):
+        assert self._parse("test") is None
+
+
+class TestAlertEvent:
+    
+    def _parse(self, text):
+        return record_parser.PARSERS['stream/alertevents'].parse(text)
+    
+    def test_all_fields(self):
+        assert self._parse("STREAM OUTAGE ALERT detected for 5 minutes") == {
+            'alert_type': 'STREAM', 'status': 'OUTAGE ALERT', 'duration': 5.0, 'units': 'minutes',
+            'format': 'alert-event'}
+        assert self._parse("SCTE-35 ALERT CLEARED after 30 seconds")['alert_type'] == 'SCTE-35'
+    
+    def test_duration_is_the_number_before_units(self):
+        assert self._parse("STREAM OUTAGE ALERT for variant 3 lasted 120 seconds")['duration'] == 120.0
+    
+    def test_incomplete_alert(self):
+        assert self._parse("STREAM OUTAGE ALERT") is None
+
+
+class TestSummaries:
+    
+    def _summaries(self, mode, field, texts):
+        records = [{'timestamp': i, field: text} for (i, text) in enumerate(texts)]
+        return [summary for (ts, record_hash, text, summary) in record_parser.parse_summaries(mode, records)]
+    
+    def test_scte35_duration_follows_cue_in(self):
+        assert self._summaries('stream/scte35cues', 'scte35', [
+            "SCTE-35 Cue In 30.5 seconds",
+            "Cue Out 30.000 seconds, Cue In 12.5 seconds",
+            "Cue In at pts 100 s after Cue Out 30.0 seconds",
+            "SCTE-35 Cue Out 30.0 seconds",
+        ]) == [('30.5',), ('12.5',), None, None]
+    
+    def test_alert_takes_last_duration(self):
+        assert self._summaries('stream/alertevents', 'alerts', [
+            "STREAM OUTAGE ALERT detected for 5 minutes",
+            "STREAM OUTAGE ALERT for 3 seconds since 2024 12 minutes",
+            "STREAM OUTAGE ALERT",
+        ]) == [('STREAM', 'OUTAGE ALERT', '5', 'minutes'), ('STREAM', 'OUTAGE ALERT', '12', 'minutes'), None]
+    
+    def test_summary_hash_matches_parse_records(self):
+        records = [{'timestamp': 10, 'alerts': 'SCTE-35 ALERT CLEARED after 30 seconds'}]
+        
+        (summary,) = record_parser.parse_summaries('stream/alertevents', records)
+        (parsed,) = record_parser.parse_records('stream/alertevents', records)
+        
+        assert summary[:3] == parsed[:3]
+
+
+    def test_registered_format_supplies_summary(self):
+        original = list(record_parser.PARSERS['stream/alertevents'].formats)
+        try:
+            record_parser.register('stream/alertevents', record_parser.RecordFormat(
+                'ad-break', r'(?P<alert_type>AD BREAK) (?P<status>MISSED|LATE) after (?P<duration>\d+) (?P<units>seconds)',
+                converters={'duration': int}, summary=('alert_type', 'status', 'duration', 'units')))
+            
+            assert self._summaries('stream/alertevents', 'alerts', [
+                "AD BREAK LATE after 4 seconds",
+                "STREAM OUTAGE ALERT for 3 seconds since 2024 12 minutes",
+                "AD BREAK",
+            ]) == [('AD BREAK', 'LATE', 4, 'seconds'), ('STREAM', 'OUTAGE ALERT', '12', 'minutes'), None]
+        finally:
+            record_parser.PARSERS['stream/alertevents'].formats[:] = original
+    
+    def test_summary_needs_every_column(self):
+        record_format = record_parser.RecordFormat(
+            'partial', r'CUE (?P<duration>\d+)?', summary=('duration',))
+        
+        assert record_format.summarize("CUE 12") == ('12',)
+        assert record_format.summarize("CUE") is None
+
+
+class TestRegistry:
+    
+    def test_formats_tried_in_order(self):
+        parser = record_parser.RecordParser('alerts')
+        parser.register(record_parser.ALERT_EVENT)
+        parser.register(record_parser.RecordFormat(
+            'ad-break', r'AD BREAK (?P<status>MISSED|LATE)', required=('status',)))
+        
+        assert parser.parse("AD BREAK MISSED")['format'] == 'ad-break'
+        assert parser.parse("STREAM OUTAGE ALERT detected for 5 minutes")['format'] == 'alert-event'
+        assert parser.parse("something else") is None
+    
+    def test_register_on_mode(self):
+        record_format = record_parser.RecordFormat('marker', r'MARKER (?P<marker>\d+)')
+        original = list(record_parser.PARSERS['stream/scte35cues'].formats)
+        try:
+            assert record_parser.register('stream/scte35cues', record_format) is record_format
+            # Registered formats come after the built-in ones
+            assert record_parser.PARSERS['stream/scte35cues'].parse("MARKER 7") == {'marker': '7', 'format': 'marker'}
+        finally:
+            record_parser.PARSERS['stream/scte35cues'].formats[:] = original
+    
+    def test_parse_records(self):
+        records = [{'timestamp': 10, 'scte35': 'Cue In 30.0 seconds'}, {'timestamp': 20, 'scte35': 'noise'}]
+        
+        parsed = list(record_parser.parse_records('stream/scte35cues', records))
+        
+        expected_hash = hashlib.sha1(b'Cue In 30.0 seconds').hexdigest()[0:8]
+        assert parsed[0] == (10, expected_hash, 'Cue In 30.0 seconds',
+                             {'cue_type': 'Cue In', 'duration': 30.0, 'format': 'scte35-cue'})
+        assert parsed[1][3] is None
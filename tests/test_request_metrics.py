@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import pytest
+import asyncio
+import io
+import json
+import random
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import request_metrics
+import utils
+import async_utils
+
+
+class TestLatencyHistogram:
+    
+    def test_percentiles_within_relative_error(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-3, 1) for _ in range(10000)]
+        histogram = request_metrics.LatencyHistogram()
+        for value in values:
+            histogram.add(value)
+        
+        values.sort()
+        for percent in (50, 95, 99):
+            exact = values[int(len(values) * percent / 100) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=0.1)
+        assert histogram.max == values[-1]
+    
+    def test_empty_histogram(self):
+        assert request_metrics.LatencyHistogram().summary()['p99'] == 0.0
+    
+    def test_tiny_values(self):
+        histogram = request_metrics.LatencyHistogram()
+        histogram.add(0.0)
+        histogram.add(0.00001)
+        
+        assert histogram.percentile(50) <= request_metrics.LatencyHistogram.MIN_VALUE
+
+
+class TestRequestMetrics:
+    
+    def _event(self, endpoint, total, status=200):
+        return {'endpoint': endpoint, 'status': status, 'dns': 0.0, 'connect': 0.0, 'tls': 0.0,
+                'ttfb': total / 2, 'transfer': total / 2, 'total': total, 'wire_bytes': 10, 'decoded_bytes': 40}
+    
+    def test_summary_per_endpoint(self):
+        metrics = request_metrics.RequestMetrics()
+        for i in range(100):
+            metrics(self._event('stream/errors', 0.010 + i * 0.001))
+        metrics(self._event('status', 0.5, status=503))
+        metrics(self._event('status', 0.1, status=None))
+        
+        summary = metrics.summary()
+        
+        assert summary['stream/errors']['requests'] == 100
+        assert summary['stream/errors']['decoded_bytes'] == 4000
+        assert summary['stream/errors']['latency']['total']['p50'] == pytest.approx(0.060, rel=0.1)
+        assert summary['status']['errors'] == 2
+        assert summary['status']['statuses'] == {'503': 1, 'error': 1}
+    
+    def test_dump_and_export(self, tmp_path):
+        metrics = request_metrics.RequestMetrics()
+        metrics(self._event('status', 0.25))
+        
+        out = io.StringIO()
+        metrics.dump(out)
+        path = tmp_path / "metrics.json"
+        metrics.dump_to(str(path))
+        
+        assert 'status' in out.getvalue()
+        assert json.loads(path.read_text())['status']['requests'] == 1
+
+
+class TestRequestHooks:
+    
+    @pytest.fixture
+    def events(self):
+        utils.close_pool()
+        utils.reset_retry_state()
+        collected = []
+        utils.add_request_hook(collected.append)
+        yield collected
+        utils.remove_request_hook(collected.append)
+        utils.reset_retry_state()
+        utils.close_pool()
+    
+    def test_phase_timings_reported(self, local_http_server, events):
+        local_http_server.routes['/api/stream/errors'] = (200, {}, b'{"errors": []}')
+        url = local_http_server.url + "/api/stream/errors?apikey=k&start=0&end=1&linkid=a"
+        
+        utils.load_json_from_uri(url)
+        utils.load_json_from_uri(url)
+        
+        assert len(events) == 2
+        (first, second) = events
+        assert first['endpoint'] == 'stream/errors'
+        assert first['status'] == 200
+        assert first['reused'] is False
+        assert first['dns'] > 0 and first['connect'] > 0
+        assert first['wire_bytes'] == len(b'{"errors": []}')
+        assert first['total'] >= first['ttfb']
+        assert second['reused'] is True
+        assert second['dns'] == second['connect'] == 0.0
+    
+    def test_failed_request_reported(self, events):
+        with patch.object(utils.Config, 'RETRY_MAX_ATTEMPTS', 1):
+            utils.reset_retry_state()
+            with pytest.raises(ConnectionRefusedError):
+                utils.load_from_uri("http://127.0.0.1:1/api/status")
+        
+        assert events[0]['status'] is None
+        assert 'ConnectionRefusedError' in events[0]['error']
+    
+    def test_failing_hook_does_not_break_requests(self, local_http_server, events):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        
+        def broken(event):
+            raise RuntimeError("hook failure")
+        
+        utils.add_request_hook(broken)
+        try:
+            with patch('builtins.print'):
+                assert utils.load_json_from_uri(local_http_server.url + "/api/status") == {}
+        finally:
+            utils.remove_request_hook(broken)
+        
+        assert len(events) == 1
+    
+    def test_async_client_reports_events(self, local_http_server, events):
+        local_http_server.routes['/api/status'] = (200, {}, b'{"status": {}}')
+        
+        async def scenario():
+            async with async_utils.AsyncClient() as client:
+                await client.get_all_status(local_http_server.url, "api-key")
+        
+        asyncio.run(scenario())
+        
+        assert events[0]['endpoint'] == 'status'
+        assert events[0]['status'] == 200
+        assert events[0]['connect'] > 0
+    
+    def test_metrics_aggregate_hook_events(self, local_http_server, events):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        metrics = request_metrics.RequestMetrics()
+        utils.add_request_hook(metrics)
+        try:
+            for _ in range(3):
+                utils.load_json_from_uri(local_http_server.url + "/api/status")
+        finally:
+            utils.remove_request_hook(metrics)
+        
+        assert metrics.summary()['status']['requests'] == 3
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import pytest
+import io
+import urllib.error
+import email.utils
+import time
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import resilience
+import utils
+
+
+def http_error(code, headers=None):
+    return urllib.error.HTTPError("https://test.com", code, "error", headers or {}, io.BytesIO(b''))
+
+
+class TestRetryPolicy:
+    
+    def test_only_idempotent_methods_are_retried(self):
+        policy = resilience.RetryPolicy()
+        
+        assert policy.is_retryable('GET', ConnectionResetError())
+        assert not policy.is_retryable('POST', ConnectionResetError())
+    
+    def test_retryable_statuses(self):
+        policy = resilience.RetryPolicy()
+        
+        assert policy.is_retryable('GET', http_error(503))
+        assert policy.is_retryable('GET', http_error(429))
+        assert not policy.is_retryable('GET', http_error(404))
+        assert not policy.is_retryable('GET', ValueError("bad json"))
+        assert not policy.is_retryable('GET', resilience.CircuitOpenError("host", 1.0))
+    
+    def test_decorrelated_jitter_bounds(self):
+        policy = resilience.RetryPolicy(base_delay=1.0, max_delay=10.0)
+        
+        delay = None
+        for _ in range(50):
+            (next_delay, honored) = policy.next_delay(delay)
+            assert not honored
+            assert 1.0 <= next_delay <= min(10.0, max(1.0, (delay or 1.0) * 3))
+            delay = next_delay
+    
+    def test_retry_after_seconds(self):
+        policy = resilience.RetryPolicy(max_retry_after=60)
+        
+        assert policy.next_delay(None, http_error(429, {'Retry-After': '7'})) == (7.0, True)
+        assert policy.next_delay(None, http_error(429, {'Retry-After': '600'})) == (60, True)
+    
+    def test_retry_after_http_date(self):
+        when = email.utils.formatdate(1000030, usegmt=True)
+        
+        assert resilience.parse_retry_after(when, now=1000000) == pytest.approx(30.0)
+        assert resilience.parse_retry_after('soon') is None
+
+
+class TestCircuitBreaker:
+    
+    def test_opens_after_threshold_and_half_opens(self):
+        now = [100.0]
+        breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        
+        breaker.record_failure("api")
+        breaker.before_request("api")
+        breaker.record_failure("api")
+        
+        with pytest.raises(resilience.CircuitOpenError):
+            breaker.before_request("api")
+        
+        now[0] += 10
+        breaker.before_request("api")  # single half-open trial
+        with pytest.raises(resilience.CircuitOpenError):
+            breaker.before_request("api")
+        
+        breaker.record_success("api")
+        breaker.before_request("api")
+        
+        stats = breaker.stats()
+        assert stats['opened'] == 1
+        assert stats['rejected'] == 2
+        assert stats['half_open_trials'] == 1
+        assert stats['open_hosts'] == []
+    
+    def test_failed_trial_reopens(self):
+        now = [0.0]
+        breaker = resilience.CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0])
+        
+        breaker.record_failure("api")
+        now[0] += 5
+        breaker.before_request("api")
+        breaker.record_failure("api")
+        
+        assert breaker.state("api") == resilience.CircuitBreaker.OPEN
+        with pytest.raises(resilience.CircuitOpenError):
+            breaker.before_request("api")
+    
+    def test_hosts_are_independent(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        
+        breaker.record_failure("down.example.com")
+        
+        breaker.before_request("up.example.com")
+        with pytest.raises(resilience.CircuitOpenError):
+            breaker.before_request("down.example.com")
+
+
+class TestCallWithRetries:
+    
+    @pytest.fixture(autouse=True)
+    def fresh_state(self):
+        utils.reset_retry_state()
+        utils.close_pool()
+        yield
+        utils.reset_retry_state()
+        utils.close_pool()
+    
+    def test_transient_errors_are_retried(self, local_http_server):
+        responses = [(503, {}, b'busy'), (502, {}, b'bad gateway'), (200, {}, b'{"status": {}}')]
+        local_http_server.routes['/api/status'] = lambda handler: responses.pop(0)
+        
+        with patch('utils.time.sleep') as mock_sleep:
+            result = utils.get_all_status(local_http_server.url, "api-key")
+        
+        assert result == {"status": {}}
+        assert mock_sleep.call_count == 2
+        assert utils.get_retry_stats()['retries'] == 2
+    
+    def test_retries_exhausted(self, local_http_server):
+        local_http_server.routes['/api/status'] = (503, {'Retry-After': '1'}, b'busy')
+        
+        with patch('utils.time.sleep') as mock_sleep:
+            with patch('builtins.print'):
+                assert utils.get_all_status(local_http_server.url, "api-key") is None
+        
+        assert mock_sleep.call_count == utils.Config.RETRY_MAX_ATTEMPTS - 1
+        stats = utils.get_retry_stats()
+        assert stats['retries_exhausted'] == 1
+        assert stats['retry_after_honored'] == utils.Config.RETRY_MAX_ATTEMPTS - 1
+    
+    def test_post_is_not_retried(self, local_http_server):
+        local_http_server.routes['/api/stream/add'] = (503, {}, b'busy')
+        
+        with patch('utils.time.sleep') as mock_sleep:
+            with patch('builtins.print'):
+                code, result = utils.send_command(local_http_server.url, "api-key", "stream/add", method='POST')
+        
+        assert code == 503
+        mock_sleep.assert_not_called()
+        assert len(local_http_server.requests) == 1
+    
+    def test_client_errors_are_not_retried(self, local_http_server):
+        local_http_server.routes['/api/status'] = (401, {}, b'Unauthorized')
+        
+        with patch('utils.time.sleep') as mock_sleep:
+            with patch('builtins.print'):
+                assert utils.get_all_status(local_http_server.url, "bad-key") is None
+        
+        mock_sleep.assert_not_called()
+    
+    def test_circuit_opens_and_fails_fast(self, local_http_server):
+        local_http_server.routes['/api/status'] = (503, {}, b'down')
+        
+        with patch.object(utils.Config, 'BREAKER_FAILURE_THRESHOLD', 3), \
+                patch.object(utils.Config, 'RETRY_MAX_ATTEMPTS', 1):
+            utils.reset_retry_state()
+            with patch('builtins.print'):
+                for _ in range(5):
+                    assert utils.get_all_status(local_http_server.url, "api-key") is None
+        
+        # Only the first three requests reach the server
+        assert len(local_http_server.requests) == 3
+        stats = utils.get_retry_stats()
+        assert stats['breaker_opened'] == 1
+        assert stats['breaker_rejected'] == 2
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import pytest
+import json
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import response_cache
+import utils
+
+
+class TestCacheKey:
+    
+    def test_apikey_is_hashed(self):
+        key, redacted = response_cache.cache_key('GET', "https://test.com/api/status?apikey=secret-key")
+        
+        assert 'secret-key' not in redacted
+        assert response_cache.hash_apikey('secret-key') in redacted
+    
+    def test_parameter_order_does_not_matter(self):
+        first = response_cache.cache_key('GET', "https://test.com/api/stream/errors?apikey=k&start=1&end=2&linkid=a")
+        second = response_cache.cache_key('GET', "https://test.com/api/stream/errors?linkid=a&end=2&start=1&apikey=k")
+        
+        assert first == second
+    
+    def test_different_params_have_different_keys(self):
+        first = response_cache.cache_key('GET', "https://test.com/api/stream/errors?apikey=k&linkid=a")
+        second = response_cache.cache_key('GET', "https://test.com/api/stream/errors?apikey=k&linkid=b")
+        
+        assert first[0] != second[0]
+
+
+class TestResponseCache:
+    
+    def test_put_and_get(self, tmp_path):
+        cache = response_cache.ResponseCache(str(tmp_path), max_bytes=1024 * 1024, ttl=60)
+        
+        cache.put('abc', 'https://test.com/api/status', b'{"status": {}}', {'ETag': '"v1"'}, 'utf-8')
+        entry = cache.get('abc')
+        
+        assert entry.body == b'{"status": {}}'
+        assert entry.etag == '"v1"'
+        assert entry.charset == 'utf-8'
+        assert entry.is_fresh()
+    
+    def test_missing_entry(self, tmp_path):
+        cache = response_cache.ResponseCache(str(tmp_path))
+        
+        assert cache.get('missing') is None
+    
+    def test_lru_eviction(self, tmp_path):
+        cache = response_cache.ResponseCache(str(tmp_path), max_bytes=700, ttl=60)
+        
+        cache.put('a', 'uri-a', b'x' * 200, {})
+        cache.put('b', 'uri-b', b'x' * 200, {})
+        cache.get('a')
+        cache.put('c', 'uri-c', b'x' * 200, {})
+        
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+        assert cache.stats()['evictions'] == 1
+    
+    def test_index_survives_restart(self, tmp_path):
+        cache = response_cache.ResponseCache(str(tmp_path))
+        cache.put('a', 'uri-a', b'{}', {})
+        
+        reopened = response_cache.ResponseCache(str(tmp_path))
+        
+        assert reopened.stats()['entries'] == 1
+        assert reopened.get('a').body == b'{}'
+
+
+class TestCachedLoadJson:
+    
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path):
+        utils.close_pool()
+        with patch.object(utils.Config, 'HTTP_CACHE_DIR', str(tmp_path)):
+            yield tmp_path
+        utils.close_pool()
+    
+    def test_conditional_request_with_etag(self, local_http_server):
+        def status(handler):
+            if handler.headers.get('If-None-Match') == '"v1"':
+                return (304, {'ETag': '"v1"'}, b'')
+            return (200, {'ETag': '"v1"'}, b'{"status": {"a": 1}}')
+        local_http_server.routes['/api/status'] = status
+        url = local_http_server.url + "/api/status?apikey=secret-key"
+        
+        assert utils.load_json_from_uri(url) == {"status": {"a": 1}}
+        assert utils.load_json_from_uri(url) == {"status": {"a": 1}}
+        
+        assert local_http_server.requests[1][2]['If-None-Match'] == '"v1"'
+        stats = utils.get_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['revalidated'] == 1
+    
+    def test_ttl_without_validators(self, local_http_server):
+        local_http_server.routes['/api/stream/errors'] = (200, {}, b'{"errors": []}')
+        url = local_http_server.url + "/api/stream/errors?apikey=k&start=0&end=10&linkid=a"
+        
+        utils.load_json_from_uri(url)
+        utils.load_json_from_uri(url)
+        
+        assert len(local_http_server.requests) == 1
+        assert utils.get_cache_stats()['hits'] == 1
+    
+    def test_expired_entry_is_refetched(self, local_http_server):
+        local_http_server.routes['/api/stream/errors'] = (200, {}, b'{"errors": []}')
+        url = local_http_server.url + "/api/stream/errors?apikey=k&start=0&end=10&linkid=a"
+        
+        with patch.object(utils.Config, 'HTTP_CACHE_TTL', 0):
+            utils.load_json_from_uri(url)
+            utils.load_json_from_uri(url)
+        
+        assert len(local_http_server.requests) == 2
+    
+    def test_apikey_not_stored_in_clear(self, local_http_server, cache_dir):
+        local_http_server.routes['/api/status'] = (200, {}, b'{"status": {}}')
+        
+        utils.load_json_from_uri(local_http_server.url + "/api/status?apikey=secret-key")
+        
+        for name in os.listdir(cache_dir):
+            assert 'secret-key' not in name
+            with open(os.path.join(cache_dir, name), 'rb') as f:
+                assert b'secret-key' not in f.read()
+    
+    def test_commands_are_not_cached(self, local_http_server):
+        local_http_server.routes['/api/stream/add'] = (200, {}, b'{"status": "added"}')
+        
+        utils.load_json_from_uri(local_http_server.url + "/api/stream/add?apikey=k")
+        utils.load_json_from_uri(local_http_server.url + "/api/stream/add?apikey=k")
+        
+        assert len(local_http_server.requests) == 2
+        assert utils.get_cache_stats()['misses'] == 0
+    
+    def test_cache_disabled_by_default(self):
+        with patch.object(utils.Config, 'HTTP_CACHE_DIR', None):
+            assert utils.get_cache() is None
+            assert utils.get_cache_stats() is None
@@ -85,7 +85,7 @@ class TestPopulateScte35:
         mock_print.assert_called_once_with("No records found for: master123, link456")
         mock_cursor.executemany.assert_not_called()
     
-    @patch('update_db.hashlib.sha1')
+    @patch('record_parser.hashlib.sha1')
     def test_populate_scte35_with_records(self, mock_sha1):
         mock_db = Mock()
         mock_cursor = Mock()
@@ -110,7 +110,7 @@ class TestPopulateScte35:
         assert mock_cursor.executemany.call_count == 2
         mock_db.commit.assert_called_once()
     
-    @patch('update_db.hashlib.sha1')
+    @patch('record_parser.hashlib.sha1')
     @patch('builtins.print')
     def test_populate_scte35_database_error(self, mock_print, mock_sha1):
         mock_db = Mock()
@@ -130,6 +130,19 @@ class TestPopulateScte35:
         mock_print.assert_called_with("Duplicate entry")
 
 
+    def test_summary_duration_is_the_cue_in_value(self):
+        mock_cursor = Mock()
+        records = [
+            {"timestamp": 1, "scte35": "Cue Out 30.000 seconds, Cue In 12.5 seconds"},
+            {"timestamp": 2, "scte35": "Cue In at pts 100 s after Cue Out 30.0 seconds"},
+        ]
+        
+        update_db.populate_scte35(Mock(), mock_cursor, records, "master123", "link456", 1234567890)
+        
+        summary_rows = mock_cursor.executemany.call_args_list[1][0][1]
+        assert [(row[0], row[5]) for row in summary_rows] == [(1, '12.5')]
+
+
 class TestPopulateAlerts:
     
     @patch('builtins.print')
@@ -142,7 +155,7 @@ class TestPopulateAlerts:
         mock_print.assert_called_once_with("No records found for: master123, link456")
         mock_cursor.executemany.assert_not_called()
     
-    @patch('update_db.hashlib.sha1')
+    @patch('record_parser.hashlib.sha1')
     def test_populate_alerts_with_records(self, mock_sha1):
         mock_db = Mock()
         mock_cursor = Mock()
@@ -166,6 +179,31 @@ class TestPopulateAlerts:
         # Should call executemany twice (records and summary)
         assert mock_cursor.executemany.call_count == 2
         mock_db.commit.assert_called_once()
+    
+    def test_summary_duration_is_the_last_before_units(self):
+        mock_cursor = Mock()
+        records = [{"timestamp": 1, "alerts": "STREAM OUTAGE ALERT for 3 seconds since 2024 12 minutes"}]
+        
+        update_db.populate_alerts(Mock(), mock_cursor, records, "master123", "link456", 1234567890)
+        
+        summary_rows = mock_cursor.executemany.call_args_list[1][0][1]
+        assert [row[5:] for row in summary_rows] == [('STREAM', 'OUTAGE ALERT', '12', 'minutes')]
+    
+    def test_registered_format_fills_summary(self):
+        mock_cursor = Mock()
+        records = [{"timestamp": 1, "alerts": "AD BREAK MISSED for 30 seconds"}]
+        original = list(update_db.record_parser.PARSERS['stream/alertevents'].formats)
+        try:
+            update_db.record_parser.register('stream/alertevents', update_db.record_parser.RecordFormat(
+                'ad-break', r'(?P<alert_type>AD BREAK) (?P<status>MISSED) for (?P<duration>\d+) (?P<units>seconds)',
+                summary=('alert_type', 'status', 'duration', 'units')))
+            
+            update_db.populate_alerts(Mock(), mock_cursor, records, "master123", "link456", 1234567890)
+        finally:
+            update_db.record_parser.PARSERS['stream/alertevents'].formats[:] = original
+        
+        summary_rows = mock_cursor.executemany.call_args_list[1][0][1]
+        assert [row[5:] for row in summary_rows] == [('AD BREAK', 'MISSED', '30', 'seconds')]
 
 
 class TestUpdateHlsanalyzerContent:
@@ -183,6 +221,7 @@ class TestUpdateHlsanalyzerContent:
         # Mock database connection
         mock_db = Mock()
         mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = []
         mock_db.cursor.return_value = mock_cursor
         mock_connect.return_value = mock_db
         
@@ -197,6 +236,8 @@ class TestUpdateHlsanalyzerContent:
         }
         mock_get_status.return_value = mock_status_response
         mock_get_records.return_value = [{"test": "data"}]
+        mock_populate_scte35.return_value = 1
+        mock_populate_alerts.return_value = 1
         
         update_db.update_hlsanalyzer_content('test-api-key-123', 'https://test.com')
         
@@ -235,6 +276,7 @@ class TestUpdateHlsanalyzerContent:
         # Mock database
         mock_db = Mock()
         mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = []
         mock_db.cursor.return_value = mock_cursor
         mock_connect.return_value = mock_db
         
@@ -261,6 +303,8 @@ class TestUpdateHlsanalyzerContent:
             with patch('update_db.populate_scte35') as mock_populate_scte35:
                 with patch('update_db.populate_alerts') as mock_populate_alerts:
                     mock_get_records.return_value = []
+                    mock_populate_scte35.return_value = 0
+                    mock_populate_alerts.return_value = 0
                     
                     update_db.update_hlsanalyzer_content('test-key', 'https://test.com')
                     
@@ -270,4 +314,635 @@ class TestUpdateHlsanalyzerContent:
                     
                     print_calls = [call[0][0] for call in mock_print.call_args_list]
                     assert any("MASTER" in call for call in print_calls)
-                    assert any("|-- Variant" in call for call in print_calls)
\ No newline at end of file
+                    assert any("|-- Variant" in call for call in print_calls)
+
+
+class TestIngestWatermarks:
+    
+    def test_ingest_start(self):
+        duration = 400 * 60
+        
+        assert update_db.ingest_start(None, 100000, duration) == 100000 - duration
+        assert update_db.ingest_start(99000, 100000, duration) == 99001
+        # A stale watermark is capped by the fixed window
+        assert update_db.ingest_start(1000, 100000, duration) == 100000 - duration
+        assert update_db.ingest_start(100000, 100000, duration) == 100001
+    
+    def test_load_ingest_watermarks(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = [('v1', 'stream/scte35cues', 500), ('v1', 'stream/alertevents', 400)]
+        
+        watermarks = update_db.load_ingest_watermarks(mock_cursor)
+        
+        assert watermarks == {('v1', 'stream/scte35cues'): 500, ('v1', 'stream/alertevents'): 400}
+    
+    @patch('builtins.print')
+    def test_load_ingest_watermarks_error(self, mock_print):
+        mock_cursor = Mock()
+        mock_error = mysql.connector.Error("no table")
+        mock_error.msg = "Table doesn't exist"
+        mock_cursor.execute.side_effect = mock_error
+        
+        assert update_db.load_ingest_watermarks(mock_cursor) == {}
+    
+    @patch('update_db.Config.INGEST_DEDUP', False)
+    @patch('update_db.migrate_schema', return_value=0)
+    @patch('update_db.connect_db')
+    @patch('update_db.utils.get_all_status')
+    @patch('update_db.utils.get_records')
+    @patch('update_db.populate_scte35')
+    @patch('update_db.populate_alerts')
+    @patch('builtins.print')
+    def test_fetches_only_past_watermark(self, mock_print, mock_populate_alerts, mock_populate_scte35,
+                                         mock_get_records, mock_get_status, mock_connect, mock_migrate):
+        mock_db = Mock()
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = [
+            ('link-1', 'stream/scte35cues', 1234567000),
+            ('link-1', 'stream/alertevents', 1234567890),
+        ]
+        mock_db.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_db
+        mock_get_status.return_value = {'status': {
+            'https://example.com/stream.m3u8': {'Timestamp': 1234567890, 'LinkID': 'link-1'}}}
+        mock_get_records.return_value = []
+        mock_populate_scte35.return_value = 0
+        
+        update_db.update_hlsanalyzer_content('test-key', 'https://test.com')
+        
+        # Alerts are already ingested up to the current timestamp
+        mock_get_records.assert_called_once_with('https://test.com', 'test-key', 'link-1', 1234567001,
+                                                 1234567890, mode="stream/scte35cues", chunks=None)
+        mock_populate_alerts.assert_not_called()
+        watermark_calls = [call for call in mock_cursor.execute.call_args_list
+                           if 'INSERT INTO IngestWatermark' in call[0][0]]
+        assert watermark_calls[0][0][1] == ('link-1', 'stream/scte35cues', 1234567890, watermark_calls[0][0][1][3])
+        mock_db.commit.assert_called()
+    
+    @patch('update_db.connect_db')
+    @patch('update_db.utils.get_all_status')
+    @patch('update_db.utils.get_records')
+    @patch('builtins.print')
+    def test_failed_fetch_keeps_watermark(self, mock_print, mock_get_records, mock_get_status, mock_connect):
+        mock_db = Mock()
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = []
+        mock_db.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_db
+        mock_get_status.return_value = {'status': {
+            'https://example.com/stream.m3u8': {'Timestamp': 1234567890, 'LinkID': 'link-1'}}}
+        mock_get_records.return_value = None
+        
+        update_db.update_hlsanalyzer_content('test-key', 'https://test.com')
+        
+        assert not any('INSERT INTO IngestWatermark' in call[0][0] for call in mock_cursor.execute.call_args_list)
+    
+    def test_populate_returns_status(self):
+        mock_db = Mock()
+        mock_cursor = Mock()
+        
+        assert update_db.populate_scte35(mock_db, mock_cursor, [], "m", "l", 1) == 0
+        assert update_db.populate_scte35(mock_db, mock_cursor, [{"timestamp": 1, "scte35": "Cue In 30.0 seconds"}],
+                                         "m", "l", 1, commit=False) == 2
+        assert mock_db.commit.call_count == 1
+        mock_error = mysql.connector.Error("Database error")
+        mock_error.msg = "Lock wait timeout"
+        mock_cursor.executemany.side_effect = mock_error
+        with patch('builtins.print'):
+            assert update_db.populate_alerts(mock_db, mock_cursor, [{"timestamp": 1, "alerts": "x"}], "m", "l", 1) is None
+
+
+
+class TestCommitBatcher:
+    
+    def test_commits_by_row_count(self):
+        mock_db = Mock()
+        batcher = update_db.CommitBatcher(mock_db, max_rows=100, max_seconds=60, clock=lambda: 0.0)
+        
+        for _ in range(7):
+            batcher.add(30)
+        batcher.commit()
+        
+        # 4 + 3 variants: one commit at 120 rows, one at 90 pending rows at the end
+        assert mock_db.commit.call_count == 2
+        assert batcher.stats()['rows'] == 210
+    
+    def test_commits_by_elapsed_time(self):
+        mock_db = Mock()
+        now = [0.0]
+        batcher = update_db.CommitBatcher(mock_db, max_rows=1000, max_seconds=5, clock=lambda: now[0])
+        
+        batcher.add(1)
+        now[0] = 2.0
+        batcher.add(1)
+        assert mock_db.commit.call_count == 0
+        now[0] = 5.5
+        batcher.add(1)
+        
+        assert mock_db.commit.call_count == 1
+        assert batcher.stats()['rows_per_second'] == pytest.approx(3 / 5.5)
+    
+    def test_rollback_discards_pending_batch(self):
+        mock_db = Mock()
+        batcher = update_db.CommitBatcher(mock_db, max_rows=1000, max_seconds=60, clock=lambda: 0.0)
+        
+        batcher.add(10)
+        batcher.rollback()
+        batcher.commit()
+        
+        mock_db.rollback.assert_called_once()
+        mock_db.commit.assert_not_called()
+        assert batcher.stats()['rolled_back_rows'] == 10
+    
+    @patch('update_db.migrate_schema', return_value=0)
+    @patch('update_db.connect_db')
+    @patch('update_db.utils.get_all_status')
+    @patch('update_db.utils.get_records')
+    @patch('builtins.print')
+    def test_failed_insert_rolls_back_batch(self, mock_print, mock_get_records, mock_get_status, mock_connect,
+                                            mock_migrate):
+        mock_db = Mock()
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = []
+        mock_db.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_db
+        mock_get_status.return_value = {'status': {
+            'https://example.com/a.m3u8': {'Timestamp': 1234567890, 'LinkID': 'link-a'},
+            'https://example.com/b.m3u8': {'Timestamp': 1234567890, 'LinkID': 'link-b'},
+        }}
+        mock_get_records.side_effect = lambda apihost, apikey, linkid, start, end, mode, chunks=None: (
+            [{"timestamp": 1, "scte35": "Cue In 30.0 seconds"}] if mode == "stream/scte35cues"
+            else [{"timestamp": 1, "alerts": "bad"}])
+        
+        mock_error = mysql.connector.Error("Database error")
+        mock_error.msg = "Deadlock found"
+        def executemany(sql, rows):
+            if 'AlertRecord' in sql and rows[0][3] == 'link-b':
+                raise mock_error
+        mock_cursor.executemany.side_effect = executemany
+        
+        # A single fetch worker keeps the write order deterministic
+        with patch.object(update_db.Config, 'INGEST_FETCH_WORKERS', 1):
+            update_db.update_hlsanalyzer_content('test-key', 'https://test.com')
+        
+        # Everything runs in one batch, which is rolled back once link-b's alert insert fails
+        mock_db.rollback.assert_called_once()
+        mock_db.commit.assert_not_called()
+        print_calls = [call[0][0] for call in mock_print.call_args_list]
+        assert any("with 0 commit(s), 1 rolled back batch(es) (5 rows)" in str(call) for call in print_calls)
+
+
+
+class TestIngestPipeline:
+    
+    def _tasks(self, count):
+        return [(None, 'link-%d' % i, "stream/scte35cues", 0, 100 + i) for i in range(count)]
+    
+    @patch('update_db.populate_scte35')
+    def test_overlaps_fetches_with_single_writer(self, mock_populate):
+        import threading
+        writer_threads = set()
+        
+        def slow_fetch(*args, **kwargs):
+            time.sleep(0.05)
+            return []
+        
+        def populate(*args, **kwargs):
+            writer_threads.add(threading.get_ident())
+            return 1
+        mock_populate.side_effect = populate
+        batcher = update_db.CommitBatcher(Mock(), max_rows=1000, max_seconds=60)
+        
+        with patch('update_db.utils.get_records', side_effect=slow_fetch):
+            started = time.perf_counter()
+            timings = update_db.ingest_pipeline(Mock(), Mock(), 'https://test.com', 'key', self._tasks(16),
+                                                1, batcher, workers=8, queue_size=4)
+            elapsed = time.perf_counter() - started
+        
+        assert elapsed < 0.5
+        assert mock_populate.call_count == 16
+        assert writer_threads == {threading.get_ident()}
+        assert batcher.stats()['rows'] == 16
+        assert timings['fetch_seconds'] >= 16 * 0.05
+    
+    @patch('update_db.populate_scte35', return_value=1)
+    def test_backpressure_blocks_fetchers(self, mock_populate):
+        slow_writes = []
+        
+        def slow_populate(*args, **kwargs):
+            time.sleep(0.02)
+            slow_writes.append(1)
+            return 1
+        mock_populate.side_effect = slow_populate
+        batcher = update_db.CommitBatcher(Mock(), max_rows=1000, max_seconds=60)
+        
+        with patch('update_db.utils.get_records', return_value=[]):
+            timings = update_db.ingest_pipeline(Mock(), Mock(), 'https://test.com', 'key', self._tasks(12),
+                                                1, batcher, workers=4, queue_size=2)
+        
+        assert len(slow_writes) == 12
+        assert timings['fetch_blocked_seconds'] > 0.05
+    
+    @patch('update_db.populate_scte35', return_value=0)
+    def test_fetch_exception_does_not_hang_writer(self, mock_populate):
+        batcher = update_db.CommitBatcher(Mock(), max_rows=1000, max_seconds=60)
+        
+        with patch('update_db.utils.get_records', side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                update_db.ingest_pipeline(Mock(), Mock(), 'https://test.com', 'key', self._tasks(3),
+                                          1, batcher, workers=2)
+        
+        # Every task still reached the writer, with no records
+        assert [call[0][2] for call in mock_populate.call_args_list] == [None, None, None]
+    
+    @patch('update_db.populate_scte35', side_effect=RuntimeError("writer failed"))
+    def test_writer_exception_does_not_hang_fetchers(self, mock_populate):
+        batcher = update_db.CommitBatcher(Mock(), max_rows=1000, max_seconds=60)
+        
+        with patch('update_db.utils.get_records', return_value=[]):
+            with pytest.raises(RuntimeError):
+                update_db.ingest_pipeline(Mock(), Mock(), 'https://test.com', 'key', self._tasks(20),
+                                          1, batcher, workers=4, queue_size=1)
+
+
+class TestRunDaemon:
+    
+    def _pool(self, connections):
+        pool = Mock()
+        pool.pool_size = 2
+        pool.get_connection.side_effect = connections
+        return pool
+    
+    @patch('update_db.ingest_cycle', return_value={'rows': 3})
+    @patch('update_db.prepare_database', return_value=0)
+    @patch('update_db.create_db_pool')
+    @patch('update_db.connect_db')
+    @patch('builtins.print')
+    def test_schema_checked_once_and_connections_reused(self, mock_print, mock_connect,
+                                                        mock_create_pool, mock_prepare, mock_ingest):
+        setup_db = Mock()
+        mock_connect.return_value = setup_db
+        pooled = Mock()
+        mock_create_pool.return_value = self._pool([pooled] * 3)
+        sleeps = []
+        
+        update_db.run_daemon('test-key', 'https://test.com', interval=60, jitter=0,
+                             cycles=3, sleep=sleeps.append)
+        
+        mock_connect.assert_called_once()
+        mock_prepare.assert_called_once()
+        setup_db.close.assert_called_once()
+        mock_create_pool.assert_called_once_with('testkey')
+        assert mock_ingest.call_count == 3
+        assert pooled.ping.call_count == 3
+        assert pooled.close.call_count == 3  # Returned to the pool after every cycle
+        assert len(sleeps) == 2
+        assert all(55 < delay <= 60 for delay in sleeps)
+    
+    @patch('update_db.ingest_cycle')
+    @patch('update_db.prepare_database', return_value=0)
+    @patch('update_db.create_db_pool')
+    @patch('update_db.connect_db')
+    @patch('builtins.print')
+    def test_failed_cycle_does_not_stop_daemon(self, mock_print, mock_connect, mock_create_pool, mock_prepare,
+                                               mock_ingest):
+        mock_connect.return_value = Mock()
+        pooled = Mock()
+        mock_create_pool.return_value = self._pool([pooled, pooled])
+        mock_ingest.side_effect = [mysql.connector.Error("server has gone away"), {'rows': 5}]
+        
+        update_db.run_daemon('test-key', 'https://test.com', interval=1, jitter=0,
+                             cycles=2, sleep=lambda seconds: None)
+        
+        assert mock_ingest.call_count == 2
+        assert pooled.close.call_count == 2
+        printed = [str(call) for call in mock_print.call_args_list]
+        assert any("Cycle 1 failed" in line for line in printed)
+        assert any("Cycle 2: 5 rows" in line for line in printed)
+    
+    def test_next_delay(self):
+        assert update_db.next_delay(60, 0, 10) == 50
+        assert update_db.next_delay(60, 0, 90) == 0
+        for _ in range(50):
+            assert 44 <= update_db.next_delay(50, 0.1, 1) <= 54
+
+
+class TestBulkLoader:
+    
+    def _sql(self, cursor):
+        return [call[0][0] for call in cursor.execute.call_args_list]
+    
+    def test_prepare_creates_temporary_staging_tables(self):
+        cursor = Mock()
+        update_db.BulkLoader(cursor).prepare()
+        
+        statements = self._sql(cursor)
+        assert len(statements) == 4
+        assert all(sql.startswith("CREATE TEMPORARY TABLE IF NOT EXISTS ") for sql in statements)
+        assert any("SCTE35RecordStaging (" in sql for sql in statements)
+    
+    def test_writes_multi_row_batches(self):
+        cursor = Mock()
+        loader = update_db.BulkLoader(cursor, batch_rows=2)
+        rows = [(i, 1, 'm', 'v', 'hash%d' % i, 'record') for i in range(5)]
+        
+        loader.add('SCTE35Record', rows[:1])
+        assert cursor.execute.call_count == 0  # Buffered until a full batch
+        loader.add('SCTE35Record', rows[1:])
+        
+        # 5 rows in batches of 2: two full statements, the last row still buffered
+        assert cursor.execute.call_count == 2
+        (sql, params) = cursor.execute.call_args_list[0][0]
+        assert sql.count("(%s, %s, %s, %s, %s, %s)") == 2
+        assert params == list(rows[0]) + list(rows[1])
+        assert loader.staged_rows == 4
+    
+    def test_merge_flushes_and_moves_staged_rows(self):
+        cursor = Mock()
+        loader = update_db.BulkLoader(cursor, batch_rows=100)
+        loader.add('AlertRecord', [(1, 1, 'm', 'v', 'h1', 'r1'), (2, 1, 'm', 'v', 'h2', 'r2')])
+        
+        loader.merge()
+        
+        statements = self._sql(cursor)
+        assert statements[0].startswith("INSERT INTO AlertRecordStaging ")
+        assert statements[1].startswith("INSERT INTO AlertRecord (")
+        assert "SELECT" in statements[1] and "FROM AlertRecordStaging" in statements[1]
+        assert statements[2] == "DELETE FROM AlertRecordStaging"
+        assert len(statements) == 3  # Untouched tables are not merged
+        assert loader.stats()['merged_rows'] == 2
+    
+    def test_batcher_merges_before_commit(self):
+        db = Mock()
+        loader = Mock()
+        batcher = update_db.CommitBatcher(db, max_rows=1, max_seconds=60, loader=loader)
+        db.commit.side_effect = lambda: loader.merge.assert_called_once()
+        
+        batcher.add(1)
+        
+        db.commit.assert_called_once()
+    
+    @patch('builtins.print')
+    def test_failed_merge_rolls_back(self, mock_print):
+        db = Mock()
+        loader = Mock()
+        loader.merge.side_effect = mysql.connector.Error("Lock wait timeout")
+        batcher = update_db.CommitBatcher(db, max_rows=1, max_seconds=60, loader=loader)
+        
+        batcher.add(3)
+        
+        db.commit.assert_not_called()
+        db.rollback.assert_called_once()
+        loader.discard.assert_called_once()
+        assert batcher.stats()['rolled_back_rows'] == 3
+    
+    def test_populate_stages_rows_with_loader(self):
+        cursor = Mock()
+        loader = Mock()
+        records = [{'timestamp': 1, 'scte35': 'Cue In 30.0 seconds'}]
+        
+        rows = update_db.populate_scte35(Mock(), cursor, records, 'm', 'v', 1, commit=False, loader=loader)
+        
+        assert rows == 2
+        cursor.executemany.assert_not_called()
+        assert [call[0][0] for call in loader.add.call_args_list] == ['SCTE35Record', 'SCTE35Summary']
+
+
+class TestSchemaMigrations:
+    
+    NOW = 1760572800  # 2025-10-16 00:00 UTC
+    
+    def _sql(self, cursor):
+        return [call[0][0] for call in cursor.execute.call_args_list]
+    
+    @patch('builtins.print')
+    def test_applies_only_newer_migrations(self, mock_print):
+        db = Mock()
+        cursor = Mock()
+        cursor.fetchall.return_value = [(1,)]
+        applied = []
+        migrations = ((1, "one", applied.append), (2, "two", applied.append), (3, "three", applied.append))
+        
+        assert update_db.migrate_schema(db, cursor, migrations) == 3
+        
+        assert applied == [cursor, cursor]
+        recorded = [call[0][1][0] for call in cursor.execute.call_args_list if "INSERT INTO SchemaVersion" in call[0][0]]
+        assert recorded == [2, 3]
+    
+    @patch('builtins.print')
+    def test_up_to_date_schema_runs_nothing(self, mock_print):
+        cursor = Mock()
+        cursor.fetchall.return_value = [(1,), (2,)]
+        migrate = Mock()
+        
+        assert update_db.migrate_schema(Mock(), cursor, ((1, "one", migrate), (2, "two", migrate))) == 2
+        
+        migrate.assert_not_called()
+        assert self._sql(cursor) == ["SELECT Version FROM SchemaVersion"]
+    
+    @patch('builtins.print')
+    def test_failed_migration_stops_upgrade(self, mock_print):
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+        later = Mock()
+        migrations = ((1, "one", Mock(side_effect=mysql.connector.Error("denied"))), (2, "two", later))
+        
+        assert update_db.migrate_schema(Mock(), cursor, migrations) == 0
+        
+        later.assert_not_called()
+        assert not any("INSERT INTO SchemaVersion" in sql for sql in self._sql(cursor))
+    
+    def test_add_time_indexes_ignores_existing_index(self):
+        cursor = Mock()
+        cursor.execute.side_effect = mysql.connector.Error("Duplicate key name", errno=errorcode.ER_DUP_KEYNAME)
+        
+        update_db.add_time_indexes(cursor)
+        
+        statements = self._sql(cursor)
+        assert len(statements) == 8
+        assert "ALTER TABLE AlertRecord ADD INDEX MasterTime (MasterID, Timestamp)" in statements
+        assert "ALTER TABLE SCTE35Summary ADD INDEX VariantTime (VariantID, Timestamp)" in statements
+    
+    @patch('update_db.Config.DB_PARTITION_DAYS_AHEAD', 2)
+    @patch('update_db.Config.DB_PARTITION_HISTORY_DAYS', 30)
+    def test_partition_by_day(self):
+        cursor = Mock()
+        # Not partitioned yet; oldest record 3 days ago
+        cursor.fetchall.side_effect = lambda: [] if "PARTITIONS" in cursor.execute.call_args[0][0] else [(self.NOW - 3 * 86400 + 500,)]
+        
+        update_db.partition_by_day(cursor, now=self.NOW + 3600)
+        
+        alters = [sql for sql in self._sql(cursor) if sql.startswith("ALTER TABLE")]
+        assert len(alters) == 4
+        assert alters[0].startswith("ALTER TABLE AlertRecord PARTITION BY RANGE (Timestamp) ")
+        assert "PARTITION pold VALUES LESS THAN (%d)" % (self.NOW - 3 * 86400) in alters[0]
+        assert "PARTITION p20251013 VALUES LESS THAN (%d)" % (self.NOW - 2 * 86400) in alters[0]
+        assert "PARTITION p20251018 VALUES LESS THAN (%d)" % (self.NOW + 3 * 86400) in alters[0]
+        assert alters[0].endswith("PARTITION pmax VALUES LESS THAN MAXVALUE)")
+    
+    def test_partition_by_day_skips_partitioned_tables(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('pold', '100'), ('pmax', 'MAXVALUE')]
+        
+        update_db.partition_by_day(cursor, now=self.NOW)
+        
+        assert not any(sql.startswith("ALTER TABLE") for sql in self._sql(cursor))
+    
+    @patch('update_db.Config.DB_PARTITION_DAYS_AHEAD', 2)
+    def test_extend_partitions_splits_pmax(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('p20251015', str(self.NOW)), ('pmax', 'MAXVALUE')]
+        
+        update_db.extend_partitions(cursor, now=self.NOW)
+        
+        alters = [sql for sql in self._sql(cursor) if sql.startswith("ALTER TABLE")]
+        assert len(alters) == 4
+        assert alters[0] == ("ALTER TABLE AlertRecord REORGANIZE PARTITION pmax INTO ("
+                             "PARTITION p20251016 VALUES LESS THAN (%d), "
+                             "PARTITION p20251017 VALUES LESS THAN (%d), "
+                             "PARTITION p20251018 VALUES LESS THAN (%d), "
+                             "PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                             % (self.NOW + 86400, self.NOW + 2 * 86400, self.NOW + 3 * 86400))
+    
+    @patch('update_db.Config.DB_PARTITION_DAYS_AHEAD', 2)
+    def test_extend_partitions_when_already_ahead(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('p20251018', str(self.NOW + 3 * 86400)), ('pmax', 'MAXVALUE')]
+        
+        update_db.extend_partitions(cursor, now=self.NOW)
+        
+        assert not any(sql.startswith("ALTER TABLE") for sql in self._sql(cursor))
+    
+    @patch('update_db.Config.DB_PARTITION_RETENTION_DAYS', 2)
+    def test_prune_partitions_drops_expired_days(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [
+            ('pold', str(self.NOW - 4 * 86400)), ('p20251012', str(self.NOW - 3 * 86400)),
+            ('p20251013', str(self.NOW - 2 * 86400)), ('p20251014', str(self.NOW - 86400)),
+            ('pmax', 'MAXVALUE')]
+        
+        update_db.prune_partitions(cursor, now=self.NOW + 3600)
+        
+        alters = [sql for sql in self._sql(cursor) if sql.startswith("ALTER TABLE")]
+        assert alters[:2] == ["ALTER TABLE AlertRecord DROP PARTITION p20251012, p20251013",
+                              "ALTER TABLE AlertRecord TRUNCATE PARTITION pold"]
+        assert len(alters) == 8
+    
+    @patch('update_db.Config.DB_PARTITION_RETENTION_DAYS', 30)
+    def test_prune_partitions_keeps_pold_with_recent_records(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [('pold', str(self.NOW - 10 * 86400)), ('pmax', 'MAXVALUE')]
+        
+        update_db.prune_partitions(cursor, now=self.NOW)
+        
+        assert not any(sql.startswith("ALTER TABLE") for sql in self._sql(cursor))
+    
+    def test_prune_partitions_disabled_by_default(self):
+        cursor = Mock()
+        
+        update_db.prune_partitions(cursor, now=self.NOW)
+        
+        cursor.execute.assert_not_called()
+
+
+class TestDedupFilter:
+    
+    def _seeded(self, stored):
+        cursor = Mock()
+        cursor.fetchall.side_effect = lambda: stored.get(cursor.execute.call_args[0][0].split()[5], [])
+        dedup = update_db.DedupFilter()
+        dedup.seed(cursor, [('v1', 100, 200), ('v2', 100, 200)])
+        return (dedup, cursor)
+    
+    def test_seed_queries_each_table_over_variant_windows(self):
+        cursor = Mock()
+        cursor.fetchall.side_effect = lambda: [('v1', 150, 'abcd0123')] if 'AlertRecord' in cursor.execute.call_args[0][0] else []
+        dedup = update_db.DedupFilter()
+        
+        dedup.seed(cursor, [('v1', 100, 200), ('v2', 180, 300)])
+        
+        assert cursor.execute.call_count == 4
+        (sql, params) = cursor.execute.call_args_list[0][0]
+        assert sql == ("SELECT VariantID, Timestamp, RecordHash FROM AlertRecord WHERE "
+                       "(VariantID = %s AND Timestamp BETWEEN %s AND %s) OR (VariantID = %s AND Timestamp BETWEEN %s AND %s)")
+        assert params == ('v1', 100, 200, 'v2', 180, 300)
+        assert dedup.stats()['seeded_keys'] == 1
+    
+    @patch('update_db.DedupFilter.SEED_WINDOWS', 2)
+    def test_seed_splits_many_windows_across_queries(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+        dedup = update_db.DedupFilter()
+        
+        dedup.seed(cursor, [('v%d' % i, 100, 200) for i in range(5)], tables=('AlertRecord',))
+        
+        assert [len(call[0][1]) for call in cursor.execute.call_args_list] == [6, 6, 3]
+    
+    def test_seed_without_windows_queries_nothing(self):
+        cursor = Mock()
+        update_db.DedupFilter().seed(cursor, [])
+        
+        cursor.execute.assert_not_called()
+    
+    def test_filters_stored_and_repeated_rows(self):
+        (dedup, cursor) = self._seeded({'SCTE35Record': [('v1', 150, 'abcd0123')]})
+        rows = [
+            (150, 1, 'm', 'v1', 'abcd0123', 'stored'),
+            (150, 1, 'm', 'v2', 'abcd0123', 'other variant'),
+            (151, 1, 'm', 'v1', 'abcd0123', 'other timestamp'),
+            (151, 1, 'm', 'v1', 'abcd0123', 'repeat'),
+        ]
+        
+        assert [row[5] for row in dedup.filter('SCTE35Record', rows)] == ['other variant', 'other timestamp']
+        assert dedup.stats() == {'seeded_keys': 1, 'filtered': 2, 'passed': 2}
+    
+    @patch('builtins.print')
+    def test_unseeded_table_passes_everything(self, mock_print):
+        cursor = Mock()
+        cursor.execute.side_effect = mysql.connector.Error("Table doesn't exist")
+        dedup = update_db.DedupFilter()
+        dedup.seed(cursor, [('v1', 100, 200)])
+        rows = [(150, 1, 'm', 'v1', 'abcd0123', 'r'), (150, 1, 'm', 'v1', 'abcd0123', 'r')]
+        
+        assert dedup.filter('AlertRecord', rows) == rows
+        assert dedup.stats()['filtered'] == 0
+    
+    def test_populate_sends_only_new_rows(self):
+        existing = {'timestamp': 150, 'scte35': 'Cue In 30.0 seconds'}
+        (dedup, _) = self._seeded({
+            'SCTE35Record': [('v1', 150, update_db.record_parser.record_hash(existing['scte35']))],
+            'SCTE35Summary': [('v1', 150, update_db.record_parser.record_hash(existing['scte35']))],
+        })
+        cursor = Mock()
+        records = [existing, {'timestamp': 160, 'scte35': 'Cue Out splice 7'}]
+        
+        rows = update_db.populate_scte35(Mock(), cursor, records, 'm', 'v1', 1, commit=False, dedup=dedup)
+        
+        assert rows == 1
+        cursor.executemany.assert_called_once()
+        assert [row[0] for row in cursor.executemany.call_args[0][1]] == [160]
+    
+    @patch('update_db.Config.INGEST_DEDUP', True)
+    @patch('update_db.migrate_schema', return_value=0)
+    @patch('update_db.connect_db')
+    @patch('update_db.utils.get_all_status')
+    @patch('update_db.utils.get_records')
+    @patch('builtins.print')
+    def test_cycle_seeds_each_variant_window(self, mock_print, mock_get_records, mock_get_status, mock_connect,
+                                          mock_migrate):
+        mock_db = Mock()
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = []
+        mock_db.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_db
+        mock_get_status.return_value = {'status': {
+            'https://example.com/a.m3u8': {'Timestamp': 5000, 'LinkID': 'link-1'}}}
+        mock_get_records.return_value = []
+        
+        update_db.update_hlsanalyzer_content('test-key', 'https://test.com')
+        
+        seeds = [call for call in mock_cursor.execute.call_args_list if call[0][0].startswith("SELECT VariantID, Timestamp")]
+        assert len(seeds) == 4
+        assert all(seed[0][1] == ('link-1', 5000 - update_db.INTERVAL_MINUTES * 60, 5000) for seed in seeds)
+        assert {seed[0][0].split()[5] for seed in seeds} == set(update_db.RECORD_TABLES)
+        assert any("Dedup:" in str(call) for call in mock_print.call_args_list)
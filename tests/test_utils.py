@@ -2,10 +2,16 @@
 
 import pytest
 import json
+import gzip
+import zlib
+import io
+import http.client
 import urllib.error
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
+import time
+import threading
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import utils
@@ -16,16 +22,16 @@ class TestGetRecords:
     def test_get_records_success(self):
         mock_response = {"records": [{"timestamp": 123, "data": "test"}]}
         
-        with patch.object(utils, 'load_from_uri', return_value=json.dumps(mock_response)):
+        with patch.object(utils, 'load_json_from_uri', return_value=mock_response):
             result = utils.get_records("https://test.com", "api-key", "link123", 100, 200, "errors")
             
             assert result == mock_response
-            utils.load_from_uri.assert_called_once_with(
+            utils.load_json_from_uri.assert_called_once_with(
                 "https://test.com/api/errors?apikey=api-key&start=100&end=200&linkid=link123"
             )
     
     def test_get_records_http_error(self):
-        with patch.object(utils, 'load_from_uri', side_effect=urllib.error.HTTPError(
+        with patch.object(utils, 'load_json_from_uri', side_effect=urllib.error.HTTPError(
             url="test", code=404, msg="Not Found", hdrs={}, fp=Mock()
         )):
             with patch('builtins.print'):
@@ -34,7 +40,7 @@ class TestGetRecords:
                 assert result is None
     
     def test_get_records_general_exception(self):
-        with patch.object(utils, 'load_from_uri', side_effect=Exception("Network error")):
+        with patch.object(utils, 'load_json_from_uri', side_effect=Exception("Network error")):
             with patch('builtins.print'):
                 result = utils.get_records("https://test.com", "api-key", "link123", 100, 200, "errors")
                 
@@ -46,7 +52,7 @@ class TestSendCommand:
     def test_send_command_success_no_params(self):
         mock_response = {"status": "success"}
         
-        with patch.object(utils, 'load_from_uri', return_value=json.dumps(mock_response)):
+        with patch.object(utils, 'load_json_from_uri', return_value=mock_response):
             with patch('builtins.print'):
                 code, result = utils.send_command("https://test.com", "api-key", "status")
                 
@@ -56,7 +62,7 @@ class TestSendCommand:
     def test_send_command_success_with_params(self):
         mock_response = {"status": "added"}
         
-        with patch.object(utils, 'load_from_uri', return_value=json.dumps(mock_response)):
+        with patch.object(utils, 'load_json_from_uri', return_value=mock_response):
             with patch('builtins.print'):
                 code, result = utils.send_command(
                     "https://test.com", "api-key", "stream/add", 
@@ -74,7 +80,7 @@ class TestSendCommand:
         mock_read_result.decode.return_value = "Error details"
         mock_error.read.return_value = mock_read_result
         
-        with patch.object(utils, 'load_from_uri', side_effect=mock_error):
+        with patch.object(utils, 'load_json_from_uri', side_effect=mock_error):
             with patch('builtins.print'):
                 code, result = utils.send_command("https://test.com", "api-key", "invalid")
                 
@@ -82,7 +88,7 @@ class TestSendCommand:
                 assert result is None
     
     def test_send_command_general_exception(self):
-        with patch.object(utils, 'load_from_uri', side_effect=Exception("Network error")):
+        with patch.object(utils, 'load_json_from_uri', side_effect=Exception("Network error")):
             with patch('builtins.print'):
                 code, result = utils.send_command("https://test.com", "api-key", "status")
                 
@@ -92,37 +98,132 @@ class TestSendCommand:
 
 class TestLoadFromUri:
     
-    @patch('utils.build_opener')
-    @patch('utils.install_opener')
-    def test_load_from_uri_success(self, mock_install, mock_build):
-        mock_resource = Mock()
-        mock_resource.read.side_effect = [b'{"test": true}', b'']
-        mock_resource.headers.get_content_charset.return_value = "utf-8"
-        
-        mock_opener = Mock()
-        mock_opener.open.return_value = mock_resource
-        mock_build.return_value = mock_opener
+    @pytest.fixture(autouse=True)
+    def fresh_pool(self):
+        utils.close_pool()
+        yield
+        utils.close_pool()
+    
+    def test_load_from_uri_success(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {'Content-Type': 'application/json'}, b'{"test": true}')
         
-        result = utils.load_from_uri("https://test.com")
+        result = utils.load_from_uri(local_http_server.url + "/api/status?apikey=key")
         
         assert result == '{"test": true}'
-        mock_opener.open.assert_called_once()
+        assert local_http_server.requests[0][:2] == ('GET', '/api/status?apikey=key')
     
-    @patch('utils.build_opener')
-    @patch('utils.install_opener')
-    def test_load_from_uri_with_custom_method(self, mock_install, mock_build):
-        mock_resource = Mock()
-        mock_resource.read.side_effect = [b'response', b'']
-        mock_resource.headers.get_content_charset.return_value = "utf-8"
+    def test_load_from_uri_with_custom_method(self, local_http_server):
+        local_http_server.routes['/api/stream/add'] = (200, {}, b'response')
         
-        mock_opener = Mock()
-        mock_opener.open.return_value = mock_resource
-        mock_build.return_value = mock_opener
+        result = utils.load_from_uri(local_http_server.url + "/api/stream/add", method="POST", timeout=30)
         
-        with patch('utils.Request') as mock_request:
-            utils.load_from_uri("https://test.com", method="POST", timeout=30)
-            
-            mock_request.assert_called_once_with("https://test.com", method="POST")
+        assert result == 'response'
+        assert local_http_server.requests[0][0] == 'POST'
+    
+    def test_load_from_uri_reuses_connection(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        
+        for _ in range(3):
+            utils.load_from_uri(local_http_server.url + "/api/status")
+        
+        stats = utils.get_pool_stats()
+        assert stats['requests'] == 3
+        assert stats['new_connections'] == 1
+        assert stats['hits'] == 2
+        assert stats['idle_connections'] == 1
+    
+    def test_load_from_uri_http_error(self, local_http_server):
+        local_http_server.routes['/api/status'] = (401, {}, b'Unauthorized')
+        
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            utils.load_from_uri(local_http_server.url + "/api/status")
+        
+        assert excinfo.value.code == 401
+        assert excinfo.value.read() == b'Unauthorized'
+        # Error bodies are drained so the connection is still reusable
+        assert utils.get_pool_stats()['idle_connections'] == 1
+    
+    def test_load_from_uri_follows_redirect(self, local_http_server):
+        local_http_server.routes['/old'] = (302, {'Location': '/new'}, b'')
+        local_http_server.routes['/new'] = (200, {}, b'moved')
+        
+        assert utils.load_from_uri(local_http_server.url + "/old") == 'moved'
+
+
+class TestHTTPConnectionPool:
+    
+    def test_http_proxy_from_environment(self, local_http_server):
+        local_http_server.routes['http://api.example.invalid/api/status'] = (200, {}, b'{"ok": true}')
+        with patch.dict(os.environ, {'http_proxy': 'http://user:secret@' + local_http_server.url[len('http://'):],
+                                     'no_proxy': ''}):
+            pool = utils.HTTPConnectionPool()
+        
+        body = pool.urlopen("http://api.example.invalid/api/status?x=1").read()
+        
+        assert body == b'{"ok": true}'
+        (method, path, headers) = local_http_server.requests[-1]
+        assert path == 'http://api.example.invalid/api/status?x=1'
+        assert headers['Proxy-Authorization'] == 'Basic dXNlcjpzZWNyZXQ='
+        pool.close()
+    
+    def test_https_proxy_tunnels_and_no_proxy_bypasses(self):
+        with patch.dict(os.environ, {'https_proxy': 'http://proxy.internal:3128', 'no_proxy': 'direct.example.com'}):
+            pool = utils.HTTPConnectionPool()
+        
+        tunnelled = pool._new_connection(('https', 'api.example.com', 443), 5)
+        direct = pool._new_connection(('https', 'direct.example.com', 443), 5)
+        
+        assert (tunnelled.host, tunnelled.port) == ('proxy.internal', 3128)
+        assert (tunnelled._tunnel_host, tunnelled._tunnel_port) == ('api.example.com', 443)
+        assert (direct.host, direct._tunnel_host) == ('direct.example.com', None)
+    
+    def test_idle_connections_are_evicted(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        pool = utils.HTTPConnectionPool(maxsize=2, idle_timeout=0)
+        
+        pool.urlopen(local_http_server.url + "/api/status").read()
+        time.sleep(0.01)
+        pool.urlopen(local_http_server.url + "/api/status").read()
+        
+        stats = pool.stats()
+        assert stats['new_connections'] == 2
+        assert stats['idle_evictions'] == 1
+        pool.close()
+    
+    def test_pool_size_is_bounded(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        pool = utils.HTTPConnectionPool(maxsize=1, idle_timeout=30)
+        
+        first = pool.urlopen(local_http_server.url + "/api/status")
+        second = pool.urlopen(local_http_server.url + "/api/status")
+        first.read()
+        second.read()
+        
+        stats = pool.stats()
+        assert stats['idle_connections'] == 1
+        assert stats['discarded'] == 1
+        pool.close()
+    
+    def test_stale_keepalive_connection_is_retried(self, local_http_server):
+        def drop_after_response(handler):
+            # Server silently closes the keep-alive connection after replying
+            handler.close_connection = True
+            return (200, {}, b'{}')
+        local_http_server.routes['/api/status'] = drop_after_response
+        pool = utils.HTTPConnectionPool(maxsize=2, idle_timeout=30)
+        
+        pool.urlopen(local_http_server.url + "/api/status").read()
+        time.sleep(0.05)
+        
+        assert pool.urlopen(local_http_server.url + "/api/status").read() == b'{}'
+        assert pool.stats()['new_connections'] == 2
+        pool.close()
+    
+    def test_unsupported_scheme(self):
+        pool = utils.HTTPConnectionPool()
+        
+        with pytest.raises(ValueError):
+            pool.request('GET', 'ftp://example.com/file')
 
 
 class TestGetAllStatus:
@@ -134,11 +235,11 @@ class TestGetAllStatus:
             }
         }
         
-        with patch.object(utils, 'load_from_uri', return_value=json.dumps(mock_response)):
+        with patch.object(utils, 'load_json_from_uri', return_value=mock_response):
             result = utils.get_all_status("https://test.com", "api-key")
             
             assert result == mock_response
-            utils.load_from_uri.assert_called_once_with(
+            utils.load_json_from_uri.assert_called_once_with(
                 "https://test.com/api/status?apikey=api-key"
             )
     
@@ -150,14 +251,14 @@ class TestGetAllStatus:
         mock_read_result.decode.return_value = "Unauthorized"
         mock_error.read.return_value = mock_read_result
         
-        with patch.object(utils, 'load_from_uri', side_effect=mock_error):
+        with patch.object(utils, 'load_json_from_uri', side_effect=mock_error):
             with patch('builtins.print'):
                 result = utils.get_all_status("https://test.com", "invalid-key")
                 
                 assert result is None
     
     def test_get_all_status_general_exception(self):
-        with patch.object(utils, 'load_from_uri', side_effect=Exception("Network error")):
+        with patch.object(utils, 'load_json_from_uri', side_effect=Exception("Network error")):
             with patch('builtins.print'):
                 result = utils.get_all_status("https://test.com", "api-key")
                 
@@ -191,4 +292,242 @@ class TestReadPython3x:
         
         result = utils._read_python3x(mock_resource)
         
-        assert result == "test"
\ No newline at end of file
+        assert result == "test"
+    
+    def test_read_python3x_multibyte_split_across_reads(self):
+        mock_resource = Mock()
+        mock_resource.read.side_effect = [b'caf\xc3', b'\xa9', b'']
+        mock_resource.headers.get_content_charset.return_value = "utf-8"
+        
+        result = utils._read_python3x(mock_resource)
+        
+        assert result == "café"
+    
+    def test_read_python3x_empty_body(self):
+        mock_resource = Mock()
+        mock_resource.read.side_effect = [b'']
+        mock_resource.headers.get_content_charset.return_value = "utf-8"
+        
+        assert utils._read_python3x(mock_resource) is None
+
+
+class TestReadResponse:
+    
+    def _resource(self, body, content_length=True):
+        headers = http.client.HTTPMessage()
+        if content_length:
+            headers['Content-Length'] = str(len(body))
+        resource = io.BufferedReader(io.BytesIO(body))
+        resource.headers = headers
+        return resource
+    
+    def test_read_response_preallocated(self):
+        body = b'x' * (3 * 1024 * 1024 + 7)
+        
+        result = utils._read_response(self._resource(body))
+        
+        assert isinstance(result, bytearray)
+        assert result == body
+    
+    def test_read_response_without_content_length(self):
+        body = b'{"errors": []}' * 1000
+        
+        result = utils._read_response(self._resource(body, content_length=False))
+        
+        assert result == body
+    
+    def test_read_response_truncated_body(self):
+        resource = self._resource(b'short')
+        resource.headers.replace_header('Content-Length', '100')
+        
+        with pytest.raises(http.client.IncompleteRead):
+            utils._read_response(resource)
+    
+    def test_iter_response_chunks(self):
+        chunks = list(utils.iter_response(self._resource(b'abcdefghij'), chunk_size=4))
+        
+        assert chunks == [b'abcd', b'efgh', b'ij']
+
+
+class TestLoadJsonFromUri:
+    
+    @pytest.fixture(autouse=True)
+    def fresh_pool(self):
+        utils.close_pool()
+        yield
+        utils.close_pool()
+    
+    def test_load_json_from_uri(self, local_http_server):
+        local_http_server.routes['/api/status'] = (
+            200, {'Content-Type': 'application/json; charset=utf-8'}, '{"name": "café"}'.encode('utf-8'))
+        
+        result = utils.load_json_from_uri(local_http_server.url + "/api/status")
+        
+        assert result == {"name": "café"}
+    
+    def test_load_json_from_uri_other_charset(self, local_http_server):
+        local_http_server.routes['/api/status'] = (
+            200, {'Content-Type': 'application/json; charset=latin-1'}, '{"name": "café"}'.encode('latin-1'))
+        
+        result = utils.load_json_from_uri(local_http_server.url + "/api/status")
+        
+        assert result == {"name": "café"}
+    
+    def test_stream_from_uri(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'0123456789')
+        
+        chunks = list(utils.stream_from_uri(local_http_server.url + "/api/status", chunk_size=4))
+        
+        assert b''.join(chunks) == b'0123456789'
+        assert utils.get_pool_stats()['idle_connections'] == 1
+
+
+class TestCompressedTransfer:
+    
+    @pytest.fixture(autouse=True)
+    def fresh_pool(self):
+        utils.close_pool()
+        yield
+        utils.close_pool()
+    
+    def _payload(self):
+        return json.dumps({"errors": [{"message": "Segment download timeout"}] * 500}).encode()
+    
+    def test_gzip_response_is_decoded(self, local_http_server):
+        payload = self._payload()
+        local_http_server.routes['/api/stream/errors'] = (
+            200, {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'}, gzip.compress(payload))
+        
+        result = utils.load_json_from_uri(local_http_server.url + "/api/stream/errors")
+        
+        assert result == json.loads(payload)
+        assert local_http_server.requests[0][2]['Accept-Encoding'] == 'gzip, deflate'
+        stats = utils.get_transfer_stats()
+        assert stats['compressed_responses'] == 1
+        assert stats['decoded_bytes'] == len(payload)
+        assert stats['wire_bytes'] < stats['decoded_bytes']
+        assert stats['compression_ratio'] > 10
+        assert utils.get_pool_stats()['idle_connections'] == 1
+    
+    def test_zlib_deflate_response_is_decoded(self, local_http_server):
+        payload = self._payload()
+        local_http_server.routes['/api/status'] = (200, {'Content-Encoding': 'deflate'}, zlib.compress(payload))
+        
+        assert utils.load_from_uri(local_http_server.url + "/api/status") == payload.decode()
+    
+    def test_raw_deflate_response_is_decoded(self, local_http_server):
+        payload = self._payload()
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        body = compressor.compress(payload) + compressor.flush()
+        local_http_server.routes['/api/status'] = (200, {'Content-Encoding': 'deflate'}, body)
+        
+        assert utils.load_from_uri(local_http_server.url + "/api/status") == payload.decode()
+    
+    def test_streaming_decompression(self, local_http_server):
+        payload = self._payload()
+        local_http_server.routes['/api/status'] = (200, {'Content-Encoding': 'gzip'}, gzip.compress(payload))
+        
+        chunks = list(utils.stream_from_uri(local_http_server.url + "/api/status", chunk_size=1024))
+        
+        assert b''.join(chunks) == payload
+        assert max(len(chunk) for chunk in chunks) <= 1024
+    
+    def test_compressed_error_body_is_decoded(self, local_http_server):
+        local_http_server.routes['/api/status'] = (401, {'Content-Encoding': 'gzip'}, gzip.compress(b'Unauthorized'))
+        
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            utils.load_from_uri(local_http_server.url + "/api/status")
+        
+        assert excinfo.value.read() == b'Unauthorized'
+    
+    def test_compression_can_be_disabled(self, local_http_server):
+        local_http_server.routes['/api/status'] = (200, {}, b'{}')
+        
+        with patch.object(utils.Config, 'HTTP_ACCEPT_ENCODING', None):
+            utils.load_from_uri(local_http_server.url + "/api/status")
+        
+        assert local_http_server.requests[0][2]['Accept-Encoding'] == 'identity'
+        stats = utils.get_transfer_stats()
+        assert stats['wire_bytes'] == stats['decoded_bytes'] == 2
+
+
+class TestChunkedRecords:
+    
+    def _fake_records(self, records, key='errors'):
+        def fake_load(url):
+            query = dict(part.split('=', 1) for part in url.split('?', 1)[1].split('&'))
+            (start, end) = (int(query['start']), int(query['end']))
+            # The stand-in treats both ends as inclusive and leaks one record past each edge
+            selected = [r for r in records if start - 1 <= r['timestamp'] <= end]
+            return {key: list(reversed(selected))} if key else list(reversed(selected))
+        return fake_load
+    
+    def test_record_chunks(self):
+        with patch.object(utils.Config, 'RECORD_CHUNK_MIN_SECONDS', 3600), \
+                patch.object(utils.Config, 'RECORD_FETCH_CHUNKS', 4):
+            assert utils.record_chunks(0, 3599) is None
+            assert utils.record_chunks(0, 7200) == 4
+        with patch.object(utils.Config, 'RECORD_CHUNK_MIN_SECONDS', None):
+            assert utils.record_chunks(0, 10 ** 9) is None
+    
+    def test_split_time_range(self):
+        assert utils.split_time_range(0, 99, 4) == [(0, 24), (25, 49), (50, 74), (75, 99)]
+        assert utils.split_time_range(10, 12, 8) == [(10, 10), (11, 11), (12, 12)]
+        assert utils.split_time_range(5, 5, 3) == [(5, 5)]
+    
+    def test_iter_records_merged_in_order_without_duplicates(self):
+        records = [{"timestamp": ts, "message": "error %d" % ts} for ts in range(0, 100, 3)]
+        
+        with patch.object(utils, 'load_json_from_uri', side_effect=self._fake_records(records)):
+            result = list(utils.iter_records("https://test.com", "api-key", "link", 0, 99, "stream/errors", chunks=4))
+        
+        assert result == records
+    
+    def test_get_records_chunked_keeps_response_shape(self):
+        records = [{"timestamp": ts, "scte35": "cue %d" % ts} for ts in range(0, 50, 5)]
+        
+        with patch.object(utils, 'load_json_from_uri', side_effect=self._fake_records(records, key=None)):
+            result = utils.get_records("https://test.com", "api-key", "link", 0, 49, "stream/scte35cues", chunks=3)
+        
+        assert result == records
+    
+    def test_get_records_chunked_dict_response(self):
+        records = [{"timestamp": ts, "message": "w"} for ts in range(0, 20)]
+        
+        with patch.object(utils, 'load_json_from_uri', side_effect=self._fake_records(records, key='warnings')):
+            result = utils.get_records("https://test.com", "api-key", "link", 0, 19, "stream/warnings", chunks=5)
+        
+        assert result == {"warnings": records}
+    
+    def test_get_records_chunked_failure(self):
+        calls = []
+        
+        def flaky(url):
+            calls.append(url)
+            if 'start=10&' in url:
+                raise ConnectionError("boom")
+            return {"errors": []}
+        
+        with patch.object(utils, 'load_json_from_uri', side_effect=flaky):
+            with patch('builtins.print'):
+                result = utils.get_records("https://test.com", "api-key", "link", 0, 19, "stream/errors", chunks=2)
+        
+        assert result is None
+    
+    def test_iter_records_streams_before_last_window(self):
+        release = threading.Event()
+        
+        def fake_get_records(server, apikey, linkid, start, end, mode):
+            if start > 0:
+                assert release.wait(5)
+            return [{"timestamp": start}]
+        
+        with patch.object(utils, 'get_records', side_effect=fake_get_records):
+            records = utils.iter_records("https://test.com", "api-key", "link", 0, 99, "stream/errors",
+                                         chunks=2, max_workers=2)
+            first = next(records)
+            release.set()
+            rest = list(records)
+        
+        assert first == {"timestamp": 0}
+        assert rest == [{"timestamp": 50}]
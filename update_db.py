@@ -16,11 +16,16 @@ from urllib.request import Request, HTTPSHandler, build_opener, install_opener
 import ssl
 import os
 import mysql.connector
+import mysql.connector.pooling
 from mysql.connector import errorcode
 import utils
+import record_parser
 import time
-import hashlib
 import re
+import random
+import argparse
+import queue
+import concurrent.futures
 from config import Config
 
 INTERVAL_MINUTES = Config.INTERVAL_MINUTES
@@ -71,31 +76,197 @@ def define_tables():
     TABLES['SCTE35Summary'] = "CREATE TABLE SCTE35Summary (Timestamp INT, CreateTime INT, MasterID VARCHAR(32), VariantID VARCHAR(32), "\
                              "RecordHash VARCHAR(8), Duration DOUBLE, PRIMARY KEY(Timestamp, VariantID, RecordHash))"
 
+    TABLES['IngestWatermark'] = "CREATE TABLE IngestWatermark (VariantID VARCHAR(32), Mode VARCHAR(32), Timestamp INT, "\
+                                "UpdateTime INT, PRIMARY KEY(VariantID, Mode))"
+    TABLES['SchemaVersion'] = "CREATE TABLE SchemaVersion (Version INT, AppliedTime INT, Description VARCHAR(255), "\
+                              "PRIMARY KEY(Version))"
+
     return TABLES
 
-def populate_scte35(db, cursor, records, master_id, link_id, create_time):
+def load_ingest_watermarks(cursor):
+    """Return {(variant_id, mode): timestamp} up to which records were ingested"""
+    try:
+        cursor.execute("SELECT VariantID, Mode, Timestamp FROM IngestWatermark")
+        return {(variant_id, mode): timestamp for (variant_id, mode, timestamp) in cursor.fetchall()}
+    except mysql.connector.Error as err:
+        print(err.msg)
+        return {}
+
+def ingest_start(watermark, timestamp, duration):
+    """First timestamp to fetch: just past the watermark, but never further
+    back than `duration` seconds before timestamp"""
+    start = timestamp - duration
+    if watermark is not None and watermark >= start:
+        start = watermark + 1
+    return start
+
+def record_ingest_watermark(cursor, variant_id, mode, timestamp, update_time):
+    """Advance a watermark; it becomes durable with the next commit"""
+    sql = """INSERT INTO IngestWatermark (VariantID, Mode, Timestamp, UpdateTime) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE Timestamp=GREATEST(Timestamp, VALUES(Timestamp)), UpdateTime=VALUES(UpdateTime)"""
+    try:
+        cursor.execute(sql, (variant_id, mode, timestamp, update_time))
+    except mysql.connector.Error as err:
+        print(err.msg)
+
+# Tables holding records, indexed and partitioned by the schema migrations
+RECORD_TABLES = ('AlertRecord', 'AlertSummary', 'SCTE35Record', 'SCTE35Summary')
+MODE_TABLES = {
+    'stream/scte35cues': ('SCTE35Record', 'SCTE35Summary'),
+    'stream/alertevents': ('AlertRecord', 'AlertSummary'),
+}
+DAY_SECONDS = 86400
+
+def _partition_name(day):
+    return time.strftime("p%Y%m%d", time.gmtime(day))
+
+def _daily_partitions(first_day, last_day):
+    """PARTITION clauses for every UTC day from first_day to last_day (day starts)"""
+    return ", ".join("PARTITION %s VALUES LESS THAN (%d)" %(_partition_name(day), day + DAY_SECONDS)
+                     for day in range(first_day, last_day + 1, DAY_SECONDS))
+
+def table_partitions(cursor, table):
+    """[(name, upper bound)] of a partitioned table, the bound None for MAXVALUE; [] if not partitioned"""
+    cursor.execute("SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+                   "ORDER BY PARTITION_ORDINAL_POSITION", (table,))
+    return [(name, None if bound == 'MAXVALUE' else int(bound)) for (name, bound) in cursor.fetchall()]
+
+def add_time_indexes(cursor):
+    """Migration 1: indexes for per-master and per-variant time range queries"""
+    for table in RECORD_TABLES:
+        for (index, columns) in (('MasterTime', 'MasterID, Timestamp'), ('VariantTime', 'VariantID, Timestamp')):
+            try:
+                cursor.execute("ALTER TABLE %s ADD INDEX %s (%s)" %(table, index, columns))
+            except mysql.connector.Error as err:
+                if err.errno != errorcode.ER_DUP_KEYNAME:
+                    raise
+
+def partition_by_day(cursor, now=None):
+    """Migration 2: RANGE partitions on Timestamp, one per UTC day.
+
+    Days older than DB_PARTITION_HISTORY_DAYS share partition pold; pmax
+    catches anything past the last daily partition until extend_partitions()
+    adds more. Tables that are already partitioned are left alone.
+    """
+    today = int(time.time() if now is None else now) // DAY_SECONDS * DAY_SECONDS
+    for table in RECORD_TABLES:
+        if table_partitions(cursor, table):
+            continue
+        cursor.execute("SELECT MIN(Timestamp) FROM %s" %(table))
+        rows = cursor.fetchall()
+        oldest = rows[0][0] if rows and rows[0][0] is not None else today
+        first = max(int(oldest) // DAY_SECONDS * DAY_SECONDS, today - Config.DB_PARTITION_HISTORY_DAYS * DAY_SECONDS)
+        first = min(first, today)
+        last = today + Config.DB_PARTITION_DAYS_AHEAD * DAY_SECONDS
+        cursor.execute("ALTER TABLE %s PARTITION BY RANGE (Timestamp) (PARTITION pold VALUES LESS THAN (%d), %s, "
+                       "PARTITION pmax VALUES LESS THAN MAXVALUE)" %(table, first, _daily_partitions(first, last)))
+
+def extend_partitions(cursor, now=None):
+    """Keep DB_PARTITION_DAYS_AHEAD daily partitions ahead of today by splitting pmax"""
+    today = int(time.time() if now is None else now) // DAY_SECONDS * DAY_SECONDS
+    last = today + Config.DB_PARTITION_DAYS_AHEAD * DAY_SECONDS
+    for table in RECORD_TABLES:
+        try:
+            bounds = [bound for (name, bound) in table_partitions(cursor, table) if bound is not None]
+            if not bounds or max(bounds) > last:
+                continue
+            cursor.execute("ALTER TABLE %s REORGANIZE PARTITION pmax INTO (%s, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                           %(table, _daily_partitions(max(bounds), last)))
+        except mysql.connector.Error as err:
+            print(err.msg)
+
+def prune_partitions(cursor, now=None):
+    """Drop the daily partitions of records older than DB_PARTITION_RETENTION_DAYS.
+
+    pold is emptied once its whole range is past the retention too. Nothing
+    is removed while the retention is None.
+    """
+    if Config.DB_PARTITION_RETENTION_DAYS is None:
+        return
+    today = int(time.time() if now is None else now) // DAY_SECONDS * DAY_SECONDS
+    cutoff = today - Config.DB_PARTITION_RETENTION_DAYS * DAY_SECONDS
+    for table in RECORD_TABLES:
+        try:
+            partitions = table_partitions(cursor, table)
+            expired = [name for (name, bound) in partitions
+                       if name not in ('pold', 'pmax') and bound is not None and bound <= cutoff]
+            if expired:
+                cursor.execute("ALTER TABLE %s DROP PARTITION %s" %(table, ", ".join(expired)))
+            if any(name == 'pold' and bound <= cutoff for (name, bound) in partitions):
+                cursor.execute("ALTER TABLE %s TRUNCATE PARTITION pold" %(table))
+        except mysql.connector.Error as err:
+            print(err.msg)
+
+# (version, description, function(cursor)); append only, never renumber
+MIGRATIONS = (
+    (1, "Indexes on (MasterID, Timestamp) and (VariantID, Timestamp)", add_time_indexes),
+    (2, "Daily RANGE partitions on Timestamp", partition_by_day),
+)
+
+def schema_version(cursor):
+    """Highest migration recorded in SchemaVersion, 0 for a schema never migrated"""
+    try:
+        cursor.execute("SELECT Version FROM SchemaVersion")
+        return max([version for (version,) in cursor.fetchall()], default=0)
+    except mysql.connector.Error as err:
+        print(err.msg)
+        return 0
+
+def migrate_schema(db, cursor, migrations=MIGRATIONS):
+    """Apply the migrations newer than the recorded schema version, in order.
+
+    Each migration is idempotent, so one interrupted half-way (or racing
+    another update_db) is simply run again. The first failure stops the
+    upgrade; returns the schema version reached.
+    """
+    current = schema_version(cursor)
+    for (version, description, migrate) in migrations:
+        if version <= current:
+            continue
+        print("Applying schema migration %d: %s" %(version, description))
+        try:
+            migrate(cursor)
+            cursor.execute("INSERT INTO SchemaVersion (Version, AppliedTime, Description) VALUES (%s, %s, %s) "
+                           "ON DUPLICATE KEY UPDATE Version=Version", (version, int(time.time()), description))
+            db.commit()
+        except mysql.connector.Error as err:
+            print("Schema migration %d failed: %s" %(version, err.msg))
+            break
+        current = version
+    return current
+
+def populate_scte35(db, cursor, records, master_id, link_id, create_time, commit=True, loader=None, dedup=None):
+    """Insert SCTE-35 records and return the number of rows written, or None
+    if there were no records or an insert failed. With commit=False the
+    caller owns the transaction; with a BulkLoader the rows are staged for
+    its next merge instead of inserted. Rows a DedupFilter knows are stored
+    are not sent."""
     if records is None:
         print("No records found for: %s, %s" %(master_id, link_id))
-        return
+        return None
 
+    ok = True
     val_summary = []
     val_record = []
 
-    for cur in records:
-        ts = cur['timestamp']
-        record = cur["scte35"]
-        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()
-        record_hash = record_hash[0:8]
-
-
+    for (ts, record_hash, record, summary) in record_parser.parse_summaries("stream/scte35cues", records):
         val_record.append ((ts, create_time, master_id, link_id, record_hash, record))
 
-        m = re.search("Cue In (\d+.\d+) seconds", record)
-        if (m):
-            duration = m.group(1)
-            val_summary.append((ts, create_time, master_id, link_id, record_hash, duration))
+        if summary:
+            val_summary.append((ts, create_time, master_id, link_id, record_hash) + summary)
 
-    if len(val_record) > 0:
+    if dedup is not None:
+        val_record = dedup.filter('SCTE35Record', val_record)
+        val_summary = dedup.filter('SCTE35Summary', val_summary)
+
+    if len(val_record) > 0 and loader is not None:
+        try:
+            loader.add('SCTE35Record', val_record)
+        except mysql.connector.Error as err:
+            print(err.msg)
+            ok = False
+    elif len(val_record) > 0:
         sql = """INSERT INTO SCTE35Record (Timestamp, CreateTime, MasterID, VariantID, RecordHash, Record) VALUES (%s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE Timestamp=Timestamp,VariantID=VariantID,RecordHash=RecordHash"""
 
@@ -103,9 +274,16 @@ def populate_scte35(db, cursor, records, master_id, link_id, create_time):
             cursor.executemany(sql, val_record)
         except mysql.connector.Error as err:
             print(err.msg)
+            ok = False
 
 
-    if len(val_summary) > 0:
+    if len(val_summary) > 0 and loader is not None:
+        try:
+            loader.add('SCTE35Summary', val_summary)
+        except mysql.connector.Error as err:
+            print(err.msg)
+            ok = False
+    elif len(val_summary) > 0:
         sql = """INSERT INTO SCTE35Summary (Timestamp, CreateTime, MasterID, VariantID, RecordHash, Duration) VALUES (%s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE Timestamp=Timestamp,VariantID=VariantID,RecordHash=RecordHash"""
 
@@ -113,36 +291,44 @@ def populate_scte35(db, cursor, records, master_id, link_id, create_time):
             cursor.executemany(sql, val_summary)
         except mysql.connector.Error as err:
             print(err.msg)
+            ok = False
 
-    db.commit()
+    if commit:
+        db.commit()
+    return len(val_record) + len(val_summary) if ok else None
 
 
-def populate_alerts(db, cursor, records, master_id, link_id, create_time):
+def populate_alerts(db, cursor, records, master_id, link_id, create_time, commit=True, loader=None, dedup=None):
+    """Insert alert records and return the number of rows written, or None
+    if there were no records or an insert failed. With commit=False the
+    caller owns the transaction; with a BulkLoader the rows are staged for
+    its next merge instead of inserted. Rows a DedupFilter knows are stored
+    are not sent."""
     if records is None:
         print("No records found for: %s, %s" %(master_id, link_id))
-        return
+        return None
 
+    ok = True
     val_summary = []
     val_record = []
 
-    for cur in records:
-        ts = cur['timestamp']
-        record = cur["alerts"]
-        record_hash = hashlib.sha1(record.encode("UTF-8")).hexdigest()
-        record_hash = record_hash[0:8]
-
-
+    for (ts, record_hash, record, summary) in record_parser.parse_summaries("stream/alertevents", records):
         val_record.append ((ts, create_time, master_id, link_id, record_hash, record))
 
-        m = re.search("(SCTE-35|STREAM) (OUTAGE ALERT|ALERT CLEARED) .* (\d+) (minutes|seconds)", record)
-        if (m):
-            type=m.group(1)
-            status=m.group(2)
-            duration = m.group(3)
-            units=m.group(4)
-            val_summary.append((ts, create_time, master_id, link_id, record_hash, type, status, duration, units))
+        if summary:
+            val_summary.append((ts, create_time, master_id, link_id, record_hash) + summary)
+
+    if dedup is not None:
+        val_record = dedup.filter('AlertRecord', val_record)
+        val_summary = dedup.filter('AlertSummary', val_summary)
 
-    if len(val_record) > 0:
+    if len(val_record) > 0 and loader is not None:
+        try:
+            loader.add('AlertRecord', val_record)
+        except mysql.connector.Error as err:
+            print(err.msg)
+            ok = False
+    elif len(val_record) > 0:
         sql = """INSERT INTO AlertRecord (Timestamp, CreateTime, MasterID, VariantID, RecordHash, Record) VALUES (%s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE Timestamp=Timestamp,VariantID=VariantID,RecordHash=RecordHash"""
 
@@ -150,9 +336,16 @@ def populate_alerts(db, cursor, records, master_id, link_id, create_time):
             cursor.executemany(sql, val_record)
         except mysql.connector.Error as err:
             print(err.msg)
+            ok = False
 
 
-    if len(val_summary) > 0:
+    if len(val_summary) > 0 and loader is not None:
+        try:
+            loader.add('AlertSummary', val_summary)
+        except mysql.connector.Error as err:
+            print(err.msg)
+            ok = False
+    elif len(val_summary) > 0:
         sql = """INSERT INTO AlertSummary (Timestamp, CreateTime, MasterID, VariantID, RecordHash, Type, Status, Duration, Units) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE Timestamp=Timestamp,VariantID=VariantID,RecordHash=RecordHash"""
 
@@ -160,26 +353,313 @@ def populate_alerts(db, cursor, records, master_id, link_id, create_time):
             cursor.executemany(sql, val_summary)
         except mysql.connector.Error as err:
             print(err.msg)
-
-    db.commit()
-
-
-def update_hlsanalyzer_content(apikey, apihost):
-
-    db = connect_db()
-    if db is None:
-        raise Exception("Could not connect to database!")
-    else:
-        print("Connected.")
-
-    cursor = db.cursor()
-
-
+            ok = False
+
+    if commit:
+        db.commit()
+    return len(val_record) + len(val_summary) if ok else None
+
+
+class DedupFilter:
+    """Keys of rows already stored, checked before rows are sent to MySQL.
+
+    seed() loads the (Timestamp, VariantID, RecordHash) keys each variant has
+    stored over its own fetch window, one query per table (per SEED_WINDOWS
+    variants). Keys are kept exactly, as one int per row in a set per
+    (table, variant): unlike a bloom filter it never drops a new row. Tables
+    that could not be seeded pass every row.
+    """
+
+    SEED_WINDOWS = 200          # (VariantID, start, end) ranges per seed query
+
+    def __init__(self):
+        self._keys = {}
+        self._seeded = set()
+        self.seeded_keys = 0
+        self.filtered = 0
+        self.passed = 0
+
+    @staticmethod
+    def _key(timestamp, record_hash):
+        return int(timestamp) << 32 | int(record_hash, 16)
+
+    def seed(self, cursor, windows, tables=RECORD_TABLES):
+        """Load stored keys for windows [(variant_id, start, end)] from each table"""
+        windows = list(windows)
+        if not windows:
+            return
+        for table in tables:
+            try:
+                for i in range(0, len(windows), self.SEED_WINDOWS):
+                    chunk = windows[i:i + self.SEED_WINDOWS]
+                    ranges = " OR ".join(["(VariantID = %s AND Timestamp BETWEEN %s AND %s)"] * len(chunk))
+                    cursor.execute("SELECT VariantID, Timestamp, RecordHash FROM %s WHERE %s" %(table, ranges),
+                                   tuple(value for window in chunk for value in window))
+                    for (variant_id, timestamp, record_hash) in cursor.fetchall():
+                        self._keys.setdefault((table, variant_id), set()).add(self._key(timestamp, record_hash))
+                        self.seeded_keys += 1
+            except mysql.connector.Error as err:
+                print(err.msg)
+                continue
+            self._seeded.add(table)
+
+    def filter(self, table, rows):
+        """Rows (Timestamp, CreateTime, MasterID, VariantID, RecordHash, ...) not yet stored"""
+        if table not in self._seeded:
+            self.passed += len(rows)
+            return rows
+        new_rows = []
+        for row in rows:
+            keys = self._keys.setdefault((table, row[3]), set())
+            key = self._key(row[0], row[4])
+            if key in keys:
+                self.filtered += 1
+            else:
+                # Also drops repeats within this run
+                keys.add(key)
+                new_rows.append(row)
+        self.passed += len(new_rows)
+        return new_rows
+
+    def stats(self):
+        return {'seeded_keys': self.seeded_keys, 'filtered': self.filtered, 'passed': self.passed}
+
+
+BULK_COLUMNS = {
+    'SCTE35Record': ('Timestamp', 'CreateTime', 'MasterID', 'VariantID', 'RecordHash', 'Record'),
+    'SCTE35Summary': ('Timestamp', 'CreateTime', 'MasterID', 'VariantID', 'RecordHash', 'Duration'),
+    'AlertRecord': ('Timestamp', 'CreateTime', 'MasterID', 'VariantID', 'RecordHash', 'Record'),
+    'AlertSummary': ('Timestamp', 'CreateTime', 'MasterID', 'VariantID', 'RecordHash', 'Type', 'Status', 'Duration', 'Units'),
+}
+
+
+class BulkLoader:
+    """Bulk-load path for large backfills.
+
+    Rows are buffered per table and written to a per-connection temporary
+    staging table with multi-row INSERT ... VALUES statements of batch_rows
+    rows. merge() then moves everything staged into the real tables with one
+    INSERT ... SELECT per table and empties the staging tables. Nothing is
+    committed here: the merge runs inside the caller's transaction.
+    """
+
+    def __init__(self, cursor, batch_rows=None):
+        self.cursor = cursor
+        self.batch_rows = Config.BULK_BATCH_ROWS if batch_rows is None else batch_rows
+        self._pending = {table: [] for table in BULK_COLUMNS}
+        self._staged = {table: 0 for table in BULK_COLUMNS}
+        self.staged_rows = 0
+        self.merged_rows = 0
+        self.statements = 0
+        self.merge_seconds = 0.0
+
+    def prepare(self):
+        """Create the staging tables; temporary tables need no cleanup and are invisible to other sessions"""
+        TABLES = define_tables()
+        for table in BULK_COLUMNS:
+            self.cursor.execute(TABLES[table].replace("CREATE TABLE %s " % table,
+                                                      "CREATE TEMPORARY TABLE IF NOT EXISTS %sStaging " % table, 1))
+
+    def add(self, table, rows):
+        pending = self._pending[table]
+        pending.extend(rows)
+        if len(pending) >= self.batch_rows:
+            self._write(table, len(pending) - len(pending) % self.batch_rows)
+
+    def _write(self, table, count=None):
+        """Write the first count (default: all) buffered rows of a table"""
+        pending = self._pending[table]
+        count = len(pending) if count is None else count
+        columns = BULK_COLUMNS[table]
+        placeholders = "(%s)" % ", ".join(["%s"] * len(columns))
+        for first in range(0, count, self.batch_rows):
+            chunk = pending[first:min(first + self.batch_rows, count)]
+            sql = "INSERT INTO %sStaging (%s) VALUES %s ON DUPLICATE KEY UPDATE Timestamp=Timestamp" %(
+                table, ", ".join(columns), ", ".join([placeholders] * len(chunk)))
+            self.cursor.execute(sql, [value for row in chunk for value in row])
+            self.statements += 1
+            self._staged[table] += len(chunk)
+            self.staged_rows += len(chunk)
+        del pending[:count]
+
+    def merge(self):
+        """Write the buffered rows and merge the staging tables into the real tables"""
+        started = time.perf_counter()
+        for table in BULK_COLUMNS:
+            if self._pending[table]:
+                self._write(table)
+            if self._staged[table] == 0:
+                continue
+            columns = ", ".join(BULK_COLUMNS[table])
+            self.cursor.execute("INSERT INTO %s (%s) SELECT %s FROM %sStaging ON DUPLICATE KEY UPDATE %s.Timestamp=%s.Timestamp"
+                                %(table, columns, columns, table, table, table))
+            self.cursor.execute("DELETE FROM %sStaging" %(table))
+            self.statements += 2
+            self.merged_rows += self._staged[table]
+            self._staged[table] = 0
+        self.merge_seconds += time.perf_counter() - started
+
+    def discard(self):
+        """Forget buffered rows; staged rows go away with the transaction rollback"""
+        for table in BULK_COLUMNS:
+            del self._pending[table][:]
+            self._staged[table] = 0
+
+    def stats(self):
+        return {
+            'staged_rows': self.staged_rows,
+            'merged_rows': self.merged_rows,
+            'statements': self.statements,
+            'merge_seconds': self.merge_seconds,
+        }
+
+
+class CommitBatcher:
+    """Groups the inserts of many variants into one transaction.
+
+    Commits once max_rows rows are pending or max_seconds have passed since
+    the batch started. rollback() discards the whole pending batch, including
+    the watermarks advanced in it, so its variants are fetched again next run.
+    With a BulkLoader, its staged rows are merged just before each commit.
+    """
+
+    def __init__(self, db, max_rows=None, max_seconds=None, clock=time.monotonic, loader=None):
+        self.db = db
+        self.loader = loader
+        self.max_rows = Config.DB_COMMIT_ROWS if max_rows is None else max_rows
+        self.max_seconds = Config.DB_COMMIT_SECONDS if max_seconds is None else max_seconds
+        self._clock = clock
+        self._started = clock()
+        self._batch_started = None
+        self.pending_rows = 0
+        self.rows = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.rolled_back_rows = 0
+
+    def add(self, rows):
+        if self._batch_started is None:
+            self._batch_started = self._clock()
+        self.pending_rows += rows
+        if self.pending_rows >= self.max_rows or self._clock() - self._batch_started >= self.max_seconds:
+            self.commit()
+
+    def commit(self):
+        if self._batch_started is None:
+            return
+        if self.loader is not None:
+            try:
+                self.loader.merge()
+            except mysql.connector.Error as err:
+                print(err.msg)
+                self.rollback()
+                return
+        self.db.commit()
+        self.commits += 1
+        self.rows += self.pending_rows
+        self.pending_rows = 0
+        self._batch_started = None
+
+    def rollback(self):
+        if self.loader is not None:
+            self.loader.discard()
+        self.db.rollback()
+        self.rollbacks += 1
+        self.rolled_back_rows += self.pending_rows
+        self.pending_rows = 0
+        self._batch_started = None
+
+    def stats(self):
+        elapsed = self._clock() - self._started
+        return {
+            'rows': self.rows,
+            'commits': self.commits,
+            'rollbacks': self.rollbacks,
+            'rolled_back_rows': self.rolled_back_rows,
+            'seconds': elapsed,
+            'rows_per_second': self.rows / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def ingest_pipeline(db, cursor, apihost, apikey, tasks, create_time, batcher, workers=None, queue_size=None,
+                    dedup=None):
+    """Fetch records on a pool of threads and write them from this thread.
+
+    Each task is (master_id, variant_id, mode, start, end). Fetch workers put
+    (task, records) on a queue of at most queue_size entries and block when it
+    is full, so fetching never runs far ahead of the database. Only the
+    calling thread touches the connection: it inserts each batch, advances
+    the watermark and leaves commits and rollbacks to the batcher.
+
+    Returns per-stage timings in seconds.
+    """
+    workers = Config.INGEST_FETCH_WORKERS if workers is None else workers
+    queue_size = Config.INGEST_QUEUE_SIZE if queue_size is None else queue_size
+    results = queue.Queue(maxsize=queue_size)
+    timings = {
+        'workers': workers,
+        'fetch_seconds': 0.0,
+        'fetch_blocked_seconds': 0.0,
+        'write_wait_seconds': 0.0,
+        'write_seconds': 0.0,
+    }
+
+    def fetch(task):
+        (master_id, variant_id, mode, start, end) = task
+        records = None
+        started = time.perf_counter()
+        try:
+            records = utils.get_records(apihost, apikey, variant_id, start, end, mode=mode,
+                                        chunks=utils.record_chunks(start, end))
+        finally:
+            fetched = time.perf_counter()
+            # Always hand over a result so the writer never waits for a lost task
+            results.put((task, records))
+        return (fetched - started, time.perf_counter() - fetched)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(fetch, task) for task in tasks]
+        try:
+            for _ in range(len(tasks)):
+                started = time.perf_counter()
+                ((master_id, variant_id, mode, start, end), records) = results.get()
+                fetched = time.perf_counter()
+                populate = populate_scte35 if mode == "stream/scte35cues" else populate_alerts
+                rows = populate(db, cursor, records, master_id, variant_id, create_time, commit=False,
+                                loader=batcher.loader, dedup=dedup)
+                if rows is not None:
+                    record_ingest_watermark(cursor, variant_id, mode, end, create_time)
+                    batcher.add(rows)
+                elif records is not None:
+                    # An insert failed: discard the batch so no variant in it is half-written
+                    batcher.rollback()
+                timings['write_wait_seconds'] += fetched - started
+                timings['write_seconds'] += time.perf_counter() - fetched
+        except BaseException:
+            # Drain the queue so fetchers blocked on put() finish and the executor can shut down
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            raise
+        batcher.commit()
+
+        for future in futures:
+            (fetch_seconds, blocked_seconds) = future.result()
+            timings['fetch_seconds'] += fetch_seconds
+            timings['fetch_blocked_seconds'] += blocked_seconds
+    return timings
+
+
+def database_name(apikey):
+    """Validate the API key and return the name of its database"""
     if apikey is None:
         raise Exception("API Key not found!")
     
     # Validate API key format
-    import re
     if not re.match(r'^[a-zA-Z0-9\-]+$', apikey):
         raise ValueError(f"Invalid API key format: contains invalid characters")
     
@@ -191,7 +671,12 @@ def update_hlsanalyzer_content(apikey, apihost):
     
     if len(db_name) > Config.MAX_DB_NAME_LENGTH:
         raise ValueError(f"API key generates database name too long: {db_name}")
+    return db_name
+
 
+def prepare_database(db, cursor, db_name):
+    """Select the database, create missing tables and migrate the schema;
+    returns the schema version"""
     try:
         cursor.execute("USE {}".format(db_name))
     except mysql.connector.Error as err:
@@ -218,6 +703,19 @@ def update_hlsanalyzer_content(apikey, apihost):
         else:
             print("OK")
 
+    version = migrate_schema(db, cursor)
+    if version >= 2:
+        extend_partitions(cursor)
+        prune_partitions(cursor)
+    return version
+
+
+def ingest_cycle(db, cursor, apikey, apihost, bulk_rows=None, dedup=None):
+    """Fetch and store everything new since the last run; returns the CommitBatcher stats.
+    With bulk_rows, rows go through a BulkLoader writing bulk_rows rows per statement.
+    Unless dedup is False (default: Config.INGEST_DEDUP), rows already stored are not sent."""
+    dedup = Config.INGEST_DEDUP if dedup is None else dedup
+    stats = None
     create_time = int(time.time())
     duration = INTERVAL_MINUTES*60
     result = utils.get_all_status(apihost, apikey)
@@ -244,18 +742,170 @@ def update_hlsanalyzer_content(apikey, apihost):
                 print("SINGLE MEDIA [%s]" %(hls_link))
                 variant_list.append((None, cur_id, timestamp))
 
+        # Only fetch what is newer than the last ingested window of each variant;
+        # INTERVAL_MINUTES caps the window for new or long-stale variants
+        watermarks = load_ingest_watermarks(cursor)
+        tasks = []
+        skipped = 0
         for (master_id, cur_id, timestamp) in variant_list:
-            records = utils.get_records(apihost, apikey, cur_id, timestamp - duration, timestamp, mode="stream/scte35cues")
-            populate_scte35(db, cursor, records, master_id, cur_id, create_time)
-            records = utils.get_records(apihost, apikey, cur_id, timestamp - duration, timestamp, mode="stream/alertevents")
-            populate_alerts(db, cursor, records, master_id, cur_id, create_time)
+            for mode in ("stream/scte35cues", "stream/alertevents"):
+                start = ingest_start(watermarks.get((cur_id, mode)), timestamp, duration)
+                if start > timestamp:
+                    skipped += 1
+                    continue
+                tasks.append((master_id, cur_id, mode, start, timestamp))
+        if skipped:
+            print("Skipped %d fetch(es) with nothing newer than the watermark" %(skipped))
+
+        dedup_filter = None
+        if dedup and tasks:
+            # Each variant is seeded over its own window, from the tables its mode writes
+            dedup_filter = DedupFilter()
+            for (mode, tables) in MODE_TABLES.items():
+                dedup_filter.seed(cursor, [(task[1], task[3], task[4]) for task in tasks if task[2] == mode], tables)
+
+        loader = None
+        if bulk_rows:
+            loader = BulkLoader(cursor, bulk_rows)
+            loader.prepare()
+        batcher = CommitBatcher(db, loader=loader)
+        timings = ingest_pipeline(db, cursor, apihost, apikey, tasks, create_time, batcher, dedup=dedup_filter)
+        stats = batcher.stats()
+        print("Wrote %d rows in %.1fs (%.0f rows/s) with %d commit(s), %d rolled back batch(es) (%d rows)"
+              %(stats['rows'], stats['seconds'], stats['rows_per_second'], stats['commits'],
+                stats['rollbacks'], stats['rolled_back_rows']))
+        print("Pipeline: fetch %.1fs over %d worker(s), fetchers blocked %.1fs, writer waited %.1fs, writes %.1fs"
+              %(timings['fetch_seconds'], timings['workers'], timings['fetch_blocked_seconds'],
+                timings['write_wait_seconds'], timings['write_seconds']))
+        if dedup_filter is not None:
+            dedup_stats = dedup_filter.stats()
+            print("Dedup: %d row(s) already stored were not sent, %d sent (%d keys loaded)"
+                  %(dedup_stats['filtered'], dedup_stats['passed'], dedup_stats['seeded_keys']))
+        if loader is not None:
+            bulk = loader.stats()
+            print("Bulk load: %d rows staged in %d statement(s), %d merged, merges took %.1fs"
+                  %(bulk['staged_rows'], bulk['statements'], bulk['merged_rows'], bulk['merge_seconds']))
+    return stats
+
+
+def update_hlsanalyzer_content(apikey, apihost, bulk_rows=None, dedup=None):
+
+    db_name = database_name(apikey)
+
+    db = connect_db()
+    if db is None:
+        raise Exception("Could not connect to database!")
+    else:
+        print("Connected.")
 
+    cursor = db.cursor()
+    prepare_database(db, cursor, db_name)
+    ingest_cycle(db, cursor, apikey, apihost, bulk_rows, dedup)
 
     print("Finished processing database ", db_name)
     cursor.close()
     db.close()
 
-if __name__ == '__main__':
+
+def create_db_pool(db_name, pool_size=None):
+    """Pool of connections to the account database, kept open between cycles"""
+    return mysql.connector.pooling.MySQLConnectionPool(
+        pool_name="hlsanalyzer_%s" % db_name[:16], pool_size=pool_size or Config.DB_POOL_SIZE,
+        user=DBUSER, password=DBPW, host=DBHOST, database=db_name)
+
+
+def next_delay(interval, jitter, elapsed):
+    """Seconds to sleep so cycles start every interval (+/- jitter fraction) seconds"""
+    return max(0.0, interval * (1 + random.uniform(-jitter, jitter)) - elapsed)
+
+
+def run_daemon(apikey, apihost, interval=None, jitter=None, cycles=None, sleep=time.sleep, bulk_rows=None,
+               dedup=None):
+    """Run ingestion cycles forever (or `cycles` times) on pooled connections.
+
+    The database and tables are verified once at startup; each cycle borrows a
+    connection from the pool, so no cycle pays for connecting, authenticating
+    or DDL. A failed cycle is reported and retried at the next interval.
+    """
+    interval = Config.DAEMON_INTERVAL if interval is None else interval
+    jitter = Config.DAEMON_JITTER if jitter is None else jitter
+    db_name = database_name(apikey)
+
+    db = connect_db()
+    if db is None:
+        raise Exception("Could not connect to database!")
+    cursor = db.cursor()
+    version = prepare_database(db, cursor, db_name)
+    cursor.close()
+    db.close()
+
+    pool = create_db_pool(db_name)
+    print("Daemon started for database %s: every %ds (+/- %d%%), %d pooled connection(s)"
+          %(db_name, interval, jitter * 100, pool.pool_size))
+
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        started = time.monotonic()
+        rows = 0
+        try:
+            db = pool.get_connection()
+            try:
+                db.ping(reconnect=True, attempts=1)
+                cursor = db.cursor()
+                if version >= 2:
+                    extend_partitions(cursor)
+                    prune_partitions(cursor)
+                stats = ingest_cycle(db, cursor, apikey, apihost, bulk_rows, dedup)
+                cursor.close()
+                rows = stats['rows'] if stats else 0
+            finally:
+                db.close()  # Returns the connection to the pool
+        except Exception as e:
+            print(f"Cycle {cycle} failed: {e}")
+        elapsed = time.monotonic() - started
+        print("Cycle %d: %d rows ingested in %.1fs" %(cycle, rows, elapsed))
+
+        if cycles is None or cycle < cycles:
+            sleep(next_delay(interval, jitter, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Store SCTE-35 cues and alert events of all monitored streams in MySQL',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Single ingestion run (e.g. from cron)
+  python update_db.py
+
+  # Keep running, ingesting every 5 minutes
+  python update_db.py --daemon --interval 300
+
+  # Backfill through staging tables, 2000 rows per INSERT statement
+  python update_db.py --bulk --bulk-rows 2000
+        """
+    )
+    parser.add_argument('--daemon', action='store_true',
+                       help='Keep running and ingest on an interval with pooled connections')
+    parser.add_argument('--interval', type=float, default=Config.DAEMON_INTERVAL,
+                       help='Seconds between daemon cycles (default: %(default)s)')
+    parser.add_argument('--jitter', type=float, default=Config.DAEMON_JITTER,
+                       help='Random +/- fraction applied to the interval (default: %(default)s)')
+    parser.add_argument('--bulk', action='store_true',
+                       help='Load through staging tables and a set-based merge (for large backfills)')
+    parser.add_argument('--bulk-rows', type=int, default=Config.BULK_BATCH_ROWS,
+                       help='Rows per multi-row INSERT with --bulk (default: %(default)s)')
+    parser.add_argument('--no-dedup', action='store_true',
+                       help='Send every fetched row to MySQL instead of skipping rows already stored')
+    args = parser.parse_args()
+    if args.bulk_rows < 1:
+        parser.error("--bulk-rows must be at least 1")
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    if not 0 <= args.jitter < 1:
+        parser.error("--jitter must be in [0, 1)")
+
     try:
         apihost = Config.get_server_url()
     except ValueError as e:
@@ -266,5 +916,17 @@ if __name__ == '__main__':
     if not apikey:
         print("Error: HLSANALYZER_APIKEY environment variable is not set.")
         exit(1)
-        
-    update_hlsanalyzer_content(apikey, apihost)
+
+    bulk_rows = args.bulk_rows if args.bulk else None
+    dedup = False if args.no_dedup else None
+    if args.daemon:
+        try:
+            run_daemon(apikey, apihost, args.interval, args.jitter, bulk_rows=bulk_rows, dedup=dedup)
+        except KeyboardInterrupt:
+            pass
+    else:
+        update_hlsanalyzer_content(apikey, apihost, bulk_rows, dedup)
+
+
+if __name__ == '__main__':
+    main()
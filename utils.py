@@ -8,19 +8,36 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import concurrent.futures
+import urllib.error
+import urllib.parse
 import urllib.request
+import base64
+import http.client
+import atexit
+import io
 import json
-from urllib.request import Request, HTTPSHandler, build_opener, install_opener
+import socket
 import ssl
 import os
+import threading
+import time
+import zlib
 from config import Config
+import response_cache
+import resilience
+import rate_limit
+import request_metrics
 
-def get_records(server, apikey, linkid, start, end, mode):
+def get_records(server, apikey, linkid, start, end, mode, chunks=None, max_workers=None):
+    """Fetch records for [start, end]; with chunks > 1 the range is fetched as
+    concurrent sub-windows and merged back into a single response."""
+    if chunks is not None and chunks > 1:
+        return _get_records_chunked(server, apikey, linkid, start, end, mode, chunks, max_workers)
 
     try:
         url = "%s/api/%s?apikey=%s&start=%d&end=%d&linkid=%s" % (server, mode, apikey, start, end, linkid)
-        response = load_from_uri(url)
-        data = json.loads(response)
+        data = load_json_from_uri(url)
         return data
 
     except urllib.error.HTTPError as e:
@@ -35,6 +52,117 @@ def get_records(server, apikey, linkid, start, end, mode):
         print(f"Unexpected error in reading records: {e}")
         return None
 
+def record_chunks(start, end):
+    """Sub-windows the scripts fetch [start, end] in: RECORD_FETCH_CHUNKS when
+    the range spans more than RECORD_CHUNK_MIN_SECONDS, else None (one request)"""
+    if Config.RECORD_CHUNK_MIN_SECONDS is None or end - start < Config.RECORD_CHUNK_MIN_SECONDS:
+        return None
+    return Config.RECORD_FETCH_CHUNKS
+
+
+def split_time_range(start, end, chunks):
+    """Split the inclusive range [start, end] into at most `chunks` adjacent windows"""
+    span = end - start + 1
+    chunks = max(1, min(chunks, span))
+    windows = []
+    for i in range(chunks):
+        window_start = start + span * i // chunks
+        window_end = start + span * (i + 1) // chunks - 1
+        windows.append((window_start, window_end))
+    return windows
+
+
+def _split_response(data):
+    """Return (key, records) for a records response: either a bare list or a dict holding one"""
+    if isinstance(data, list):
+        return (None, data)
+    if isinstance(data, dict):
+        for (key, value) in data.items():
+            if isinstance(value, list):
+                return (key, value)
+    return (None, [])
+
+
+def _record_identity(record):
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+def _iter_window_responses(server, apikey, linkid, start, end, mode, chunks, max_workers):
+    """Fetch the sub-windows concurrently and yield (window, response) in window order"""
+    windows = split_time_range(start, end, chunks or Config.RECORD_FETCH_CHUNKS)
+    workers = min(max_workers or Config.RECORD_FETCH_WORKERS, len(windows))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(get_records, server, apikey, linkid, window_start, window_end, mode)
+                   for (window_start, window_end) in windows]
+        try:
+            for (window, future) in zip(windows, futures):
+                data = future.result()
+                if data is None:
+                    raise ConnectionError("Failed to fetch %s for %s in [%d, %d]"
+                                          % (mode, linkid, window[0], window[1]))
+                yield (window, data)
+        finally:
+            # Stop pending windows if the consumer gives up early
+            for future in futures:
+                future.cancel()
+
+
+def _merge_window_records(window_responses):
+    """Yield records window by window in timestamp order, dropping repeats at the seams"""
+    seam = set()
+    for ((window_start, window_end), data) in window_responses:
+        (_, records) = _split_response(data)
+        next_seam = set()
+        for record in sorted(records, key=lambda record: record.get('timestamp', 0)):
+            timestamp = record.get('timestamp', 0)
+            identity = None
+            if seam and timestamp <= window_start:
+                identity = _record_identity(record)
+                if identity in seam:
+                    continue
+            if timestamp >= window_end:
+                next_seam.add(identity or _record_identity(record))
+            yield record
+        seam = next_seam
+
+
+def iter_records(server, apikey, linkid, start, end, mode, chunks=None, max_workers=None):
+    """Yield the records of [start, end] in timestamp order.
+
+    The range is split into `chunks` sub-windows fetched concurrently; each
+    window's records are yielded as soon as it and all earlier windows are
+    done. Raises ConnectionError if a window can't be fetched.
+    """
+    responses = _iter_window_responses(server, apikey, linkid, start, end, mode, chunks, max_workers)
+    yield from _merge_window_records(responses)
+
+
+def _get_records_chunked(server, apikey, linkid, start, end, mode, chunks, max_workers):
+    responses = []
+
+    def remember(window_responses):
+        for item in window_responses:
+            responses.append(item[1])
+            yield item
+
+    try:
+        window_responses = _iter_window_responses(server, apikey, linkid, start, end, mode, chunks, max_workers)
+        records = list(_merge_window_records(remember(window_responses)))
+    except ConnectionError as e:
+        print(f"Exception in reading records: {e}")
+        return None
+
+    # Rebuild the response in the shape the endpoint returned it
+    first = responses[0]
+    (key, _) = _split_response(first)
+    if isinstance(first, list):
+        return records
+    result = dict(first)
+    result[key or 'records'] = records
+    return result
+
+
 def send_command(server, apikey, command, params=None, method='GET'):
     try:
         url = "%s/api/%s?apikey=%s" % (server, command, apikey)
@@ -43,8 +171,7 @@ def send_command(server, apikey, command, params=None, method='GET'):
                 url += "&%s" %(cur)
 
         print("URL = ", url)
-        response= load_from_uri(url, method, timeout=Config.DEFAULT_TIMEOUT)
-        responsej = json.loads(response)
+        responsej = load_json_from_uri(url, method, timeout=Config.DEFAULT_TIMEOUT)
         return (200, responsej)
     except urllib.error.HTTPError as e:
         response = e.read().decode()
@@ -57,34 +184,780 @@ def send_command(server, apikey, command, params=None, method='GET'):
         return (500, None)
 
 def load_from_uri(uri, method = 'GET', timeout=Config.SEGMENT_DOWNLOAD_TIMEOUT):
-    request = Request(uri, method=method)
-    https_sslv3_handler = HTTPSHandler(context=ssl.SSLContext())
-    opener = build_opener(https_sslv3_handler)
-    install_opener(opener)
-    resource = opener.open(request, timeout=timeout)
+    def fetch():
+        resource = get_pool().urlopen(uri, method, timeout=timeout)
+        try:
+            return _read_python3x(resource)
+        finally:
+            resource.close()
 
-    content = _read_python3x(resource)
-    return content
+    return call_with_retries(uri, method, fetch)
 
 
-def _read_python3x(resource):
-    final = None
+def load_json_from_uri(uri, method='GET', timeout=Config.SEGMENT_DOWNLOAD_TIMEOUT):
+    """Fetch a URI and decode its JSON body straight from bytes"""
+    cache = get_cache() if method == 'GET' and _is_cacheable(uri) else None
+    if cache is not None:
+        return _load_json_cached(cache, uri, timeout)
+
+    (_, _, body, charset) = call_with_retries(uri, method, lambda: _fetch(uri, method, None, timeout))
+    return _parse_json(body, charset)
+
+
+def _fetch(uri, method, headers, timeout):
+    """Return (status, headers, body, charset) with the body fully read"""
+    resource = get_pool().urlopen(uri, method, headers=headers, timeout=timeout)
+    try:
+        body = _read_response(resource)
+        return (resource.status, resource.headers, body, resource.headers.get_content_charset())
+    finally:
+        resource.close()
+
+
+def _is_cacheable(uri):
+    path = urllib.parse.urlsplit(uri).path
+    return path.startswith('/api/') and path[len('/api/'):] in Config.HTTP_CACHE_ENDPOINTS
+
+
+def _load_json_cached(cache, uri, timeout):
+    (key, redacted_uri) = response_cache.cache_key('GET', uri)
+    entry = cache.get(key)
+    headers = {}
+    if entry is not None:
+        if not entry.has_validators() and entry.is_fresh():
+            cache.record_hit()
+            return _parse_json(entry.body, entry.charset)
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    (status, response_headers, body, charset) = call_with_retries(
+        uri, 'GET', lambda: _fetch(uri, 'GET', headers, timeout))
+    if status == 304 and entry is not None:
+        cache.record_hit(revalidated=True)
+        cache.refresh(key, entry)
+        return _parse_json(entry.body, entry.charset)
+
+    cache.record_miss()
+    result = _parse_json(body, charset)
+    cache.put(key, redacted_uri, body, response_headers, charset)
+    return result
+
+
+def _parse_json(body, charset=None):
+    # json.loads detects UTF-8/16/32 on its own; only other charsets need a decode
+    if charset and charset.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+        return json.loads(body.decode(charset))
+    return json.loads(body)
+
+
+def stream_from_uri(uri, method='GET', timeout=Config.SEGMENT_DOWNLOAD_TIMEOUT, chunk_size=None):
+    """Yield the response body incrementally as bytes chunks.
+
+    Only opening the response is retried; a failure mid-stream is raised.
+    """
+    resource = call_with_retries(uri, method, lambda: get_pool().urlopen(uri, method, timeout=timeout))
+    try:
+        yield from iter_response(resource, chunk_size)
+    finally:
+        resource.close()
+
+
+_retry_policy = None
+_circuit_breaker = None
+_retry_lock = threading.Lock()
+_retry_stats = {
+    'retries': 0,
+    'retries_exhausted': 0,
+    'retry_after_honored': 0,
+}
+
+
+def get_retry_policy():
+    global _retry_policy
+    with _retry_lock:
+        if _retry_policy is None:
+            _retry_policy = resilience.RetryPolicy()
+        return _retry_policy
+
+
+def get_circuit_breaker():
+    global _circuit_breaker
+    with _retry_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = resilience.CircuitBreaker()
+        return _circuit_breaker
+
+
+def _count_retry(name):
+    with _retry_lock:
+        _retry_stats[name] += 1
+
+
+def get_retry_stats():
+    """Return retry counters and circuit breaker counters (prefixed breaker_)"""
+    with _retry_lock:
+        result = dict(_retry_stats)
+    for (name, value) in get_circuit_breaker().stats().items():
+        result['breaker_' + name] = value
+    return result
+
+
+def reset_retry_state():
+    """Forget the retry policy, breaker state and counters (picks up Config changes)"""
+    global _retry_policy, _circuit_breaker
+    with _retry_lock:
+        _retry_policy = None
+        _circuit_breaker = None
+        for name in _retry_stats:
+            _retry_stats[name] = 0
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """Return the shared per-endpoint rate limiter configured by Config.RATE_LIMITS"""
+    global _rate_limiter
+    with _retry_lock:
+        if _rate_limiter is None:
+            _rate_limiter = rate_limit.RateLimiter()
+        return _rate_limiter
+
+
+def get_rate_limit_stats():
+    """Return per-endpoint counts of requests, throttled requests and seconds waited"""
+    return get_rate_limiter().stats()
+
+
+def reset_rate_limiter():
+    """Discard the shared rate limiter so the next request picks up Config changes"""
+    global _rate_limiter
+    with _retry_lock:
+        _rate_limiter = None
+
+
+def call_with_retries(uri, method, operation):
+    """Run operation() for a request to uri under the retry policy and circuit breaker.
+
+    Retryable failures (by default connection errors and 429/5xx on GET/HEAD)
+    are retried with decorrelated-jitter backoff, honouring Retry-After.
+    Raises resilience.CircuitOpenError without calling operation while the
+    host's circuit is open. Each attempt first waits for a rate limit token.
+    """
+    breaker = get_circuit_breaker()
+    limiter = get_rate_limiter()
+    host = urllib.parse.urlsplit(uri).netloc
+    attempt = 1
+    delay = None
     while True:
-        cur = resource.read(1000)
-        if (len(cur) == 0): break
-        if final is None:
-            final = ""
-        final += cur.decode(resource.headers.get_content_charset(failobj="utf-8"))
+        breaker.before_request(host)
+        if limiter.enabled:
+            limiter.acquire(uri)
+        try:
+            result = operation()
+        except Exception as e:
+            delay = _retry_delay_after(host, method, e, attempt, delay)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success(host)
+        return result
+
+
+def _retry_delay_after(host, method, error, attempt, previous_delay):
+    """Record a failed attempt; return the backoff before retrying, or None to give up"""
+    policy = get_retry_policy()
+    if resilience.is_server_failure(error):
+        get_circuit_breaker().record_failure(host)
+    else:
+        get_circuit_breaker().record_success(host)
+    if not policy.is_retryable(method, error):
+        return None
+    if attempt >= policy.max_attempts:
+        _count_retry('retries_exhausted')
+        return None
+    (delay, honored) = policy.next_delay(previous_delay, error)
+    if honored:
+        _count_retry('retry_after_honored')
+    _count_retry('retries')
+    return delay
+
+
+def iter_response(resource, chunk_size=None):
+    chunk_size = chunk_size or Config.READ_CHUNK_SIZE
+    while True:
+        chunk = resource.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _content_length(resource):
+    # Content-Length counts encoded bytes, so it can't size a decoded body
+    if getattr(resource, 'encoded', False) is True:
+        return None
+    try:
+        length = int(resource.headers.get('Content-Length'))
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return length if length >= 0 else None
+
+
+def _read_response(resource):
+    """Read a whole response body into one bytearray.
+
+    With a known Content-Length the buffer is allocated once and filled with
+    readinto(); otherwise it grows by large reads, which is amortised linear.
+    """
+    length = _content_length(resource)
+    if length is not None and hasattr(resource, 'readinto'):
+        body = bytearray(length)
+        pos = 0
+        with memoryview(body) as view:
+            while pos < length:
+                count = resource.readinto(view[pos:])
+                if not count:
+                    break
+                pos += count
+        if pos < length:
+            raise http.client.IncompleteRead(bytes(body[:pos]), length - pos)
+        # Drain anything past the declared length so the connection is released
+        resource.read()
+        return body
+
+    body = bytearray()
+    chunk_size = Config.READ_CHUNK_SIZE
+    while True:
+        chunk = resource.read(chunk_size)
+        if not chunk:
+            break
+        body += chunk
+    return body
+
+
+def _read_python3x(resource):
+    body = _read_response(resource)
+    if len(body) == 0:
+        return None
+    # Decode once so multi-byte characters split across reads stay intact
+    return body.decode(resource.headers.get_content_charset(failobj="utf-8"))
+
 
-    return final
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+DECODABLE_ENCODINGS = ('gzip', 'x-gzip', 'deflate')
 
 
+def _proxy_route(proxies, scheme, host):
+    """(host, port, headers) of the proxy in `proxies` (as from
+    urllib.request.getproxies()) for a target, or None to connect directly"""
+    proxy = proxies.get(scheme)
+    if not proxy or urllib.request.proxy_bypass_environment(host, proxies):
+        return None
+    parsed = urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+    headers = {}
+    if parsed.username:
+        credentials = '%s:%s' % (urllib.parse.unquote(parsed.username), urllib.parse.unquote(parsed.password or ''))
+        headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+    return (parsed.hostname, parsed.port or 80, headers)
+
+
+def _create_ssl_context():
+    # Same behaviour as the previous per-request ssl.SSLContext(): no certificate
+    # verification, but a single context so TLS sessions can be resumed.
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class _TimedConnectMixin:
+    """Connects in separate DNS and TCP steps so each can be timed"""
+
+    phases = None
+
+    def _timed_connect(self):
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+
+        sock = None
+        error = None
+        for (family, socktype, proto, _, address) in addresses:
+            try:
+                sock = socket.socket(family, socktype, proto)
+                if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(address)
+                break
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+                    sock = None
+        if sock is None:
+            raise error or OSError("getaddrinfo returned no addresses for %s" % self.host)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.phases = {'dns': resolved - started, 'connect': time.perf_counter() - resolved}
+
+
+class _PooledHTTPConnection(_TimedConnectMixin, http.client.HTTPConnection):
+
+    def connect(self):
+        self._timed_connect()
+
+
+class _PooledHTTPSConnection(_TimedConnectMixin, http.client.HTTPSConnection):
+    """HTTPS connection that resumes the last TLS session seen for its host"""
+
+    def __init__(self, host, port=None, pool=None, pool_key=None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self._pool = pool
+        self._pool_key = pool_key
+
+    def connect(self):
+        self._timed_connect()
+        if self._tunnel_host:
+            # CONNECT through the proxy; TLS is then negotiated with the target host
+            self._tunnel()
+        started = time.perf_counter()
+        session = self._pool._get_tls_session(self._pool_key)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self._tunnel_host or self.host,
+                                              session=session)
+        self.phases['tls'] = time.perf_counter() - started
+        if self.sock.session_reused:
+            self._pool._increment('tls_resumptions')
+
+
+def _content_decoder(encoding, first_chunk):
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # "deflate" should be zlib-wrapped, but some servers send a raw stream
+    if len(first_chunk) >= 2 and first_chunk[0] & 0x0F == 8 and (first_chunk[0] * 256 + first_chunk[1]) % 31 == 0:
+        return zlib.decompressobj(zlib.MAX_WBITS)
+    return zlib.decompressobj(-zlib.MAX_WBITS)
+
+
+def _decode_body(body, encoding):
+    """Decode a complete gzip/deflate body in one go"""
+    encoding = (encoding or '').strip().lower()
+    if encoding not in DECODABLE_ENCODINGS or not body:
+        return body
+    decoder = _content_decoder(encoding, body)
+    return decoder.decompress(body) + decoder.flush()
+
+
+class PooledResponse:
+    """Response wrapper that hands its connection back to the pool once fully read.
+
+    gzip/deflate bodies are decompressed incrementally as they are read.
+    """
+
+    def __init__(self, pool, key, conn, response, timing=None):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._timing = timing
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        encoding = (response.getheader('Content-Encoding') or '').strip().lower()
+        self._encoding = encoding if encoding in DECODABLE_ENCODINGS else None
+        self._decoder = None
+        self._wire_bytes = 0
+        self._decoded_bytes = 0
+
+    @property
+    def encoded(self):
+        return self._encoding is not None
+
+    def read(self, amt=None):
+        if self._encoding is not None:
+            data = self._read_decoded(amt)
+        else:
+            data = self._response.read(amt)
+            self._wire_bytes += len(data)
+        self._decoded_bytes += len(data)
+        if amt is None or (amt and not data):
+            self.close()
+        return data
+
+    def _read_decoded(self, amt):
+        while True:
+            if self._decoder is not None and self._decoder.unconsumed_tail:
+                data = self._decoder.decompress(self._decoder.unconsumed_tail, amt or 0)
+            else:
+                raw = self._response.read(None if amt is None else Config.READ_CHUNK_SIZE)
+                self._wire_bytes += len(raw)
+                if not raw:
+                    return self._decoder.flush() if self._decoder is not None else b''
+                if self._decoder is None:
+                    self._decoder = _content_decoder(self._encoding, raw)
+                data = self._decoder.decompress(raw, amt or 0)
+                if amt is None:
+                    return data + self._decoder.flush()
+            if data:
+                return data
+
+    def readinto(self, buffer):
+        if self._encoding is not None:
+            data = self.read(len(buffer))
+            buffer[:len(data)] = data
+            return len(data)
+        count = self._response.readinto(buffer)
+        self._wire_bytes += count
+        self._decoded_bytes += count
+        if count == 0:
+            self.close()
+        return count
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool._record_transfer(self._wire_bytes, self._decoded_bytes, self._encoding is not None)
+        if _request_hooks and self._timing is not None:
+            event = self._timing
+            now = time.perf_counter()
+            event.update(status=self.status, wire_bytes=self._wire_bytes, decoded_bytes=self._decoded_bytes,
+                         transfer=now - event.pop('headers_at'), total=now - event.pop('started_at'))
+            _emit_request_event(event)
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            self._response.close()
+            conn.close()
+            self._pool._increment('discarded')
+
+
+class HTTPConnectionPool:
+    """Thread-safe keep-alive connection pool shared by all API helpers.
+
+    Idle connections are kept per (scheme, host, port) up to ``maxsize`` and
+    dropped after ``idle_timeout`` seconds without use. Proxies configured in
+    the environment (HTTP_PROXY, HTTPS_PROXY, NO_PROXY) are honoured like
+    urllib does: HTTPS is tunnelled with CONNECT, HTTP is sent to the proxy.
+    """
+
+    def __init__(self, maxsize=None, idle_timeout=None):
+        self.maxsize = Config.HTTP_POOL_MAXSIZE if maxsize is None else maxsize
+        self.idle_timeout = Config.HTTP_POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._tls_sessions = {}
+        self._ssl_context = _create_ssl_context()
+        self._proxies = urllib.request.getproxies()
+        self._proxy_routes = {}
+        self._stats = {
+            'requests': 0,
+            'hits': 0,
+            'new_connections': 0,
+            'idle_evictions': 0,
+            'discarded': 0,
+            'tls_resumptions': 0,
+            'compressed_responses': 0,
+            'wire_bytes': 0,
+            'decoded_bytes': 0,
+        }
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result['idle_connections'] = sum(len(idle) for idle in self._idle.values())
+            return result
+
+    def _increment(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _record_transfer(self, wire_bytes, decoded_bytes, compressed):
+        with self._lock:
+            self._stats['wire_bytes'] += wire_bytes
+            self._stats['decoded_bytes'] += decoded_bytes
+            if compressed:
+                self._stats['compressed_responses'] += 1
+
+    def _get_tls_session(self, key):
+        with self._lock:
+            return self._tls_sessions.get(key)
+
+    def _proxy_for(self, key):
+        """(host, port, headers) of the proxy for a target, or None to connect directly"""
+        if key in self._proxy_routes:
+            return self._proxy_routes[key]
+        route = _proxy_route(self._proxies, key[0], key[1])
+        with self._lock:
+            self._proxy_routes[key] = route
+        return route
+
+    def _new_connection(self, key, timeout):
+        (scheme, host, port) = key
+        proxy = self._proxy_for(key)
+        if scheme == 'https':
+            if proxy is None:
+                return _PooledHTTPSConnection(host, port, pool=self, pool_key=key,
+                                              timeout=timeout, context=self._ssl_context)
+            (proxy_host, proxy_port, proxy_headers) = proxy
+            conn = _PooledHTTPSConnection(proxy_host, proxy_port, pool=self, pool_key=key,
+                                          timeout=timeout, context=self._ssl_context)
+            conn.set_tunnel(host, port, headers=proxy_headers)
+            return conn
+        if proxy is not None:
+            return _PooledHTTPConnection(proxy[0], proxy[1], timeout=timeout)
+        return _PooledHTTPConnection(host, port, timeout=timeout)
+
+    def _acquire(self, key, timeout):
+        now = time.monotonic()
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            # Oldest connections sit at the front of the list
+            while idle and now - idle[0][1] > self.idle_timeout:
+                stale.append(idle.pop(0)[0])
+            self._stats['idle_evictions'] += len(stale)
+            if idle:
+                conn = idle.pop()[0]
+                self._stats['hits'] += 1
+            else:
+                self._stats['new_connections'] += 1
+        for old in stale:
+            old.close()
+
+        if conn is None:
+            return (self._new_connection(key, timeout), False)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return (conn, True)
+
+    def _release(self, key, conn):
+        session = getattr(conn.sock, 'session', None)
+        with self._lock:
+            if session is not None:
+                self._tls_sessions[key] = session
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append((conn, time.monotonic()))
+                return
+            self._stats['discarded'] += 1
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for (conn, _) in connections:
+                conn.close()
+
+    def request(self, method, uri, headers=None, body=None, timeout=Config.DEFAULT_TIMEOUT):
+        parsed = urllib.parse.urlsplit(uri)
+        scheme = parsed.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {uri}")
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed.hostname, port)
+        target = parsed.path or '/'
+        if parsed.query:
+            target += '?' + parsed.query
+
+        headers = dict(headers or {})
+        if scheme == 'http':
+            proxy = self._proxy_for(key)
+            if proxy is not None:
+                # Plain HTTP goes to the proxy with the absolute URL as target
+                target = urllib.parse.urlunsplit((scheme, parsed.netloc, parsed.path or '/', parsed.query, ''))
+                headers.update(proxy[2])
+        if Config.HTTP_ACCEPT_ENCODING and not any(name.lower() == 'accept-encoding' for name in headers):
+            headers['Accept-Encoding'] = Config.HTTP_ACCEPT_ENCODING
+
+        self._increment('requests')
+        started = time.perf_counter()
+        (conn, reused) = self._acquire(key, timeout)
+        try:
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+            except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+                conn.close()
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                self._increment('new_connections')
+                (conn, reused) = (self._new_connection(key, timeout), False)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+        except Exception as e:
+            conn.close()
+            if _request_hooks:
+                _emit_request_event(self._timing(method, uri, conn, reused, started, error=e))
+            raise
+
+        timing = self._timing(method, uri, conn, reused, started) if _request_hooks else None
+        return PooledResponse(self, key, conn, response, timing)
+
+    def _timing(self, method, uri, conn, reused, started, error=None):
+        now = time.perf_counter()
+        event = {'method': method, 'endpoint': rate_limit.endpoint_of(uri), 'reused': reused,
+                 'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+        if conn.phases:
+            event.update(conn.phases)
+            conn.phases = None
+        # Time to first byte: request sent until response headers parsed, excluding connection setup
+        event['ttfb'] = max(0.0, now - started - event['dns'] - event['connect'] - event['tls'])
+        if error is not None:
+            event.update(status=None, error=repr(error), wire_bytes=0, decoded_bytes=0,
+                         transfer=0.0, total=now - started)
+        else:
+            event.update(started_at=started, headers_at=now)
+        return event
+
+    def urlopen(self, uri, method='GET', headers=None, body=None, timeout=Config.DEFAULT_TIMEOUT):
+        """Issue a request, following redirects and raising HTTPError on non-2xx replies"""
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request(method, uri, headers=headers, body=body, timeout=timeout)
+            location = response.getheader('Location')
+            if response.status in REDIRECT_CODES and location:
+                response.read()
+                if method not in ('GET', 'HEAD'):
+                    if response.status in (307, 308):
+                        raise urllib.error.HTTPError(uri, response.status, response.reason,
+                                                     response.headers, io.BytesIO(b''))
+                    (method, body) = ('GET', None)
+                uri = urllib.parse.urljoin(uri, location)
+                continue
+            if response.status >= 400:
+                content = response.read()
+                raise urllib.error.HTTPError(uri, response.status, response.reason,
+                                             response.headers, io.BytesIO(content))
+            return response
+
+        raise urllib.error.HTTPError(uri, response.status, "Too many redirects",
+                                     response.headers, io.BytesIO(b''))
+
+
+_request_hooks = []
+
+
+def add_request_hook(callback):
+    """Call callback(event) after every HTTP request made through the shared pool.
+
+    The event dict holds method, endpoint, status (None on failure), error,
+    reused, the phase timings dns/connect/tls/ttfb/transfer/total in seconds,
+    and wire_bytes/decoded_bytes. Callbacks run on the requesting thread.
+    """
+    if callback not in _request_hooks:
+        _request_hooks.append(callback)
+
+
+def remove_request_hook(callback):
+    if callback in _request_hooks:
+        _request_hooks.remove(callback)
+
+
+def _emit_request_event(event):
+    for callback in list(_request_hooks):
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Request hook {callback!r} failed: {e}")
+
+
+_request_metrics = None
+
+
+def enable_request_metrics(destination=None):
+    """Aggregate request timings into per-endpoint histograms.
+
+    destination is 'stderr' to print a summary at exit, a path to write a
+    JSON export at exit, or None to only collect. Returns the RequestMetrics.
+    """
+    global _request_metrics
+    if _request_metrics is None:
+        _request_metrics = request_metrics.RequestMetrics()
+        add_request_hook(_request_metrics)
+        if destination:
+            atexit.register(_request_metrics.dump_to, destination)
+    return _request_metrics
+
+
+def get_request_metrics():
+    """Return the RequestMetrics enabled by enable_request_metrics, or None"""
+    return _request_metrics
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPConnectionPool()
+        return _pool
+
+
+def get_pool_stats():
+    """Return connection pool counters (hits, new connections, idle evictions, ...)"""
+    return get_pool().stats()
+
+
+def get_transfer_stats():
+    """Return bytes received on the wire vs bytes after decompression"""
+    stats = get_pool_stats()
+    result = {name: stats[name] for name in ('requests', 'compressed_responses', 'wire_bytes', 'decoded_bytes')}
+    result['compression_ratio'] = (stats['decoded_bytes'] / stats['wire_bytes']) if stats['wire_bytes'] else 1.0
+    return result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the response cache configured by Config.HTTP_CACHE_DIR, or None when disabled"""
+    global _cache
+    directory = Config.HTTP_CACHE_DIR
+    if not directory:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.directory != directory:
+            _cache = response_cache.ResponseCache(directory)
+        return _cache
+
+
+def get_cache_stats():
+    """Return response cache counters (hits, misses, revalidations, evictions), or None when disabled"""
+    cache = get_cache()
+    return cache.stats() if cache is not None else None
+
+
+def close_pool():
+    """Close all idle connections and discard the shared pool"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
 
 def get_all_status(server, key):
     try:
         url = "%s/api/status?apikey=%s" % (server, key)
-        response = load_from_uri(url)
-        result_json = json.loads(response)
+        result_json = load_json_from_uri(url)
         return result_json
     except urllib.error.HTTPError as e:
         print("Error in adding link")
@@ -97,3 +970,7 @@ def get_all_status(server, key):
     except Exception as e:
         print(f"Unexpected error in reading status: {e}")
         return None
+
+
+if Config.REQUEST_METRICS:
+    enable_request_metrics(Config.REQUEST_METRICS)